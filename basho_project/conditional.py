@@ -0,0 +1,81 @@
+"""
+Conditional GET for read-only API views
+
+Validators are derived from the database instead of the response body:
+ETag = hash of COUNT(*) and MAX(updated_at) of every queryset the view
+renders, Last-Modified = the newest updated_at. A client that sends
+If-None-Match / If-Modified-Since gets a 304 after one small aggregate
+query per queryset; nothing is fetched row by row or serialized.
+
+Deletions change COUNT(*) but not MAX(updated_at), so they are only
+detected through the ETag (which takes precedence when both are sent).
+
+ConditionalGetMiddleware (settings.MIDDLEWARE) applies the same headers to
+responses served from the page cache by FetchFromCacheMiddleware.
+"""
+
+import hashlib
+from calendar import timegm
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    Answer list/retrieve requests with 304 when nothing has changed
+
+    Views can override get_validator_querysets() to add related data that
+    the serializer renders (e.g. workshop slots).
+    """
+
+    def get_validator_querysets(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # Detail requests only depend on the requested object
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return [queryset]
+
+    def get_validators(self):
+        """Return (etag, last_modified timestamp or None)"""
+        parts = [type(self).__name__]
+        latest = None
+        for queryset in self.get_validator_querysets():
+            stats = queryset.order_by().aggregate(count=Count('pk'), latest=Max('updated_at'))
+            parts.append(f"{queryset.model._meta.label}:{stats['count']}:{stats['latest']}")
+            if stats['latest'] and (latest is None or stats['latest'] > latest):
+                latest = stats['latest']
+
+        etag = '"%s"' % hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+        last_modified = timegm(latest.utctimetuple()) if latest else None
+        return etag, last_modified
+
+    def conditional_get(self, request, render):
+        """
+        Return 304 if the client's copy is current, otherwise render()
+
+        Args:
+            request: Incoming request
+            render: Callable that builds the full Response
+        """
+        etag, last_modified = self.get_validators()
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = render()
+        if response.status_code == 200:
+            response.headers['ETag'] = etag
+            if last_modified:
+                response.headers['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_get(request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_get(request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
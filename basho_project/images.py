@@ -0,0 +1,184 @@
+"""
+Responsive image variants
+
+Every image is exposed as named, resized variants (thumb / card / full)
+in modern formats (AVIF, WebP), shaped for <picture> / srcset:
+
+    {
+        "thumb": {"avif": url, "webp": url},
+        "card":  {"avif": url, "webp": url},
+        "full":  {"avif": url, "webp": url},
+        "srcset": {"avif": "url 320w, url 640w, url 1600w", "webp": "..."},
+        "original": url
+    }
+
+- Cloudinary images: transformation URLs (w_…, c_limit, f_…, q_auto),
+  built once per public id/version and memoised in-process
+- files under MEDIA_ROOT: resized copies written once with Pillow into
+  MEDIA_ROOT/variants/ (AVIF only when Pillow was built with it)
+- anything else (external image_url): variants are empty, use `original`
+"""
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework import serializers
+
+
+# Variant name -> max width in pixels (images are never upscaled)
+VARIANT_WIDTHS = getattr(settings, 'IMAGE_VARIANT_WIDTHS', {
+    'thumb': 320,
+    'card': 640,
+    'full': 1600,
+})
+
+# Preferred format first
+VARIANT_FORMATS = ('avif', 'webp')
+
+VARIANTS_DIR = 'variants'
+
+
+def build_variants(urls):
+    """
+    Shape {(variant, format): url} into the response structure
+
+    Args:
+        urls: dict keyed by (variant name, format)
+    """
+    formats = [fmt for fmt in VARIANT_FORMATS if any(key[1] == fmt for key in urls)]
+    variants = {
+        name: {fmt: urls[(name, fmt)] for fmt in formats}
+        for name in VARIANT_WIDTHS
+    }
+    variants['srcset'] = {
+        fmt: ', '.join(f"{urls[(name, fmt)]} {width}w" for name, width in VARIANT_WIDTHS.items())
+        for fmt in formats
+    }
+    return variants
+
+
+@lru_cache(maxsize=4096)
+def cloudinary_variants(public_id, version=None, delivery_type='upload'):
+    """Transformation URLs for a Cloudinary image (pure string building, no API call)"""
+    import cloudinary
+
+    image = cloudinary.CloudinaryImage(public_id, version=version, type=delivery_type)
+    urls = {
+        (name, fmt): image.build_url(
+            secure=True, width=width, crop='limit', fetch_format=fmt, quality='auto'
+        )
+        for name, width in VARIANT_WIDTHS.items()
+        for fmt in VARIANT_FORMATS
+    }
+    variants = build_variants(urls)
+    variants['original'] = image.build_url(secure=True)
+    return variants
+
+
+def pillow_formats():
+    """Formats the installed Pillow can write"""
+    from PIL import features
+
+    return [fmt for fmt in VARIANT_FORMATS if fmt != 'avif' or features.check('avif')]
+
+
+@lru_cache(maxsize=4096)
+def local_variants(url, mtime):
+    """
+    Resize a MEDIA_ROOT file with Pillow, writing each variant only once
+
+    Args:
+        url: MEDIA_URL-relative image URL
+        mtime: Source modification time (part of the memo key so a replaced
+               file is processed again)
+    """
+    from PIL import Image
+
+    relative = url[len(settings.MEDIA_URL):]
+    source = Path(settings.MEDIA_ROOT) / relative
+    digest = hashlib.md5(f"{relative}:{mtime}".encode('utf-8')).hexdigest()[:12]
+    target_dir = Path(settings.MEDIA_ROOT) / VARIANTS_DIR
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    urls = {}
+    with Image.open(source) as original:
+        original = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for name, width in VARIANT_WIDTHS.items():
+            resized = None
+            for fmt in pillow_formats():
+                filename = f"{Path(relative).stem}-{digest}-{name}.{fmt}"
+                target = target_dir / filename
+                if not target.exists():
+                    if resized is None:
+                        resized = original.copy()
+                        resized.thumbnail((width, width * 10))
+                    resized.save(target, fmt.upper(), quality=80)
+                urls[(name, fmt)] = f"{settings.MEDIA_URL}{VARIANTS_DIR}/{filename}"
+
+    variants = build_variants(urls)
+    variants['original'] = url
+    return variants
+
+
+def passthrough_variants(url):
+    """Variants for an image that can't be transformed (external URL): use `original`"""
+    variants = {name: {} for name in VARIANT_WIDTHS}
+    variants['srcset'] = {}
+    variants['original'] = url
+    return variants
+
+
+def image_variants(image, fallback_url=None):
+    """
+    Named variants for an image field value
+
+    Args:
+        image: CloudinaryField / FieldFile value (may be empty)
+        fallback_url: URL used when there is no uploaded image (e.g. image_url)
+
+    Returns:
+        dict (see module docstring), or None when there is no image at all
+    """
+    public_id = getattr(image, 'public_id', None) if image else None
+    if public_id:
+        return cloudinary_variants(
+            public_id,
+            getattr(image, 'version', None),
+            getattr(image, 'type', None) or 'upload',
+        )
+
+    url = getattr(image, 'url', None) if image else None
+    url = url or fallback_url
+    if not url:
+        return None
+
+    media_root = getattr(settings, 'MEDIA_ROOT', None)
+    if media_root and url.startswith(settings.MEDIA_URL):
+        source = Path(media_root) / url[len(settings.MEDIA_URL):]
+        try:
+            return local_variants(url, source.stat().st_mtime)
+        except (ImportError, OSError):
+            # Pillow missing or unreadable file: serve the original
+            pass
+    return passthrough_variants(url)
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only serializer field exposing image_variants() for a model image
+
+    Usage: image_variants = ImageVariantsField('image', fallback_field='image_url')
+    """
+
+    def __init__(self, image_field='image', fallback_field=None, **kwargs):
+        self.image_field = image_field
+        self.fallback_field = fallback_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        fallback = getattr(obj, self.fallback_field, None) if self.fallback_field else None
+        return image_variants(getattr(obj, self.image_field), fallback)
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # WhiteNoise for static files
+    'django.middleware.http.ConditionalGetMiddleware',  # 304s for page-cached responses (above cache middleware)
     'django.middleware.cache.UpdateCacheMiddleware',  # Cache middleware (top)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
@@ -242,11 +243,16 @@ REST_FRAMEWORK = {
 }
 
 # Email Configuration (for custom orders and notifications)
-# SMTP backend for real email delivery via Gmail
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# SMTP delivery via Gmail over pooled, reused connections
+# (products/smtp_pool.py)
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'products.smtp_pool.PooledEmailBackend')
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
+EMAIL_TIMEOUT = 10  # seconds; a pooled connection must never hang a worker
+EMAIL_POOL_SIZE = 2  # idle connections kept per process
+EMAIL_POOL_IDLE_TIMEOUT = 60  # seconds before an idle connection is dropped
+EMAIL_POOL_MAX_MESSAGES = 90  # messages per connection before reconnecting
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')  # Gmail App Password
 DEFAULT_FROM_EMAIL = os.environ.get('EMAIL_HOST_USER', 'noreply@basho.com')
@@ -263,6 +269,22 @@ COMPANY_ADDRESS = 'Pottery Studio, India'
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', '')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
 
+# Gateway deadlines (seconds), keep-alive pool size and circuit breaker
+# (see products/gateway.py)
+RAZORPAY_CONNECT_TIMEOUT = float(os.environ.get('RAZORPAY_CONNECT_TIMEOUT', 3))
+RAZORPAY_READ_TIMEOUT = float(os.environ.get('RAZORPAY_READ_TIMEOUT', 10))
+RAZORPAY_POOL_SIZE = 4
+RAZORPAY_BREAKER_THRESHOLD = 5  # consecutive failures before failing fast
+RAZORPAY_BREAKER_RESET = 30  # seconds before a trial call is let through
+
+# Secret entered when creating the webhook in the Razorpay dashboard
+# (Settings -> Webhooks, URL /api/products/razorpay-webhook/,
+# events payment.captured and order.paid)
+RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET', '')
+
+# In-process fake gateway for tests / local development
+RAZORPAY_STUB = os.environ.get('RAZORPAY_STUB', 'False') == 'True'
+
 
 # Celery Configuration
 # Redis as message broker for background tasks
@@ -270,6 +292,27 @@ RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '')
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 CELERY_ENABLED = os.environ.get('CELERY_ENABLED', 'False') == 'True'
 
+# Cache shared by every worker process, for small coordination keys such
+# as ShippingConfig's and the shipping zones' version tokens and the
+# catalog facets. Redis when REDIS_URL is configured; otherwise a table in
+# the database (created by `manage.py createcachetable`, see build.sh), so
+# the gunicorn workers still see each other's version changes
+if os.environ.get('REDIS_URL'):
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f'{REDIS_URL}/2',
+        'KEY_PREFIX': 'basho',
+    }
+else:
+    CACHES['shared'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'basho_shared_cache',
+        'KEY_PREFIX': 'basho',
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000
+        }
+    }
+
 CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', f'{REDIS_URL}/0')
 CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', f'{REDIS_URL}/1')
 CELERY_ACCEPT_CONTENT = ['json']
@@ -279,6 +322,53 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes max task time
 
+# Periodic tasks (run with `celery -A basho_project beat`)
+CELERY_BEAT_SCHEDULE = {
+    'release-expired-stock-holds': {
+        'task': 'products.tasks.release_expired_stock_holds',
+        'schedule': 60.0,  # every minute
+    },
+    'process-pending-payment-events': {
+        'task': 'products.tasks.process_pending_payment_events',
+        'schedule': 60.0,  # every minute
+    },
+    'flush-dirty-carts': {
+        'task': 'products.tasks.flush_dirty_carts',
+        'schedule': 30.0,  # every 30 seconds
+    },
+    'drain-jobs': {
+        'task': 'products.tasks.drain_jobs',
+        'schedule': 30.0,  # every 30 seconds
+    },
+}
+
+# Background jobs (products/jobs.py): emails queued in the same transaction
+# as the order / registration / inquiry, run by `manage.py run_jobs` or Celery
+JOB_MAX_ATTEMPTS = 5
+JOB_BACKOFF_BASE = 30  # seconds before the first retry, doubled each time
+JOB_BACKOFF_MAX = 60 * 60  # longest wait between retries
+JOB_LEASE = 10 * 60  # a job running longer than this is considered stuck
+# Deployments without a run_jobs worker (or Celery): run each job in the
+# request right after it commits, like emails were sent before the queue
+JOB_RUN_INLINE = os.environ.get('JOB_RUN_INLINE', 'False') == 'True'
+
+# Admin notification digests (products/digests.py): with a window set, new
+# orders / registrations / inquiries are summarized in one admin email per
+# window instead of one email each. 0 = one email per event
+ADMIN_DIGEST_WINDOW = int(os.environ.get('ADMIN_DIGEST_WINDOW', 0))  # seconds
+# Orders of this total (₹) or more are emailed at once even in digest mode
+ADMIN_DIGEST_URGENT_ORDER_TOTAL = int(os.environ.get('ADMIN_DIGEST_URGENT_ORDER_TOTAL', 20000))
+
+# Server-side carts (products/carts.py): Redis hashes when REDIS_URL is
+# configured, written behind by `manage.py flush_carts` (or Celery beat);
+# otherwise a per-process dict that writes every change through to CartItem
+CART_STORE = os.environ.get('CART_STORE', 'redis' if os.environ.get('REDIS_URL') else 'memory')
+CART_REDIS_URL = os.environ.get('CART_REDIS_URL', f'{REDIS_URL}/3')
+
+# Stock reservations: seconds a checkout keeps its stock before the
+# sweeper job (run by run_jobs) releases it (covers the Razorpay payment window)
+STOCK_HOLD_TTL = int(os.environ.get('STOCK_HOLD_TTL', 15 * 60))
+
 # ====================
 # JAZZMIN ADMIN THEME CONFIGURATION
 # Modern, user-friendly admin interface
@@ -21,6 +21,10 @@ python manage.py collectstatic --no-input
 echo "==> Running database migrations..."
 python manage.py migrate
 
+# Table of the shared cache when REDIS_URL isn't set (no-op otherwise)
+echo "==> Creating cache table..."
+python manage.py createcachetable
+
 # Create superuser
 echo "==> Creating superuser..."
 python manage.py create_superuser --username karthik --email karthik@example.com --password admin123
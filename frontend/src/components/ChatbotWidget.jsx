@@ -388,7 +388,7 @@ const ChatbotWidget = () => {
                                 <form className="chatbot-tracking-form" onSubmit={handleOrderTrackingSubmit}>
                                     <input
                                         type="text"
-                                        placeholder="Order Number (e.g., ORD-20250115...)"
+                                        placeholder="Order Number (e.g., ORD-2025-000123)"
                                         value={orderNumber}
                                         onChange={(e) => setOrderNumber(e.target.value)}
                                         className="chatbot-tracking-input"
@@ -70,12 +70,15 @@ function Checkout() {
     });
   }, [showError]);
 
-  // Calculate shipping when cart changes
+  // Calculate shipping when cart changes or a full pincode is entered
+  // (rates depend on the pincode's shipping zone)
+  const shippingPincode = /^\d{6}$/.test(formData.pincode) ? formData.pincode : '';
+
   useEffect(() => {
     if (cart.length > 0) {
       calculateShipping();
     }
-  }, [cart]);
+  }, [cart, shippingPincode]);
 
   const calculateShipping = async () => {
     try {
@@ -94,7 +97,8 @@ function Checkout() {
         },
         body: JSON.stringify({
           items: items,
-          subtotal: getCartTotal()
+          subtotal: getCartTotal(),
+          pincode: shippingPincode || undefined
         })
       });
 
@@ -176,6 +180,53 @@ function Checkout() {
     return Object.keys(newErrors).length === 0;
   };
 
+  // Order form sent with the Razorpay order, so the backend can create the
+  // order from the payment webhook even if this page never gets the callback
+  const buildOrderData = () => {
+    const orderData = {
+      customer_name: `${formData.firstName} ${formData.lastName}`,
+      customer_email: formData.email,
+      customer_phone: formData.phone,
+      shipping_address: formData.address,
+      shipping_city: formData.city,
+      shipping_state: formData.state,
+      shipping_pincode: formData.pincode,
+      billing_address: '', // Same as shipping for now
+      payment_method: 'razorpay',
+      payment_status: false,
+      subtotal: getCartTotal(),
+      shipping_charge: shippingCost,
+      tax_amount: 0,
+      discount_amount: 0,
+      total_amount: getCartTotal() + shippingCost,
+      items: cart.map(item => ({
+        product: item.id,
+        quantity: item.quantity,
+        product_name: item.name,
+        product_price: item.price
+      }))
+    };
+
+    // Add user firebase UID if logged in
+    if (currentUser) {
+      orderData.user_firebase_uid = currentUser.uid;
+    }
+    return orderData;
+  };
+
+  // The order is created by a background worker; poll until it exists
+  const waitForOrder = async (razorpayOrderId, attempts = 10) => {
+    for (let i = 0; i < attempts; i++) {
+      await new Promise(resolve => setTimeout(resolve, 1500));
+      const response = await fetch(`/api/products/payment-status/${razorpayOrderId}/`);
+      const status = await response.json();
+      if (status.status !== 'processing' && status.status !== 'pending') {
+        return status;
+      }
+    }
+    return { success: true, status: 'processing' };
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
 
@@ -207,10 +258,15 @@ function Checkout() {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
+          items: cart.map(item => ({
+            product_id: item.id,
+            quantity: item.quantity
+          })),
           amount: totalAmount,
           customer_name: customerName,
           customer_email: formData.email,
-          customer_phone: formData.phone
+          customer_phone: formData.phone,
+          order_data: buildOrderData()
         })
       });
 
@@ -309,35 +365,7 @@ function Checkout() {
 
   const handlePaymentSuccess = async (paymentResponse, orderId) => {
     try {
-      // Prepare order data
-      const orderData = {
-        customer_name: `${formData.firstName} ${formData.lastName}`,
-        customer_email: formData.email,
-        customer_phone: formData.phone,
-        shipping_address: formData.address,
-        shipping_city: formData.city,
-        shipping_state: formData.state,
-        shipping_pincode: formData.pincode,
-        billing_address: '', // Same as shipping for now
-        payment_method: 'razorpay',
-        payment_status: false,
-        subtotal: getCartTotal(),
-        shipping_charge: shippingCost,
-        tax_amount: 0,
-        discount_amount: 0,
-        total_amount: getCartTotal() + shippingCost,
-        items: cart.map(item => ({
-          product: item.id,
-          quantity: item.quantity,
-          product_name: item.name,
-          product_price: item.price
-        }))
-      };
-
-      // Add user firebase UID if logged in
-      if (currentUser) {
-        orderData.user_firebase_uid = currentUser.uid;
-      }
+      const orderData = buildOrderData();
 
       // Verify payment and create order
       const verifyResponse = await fetch('/api/products/verify-payment/', {
@@ -353,13 +381,19 @@ function Checkout() {
         })
       });
 
-      const result = await verifyResponse.json();
+      let result = await verifyResponse.json();
+
+      if (result.success && result.status !== 'completed') {
+        result = await waitForOrder(paymentResponse.razorpay_order_id);
+      }
 
       console.log('Payment verification response:', result);
 
       if (result.success) {
         // Show success message with order details
-        const successMessage = `Payment successful! Order #${result.order_number}. Confirmation email sent to ${formData.email}`;
+        const successMessage = result.order_number
+          ? `Payment successful! Order #${result.order_number}. Confirmation email sent to ${formData.email}`
+          : `Payment successful! Your order is being created and a confirmation email will be sent to ${formData.email}`;
         showSuccess(successMessage);
 
         // Clear the cart
@@ -62,8 +62,15 @@ function Products() {
     }
   };
 
-  const handleProductClick = (product) => {
+  const handleProductClick = async (product) => {
+    // List cards are slim; load the full product (description, care etc.)
     setSelectedProduct(product);
+    try {
+      const response = await axios.get(`${API_BASE_URL}/products/products/${product.product_id}/`);
+      setSelectedProduct(response.data);
+    } catch (err) {
+      console.error("Error fetching product details:", err);
+    }
   };
 
   const ProductDetails = ({ product, onClose }) => {
@@ -11,6 +11,23 @@ export const useCart = () => {
   return context;
 };
 
+const productLines = (items) => items
+  .filter(item => item.type !== 'workshop')
+  .map(item => ({ product_id: item.id, quantity: item.quantity }));
+
+// Server cart line -> local cart item
+const toCartItem = (line) => ({
+  id: line.product.id,
+  product_id: line.product.product_id,
+  name: line.product.name,
+  price: line.product.price,
+  image: line.product.image_url_full || line.product.image,
+  image_url_full: line.product.image_url_full,
+  type: 'product',
+  cartKey: line.product.id,
+  quantity: line.quantity
+});
+
 export const CartProvider = ({ children }) => {
   const [cart, setCart] = useState(() => {
     // Initialize cart from localStorage on first render
@@ -28,6 +45,30 @@ export const CartProvider = ({ children }) => {
   const { currentUser, loading } = useAuth();
   const previousUserRef = useRef(undefined);
   const isInitialMount = useRef(true);
+  const serverSyncedRef = useRef(false);
+
+  // Logged-in users: merge local product lines into the server cart, which
+  // then becomes the source of truth (workshops stay local)
+  const syncServerCart = async (uid, localItems) => {
+    serverSyncedRef.current = false;
+    try {
+      const response = await fetch(`/api/products/carts/${uid}/merge/`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items: productLines(localItems) })
+      });
+      if (!response.ok) return;
+      const serverCart = await response.json();
+      localStorage.removeItem('basho_cart_guest');
+      setCart(prevCart => [
+        ...serverCart.items.map(toCartItem),
+        ...prevCart.filter(item => item.type === 'workshop')
+      ]);
+      serverSyncedRef.current = true;
+    } catch (error) {
+      console.error('Error syncing cart with server:', error);
+    }
+  };
 
   // Load cart from localStorage when user changes (login/logout)
   useEffect(() => {
@@ -42,20 +83,40 @@ export const CartProvider = ({ children }) => {
       // Load the correct cart for the current user
       const cartKey = currentUser ? `basho_cart_${currentUser.uid}` : 'basho_cart_guest';
       const savedCart = localStorage.getItem(cartKey);
+      let localCart = [];
       if (savedCart) {
         try {
-          setCart(JSON.parse(savedCart));
+          localCart = JSON.parse(savedCart);
+          setCart(localCart);
         } catch (error) {
           console.error('Error loading cart from localStorage:', error);
         }
       }
+      if (currentUser) {
+        syncServerCart(currentUser.uid, localCart);
+      }
       return;
     }
 
     // Only reload cart if the user actually changed (login/logout)
     const currentUserId = currentUser?.uid;
     if (previousUserRef.current !== currentUserId) {
+      const wasGuest = !previousUserRef.current;
       previousUserRef.current = currentUserId;
+      serverSyncedRef.current = false;
+
+      if (currentUser) {
+        // Logging in: the guest cart is merged into the account's server cart
+        let guestCart = [];
+        if (wasGuest) {
+          try {
+            guestCart = JSON.parse(localStorage.getItem('basho_cart_guest') || '[]');
+          } catch (error) {
+            guestCart = [];
+          }
+        }
+        syncServerCart(currentUser.uid, guestCart);
+      }
       const cartKey = currentUser ? `basho_cart_${currentUser.uid}` : 'basho_cart_guest';
       const savedCart = localStorage.getItem(cartKey);
       if (savedCart) {
@@ -85,6 +146,20 @@ export const CartProvider = ({ children }) => {
     }
   }, [cart, currentUser, loading]);
 
+  // Push product changes of logged-in users to the server cart (debounced)
+  useEffect(() => {
+    if (loading || !currentUser || !serverSyncedRef.current) return;
+
+    const timer = setTimeout(() => {
+      fetch(`/api/products/carts/${currentUser.uid}/`, {
+        method: 'PUT',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ items: productLines(cart) })
+      }).catch(error => console.error('Error saving cart to server:', error));
+    }, 800);
+    return () => clearTimeout(timer);
+  }, [cart, currentUser, loading]);
+
   const addToCart = (item) => {
     setCart(prevCart => {
       // For workshops with slots, create unique ID based on workshop + slot
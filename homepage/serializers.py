@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from basho_project.images import ImageVariantsField
 from .models import Creation
 
 
@@ -8,10 +9,11 @@ class CreationSerializer(serializers.ModelSerializer):
     Returns the full Cloudinary URL for the image field.
     """
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
 
     class Meta:
         model = Creation
-        fields = ['id', 'image_url', 'url', 'height', 'order', 'alt_text']
+        fields = ['id', 'image_url', 'image_variants', 'url', 'height', 'order', 'alt_text']
 
     def get_image_url(self, obj):
         """Return Cloudinary URL for the image."""
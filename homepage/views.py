@@ -2,13 +2,15 @@ from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from basho_project.conditional import ConditionalGetMixin
 from products.models import Product
 from workshops.models import Workshop
 from .models import Creation
 from .serializers import CreationSerializer
+from basho_project.images import image_variants
 
 
-class CreationsListView(ListAPIView):
+class CreationsListView(ConditionalGetMixin, ListAPIView):
     """
     API endpoint that returns all active creations for the masonry gallery.
     Returns JSON array of creation items with full image URLs.
@@ -49,6 +51,7 @@ class StudioDuoView(APIView):
                 'name': p.name,
                 'image': img_url,
                 'image_url_full': img_url,
+                'image_variants': image_variants(p.image, p.image_url),
                 'price': p.price,
                 'short_description': p.short_description,
                 'category': p.category,
@@ -71,6 +74,7 @@ class StudioDuoView(APIView):
                 'id': w.id,
                 'name': w.name,
                 'image_url': img_url,
+                'image_variants': image_variants(w.image, w.image_url),
                 'price': w.price,
                 'workshop_type': w.workshop_type,
                 'workshop_type_display': w.get_workshop_type_display(),
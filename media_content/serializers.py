@@ -1,14 +1,16 @@
 from rest_framework import serializers
+from basho_project.images import ImageVariantsField
 from .models import GalleryImage, TextTestimonial, VideoTestimonial, CustomerExperience
 
 
 class GalleryImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     
     class Meta:
         model = GalleryImage
-        fields = ['id', 'image_url', 'category', 'category_display', 'order']
+        fields = ['id', 'image_url', 'image_variants', 'category', 'category_display', 'order']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -28,11 +30,12 @@ class TextTestimonialSerializer(serializers.ModelSerializer):
 class VideoTestimonialSerializer(serializers.ModelSerializer):
     video_file_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_variants = ImageVariantsField('thumbnail')
     
     class Meta:
         model = VideoTestimonial
         fields = ['id', 'customer_name', 'location', 'description', 
-                  'video_file_url', 'video_url', 'thumbnail_url', 'is_featured']
+                  'video_file_url', 'video_url', 'thumbnail_url', 'thumbnail_variants', 'is_featured']
     
     def get_video_file_url(self, obj):
         if obj.video_file:
@@ -53,10 +56,11 @@ class VideoTestimonialSerializer(serializers.ModelSerializer):
 
 class CustomerExperienceSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
     
     class Meta:
         model = CustomerExperience
-        fields = ['id', 'image_url', 'title', 'paragraph', 'customer_name', 'context']
+        fields = ['id', 'image_url', 'image_variants', 'title', 'paragraph', 'customer_name', 'context']
     
     def get_image_url(self, obj):
         if obj.image:
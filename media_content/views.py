@@ -1,4 +1,5 @@
 from rest_framework import generics
+from basho_project.conditional import ConditionalGetMixin
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import GalleryImage, TextTestimonial, VideoTestimonial, CustomerExperience
 from .serializers import (
@@ -9,7 +10,7 @@ from .serializers import (
 )
 
 
-class GalleryImageListView(generics.ListAPIView):
+class GalleryImageListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active gallery images, optionally filtered by category"""
     serializer_class = GalleryImageSerializer
     filter_backends = [DjangoFilterBackend]
@@ -19,7 +20,7 @@ class GalleryImageListView(generics.ListAPIView):
         return GalleryImage.objects.filter(is_active=True)
 
 
-class TextTestimonialListView(generics.ListAPIView):
+class TextTestimonialListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active text testimonials"""
     serializer_class = TextTestimonialSerializer
     
@@ -27,7 +28,7 @@ class TextTestimonialListView(generics.ListAPIView):
         return TextTestimonial.objects.filter(is_active=True)
 
 
-class VideoTestimonialListView(generics.ListAPIView):
+class VideoTestimonialListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active video testimonials"""
     serializer_class = VideoTestimonialSerializer
     
@@ -35,7 +36,7 @@ class VideoTestimonialListView(generics.ListAPIView):
         return VideoTestimonial.objects.filter(is_active=True)
 
 
-class CustomerExperienceListView(generics.ListAPIView):
+class CustomerExperienceListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active customer experiences"""
     serializer_class = CustomerExperienceSerializer
     
@@ -6,10 +6,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import Product, CustomOrder, CorporateInquiry, CartItem, Order, OrderItem, ShippingConfig
+from .models import Product, CustomOrder, CorporateInquiry, CartItem, Order, OrderItem, ShippingConfig, StockHold, PendingCheckout, PaymentEvent, ShippingZone, ShippingRateSlab, Job, AdminEvent
 from workshops.models import WorkshopRegistration
 
 
@@ -56,7 +56,8 @@ class ProductAdmin(admin.ModelAdmin):
     list_editable = ['stock_quantity', 'is_featured']
     
     # Can't edit these fields
-    readonly_fields = ['created_at', 'updated_at', 'image_preview_large']
+    # in_stock follows stock_quantity minus held units (Product.save / products/inventory.py)
+    readonly_fields = ['created_at', 'updated_at', 'image_preview_large', 'in_stock', 'reserved_quantity']
     
     # How many products to show per page
     list_per_page = 25
@@ -68,8 +69,8 @@ class ProductAdmin(admin.ModelAdmin):
             'description': 'Enter the basic product details'
         }),
         ('💰 Pricing & Stock', {
-            'fields': ('price', 'in_stock', 'stock_quantity'),
-            'description': 'Set price and manage inventory'
+            'fields': ('price', 'in_stock', 'stock_quantity', 'reserved_quantity'),
+            'description': 'Set price and manage inventory (in stock is updated automatically from the stock quantity)'
         }),
         ('📏 Product Specifications', {
             'fields': ('weight', 'dimensions'),
@@ -99,6 +100,27 @@ class ProductAdmin(admin.ModelAdmin):
         }),
     )
     
+    def save_model(self, request, obj, form, change):
+        """
+        Save only the fields staff changed
+        Checkouts move reserved_quantity with F() updates while the form is
+        open; a full save would write back the value the form loaded (and
+        in_stock derived from it), so stock counts go through set_stock
+        """
+        if not change:
+            super().save_model(request, obj, form, change)
+            return
+        
+        from .inventory import set_stock
+        
+        columns = {field.name for field in obj._meta.concrete_fields}
+        changed = [name for name in form.changed_data if name in columns and name != 'stock_quantity']
+        if changed:
+            obj.save(update_fields=[*changed, 'updated_at'])
+        if 'stock_quantity' in form.changed_data:
+            set_stock(obj.pk, obj.stock_quantity)
+            obj.refresh_from_db(fields=['stock_quantity', 'reserved_quantity', 'in_stock', 'updated_at'])
+    
     # Custom display methods
     def image_preview(self, obj):
         """Show small product image in list"""
@@ -539,10 +561,11 @@ class CartItemAdmin(admin.ModelAdmin):
     View cart items (for reference/debugging)
     """
     
-    list_display = ['product', 'quantity', 'total_price', 'session_key', 'added_at']
+    list_display = ['product', 'quantity', 'total_price', 'user', 'session_key', 'added_at', 'updated_at']
     list_filter = ['added_at', 'product']
-    search_fields = ['session_key', 'product__name']
-    readonly_fields = ['added_at']
+    search_fields = ['session_key', 'product__name', 'user__username', 'user__email']
+    readonly_fields = ['added_at', 'updated_at']
+    list_select_related = ['product', 'user']
     
     def total_price(self, obj):
         """Show total price for this cart item"""
@@ -550,6 +573,132 @@ class CartItemAdmin(admin.ModelAdmin):
     total_price.short_description = 'Total Price'
 
 
+# ====================
+# STOCK HOLD ADMIN
+# ====================
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    """
+    View stock reserved by checkouts (for reference/debugging)
+    Holds are created and released automatically
+    """
+    
+    list_display = ['reference', 'product', 'quantity', 'status', 'expires_at', 'created_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['reference', 'product__name', 'product__product_id']
+    readonly_fields = ['reference', 'product', 'quantity', 'status', 'expires_at', 'created_at', 'updated_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+# ====================
+# PAYMENT EVENT ADMIN
+# ====================
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    """
+    Razorpay webhooks and checkout callbacks awaiting / after finalization
+    Failed events need staff attention (e.g. a payment without checkout details)
+    """
+    
+    list_display = ['event_type', 'source', 'razorpay_order_id', 'razorpay_payment_id', 'status', 'attempts', 'created_at']
+    list_filter = ['status', 'source', 'event_type']
+    search_fields = ['event_id', 'razorpay_order_id', 'razorpay_payment_id']
+    readonly_fields = [
+        'event_id', 'source', 'event_type', 'razorpay_order_id', 'razorpay_payment_id',
+        'payload', 'status', 'attempts', 'last_error', 'created_at', 'processed_at',
+    ]
+    
+    actions = ['retry_events']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def retry_events(self, request, queryset):
+        """Queue failed events for processing again"""
+        from .checkout import queue_event
+        
+        event_pks = list(queryset.exclude(status='processed').values_list('pk', flat=True))
+        queryset.filter(pk__in=event_pks).update(status='received')
+        for event_pk in event_pks:
+            queue_event(event_pk)
+        self.message_user(request, f'{len(event_pks)} payment event(s) queued for processing.')
+    retry_events.short_description = "🔁 Retry processing"
+
+
+# ====================
+# BACKGROUND JOB ADMIN
+# ====================
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    Emails and other work queued by orders, registrations and inquiries
+    Failed jobs ran out of retries; running jobs past JOB_LEASE are stuck
+    """
+    
+    list_display = ['task_name', 'status', 'attempts', 'run_after', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'last_error']
+    readonly_fields = [
+        'task', 'args', 'kwargs', 'status', 'attempts', 'max_attempts', 'run_after',
+        'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at', 'finished_at',
+    ]
+    
+    actions = ['retry_jobs']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def task_name(self, obj):
+        return obj.task.rsplit('.', 1)[-1]
+    task_name.short_description = 'Task'
+    
+    def retry_jobs(self, request, queryset):
+        """Queue failed / stuck jobs to run now with a fresh set of attempts"""
+        from django.utils import timezone
+        from .jobs import dispatch
+        
+        job_pks = list(queryset.exclude(status__in=['done', 'queued']).values_list('pk', flat=True))
+        queryset.filter(pk__in=job_pks).update(
+            status='queued', attempts=0, run_after=timezone.now(), locked_by='', locked_at=None
+        )
+        for job_pk in job_pks:
+            dispatch(job_pk)
+        self.message_user(request, f'{len(job_pks)} job(s) queued to run again.')
+    retry_jobs.short_description = "🔁 Retry jobs"
+
+
+@admin.register(AdminEvent)
+class AdminEventAdmin(admin.ModelAdmin):
+    """
+    Admin notifications held for the digest email (ADMIN_DIGEST_WINDOW)
+    Events without "digest sent" are waiting for the next digest
+    """
+    
+    list_display = ['reference', 'kind', 'summary', 'created_at', 'digest_sent_at']
+    list_filter = ['kind', ('digest_sent_at', admin.EmptyFieldListFilter)]
+    search_fields = ['reference', 'summary']
+    readonly_fields = ['kind', 'reference', 'summary', 'admin_url', 'created_at', 'digest_sent_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(PendingCheckout)
+class PendingCheckoutAdmin(admin.ModelAdmin):
+    """
+    Order forms stored at checkout (for reference/debugging)
+    """
+    
+    list_display = ['razorpay_order_id', 'amount', 'created_at']
+    search_fields = ['razorpay_order_id']
+    readonly_fields = ['razorpay_order_id', 'order_data', 'amount', 'quote', 'created_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
 # ====================
 # ORDER ITEM INLINE
 # ====================
@@ -596,6 +745,7 @@ class OrderAdmin(admin.ModelAdmin):
         'status',
         'payment_status',
         'payment_method',
+        'shipping_tier',
         'created_at',
         'shipping_state',
     ]
@@ -606,10 +756,14 @@ class OrderAdmin(admin.ModelAdmin):
         'customer_email',
         'customer_phone',
         'tracking_number',
+        'razorpay_order_id',
+        'razorpay_payment_id',
     ]
     
     readonly_fields = [
         'order_number',
+        'razorpay_order_id',
+        'razorpay_payment_id',
         'created_at',
         'updated_at',
         'item_count_display',
@@ -629,7 +783,7 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': ('customer_name', 'customer_email', 'customer_phone'),
         }),
         ('📦 Shipping Address', {
-            'fields': ('shipping_address', 'shipping_city', 'shipping_state', 'shipping_pincode'),
+            'fields': ('shipping_address', 'shipping_city', 'shipping_state', 'shipping_pincode', 'shipping_tier'),
         }),
         ('🏢 Billing Address (Optional)', {
             'fields': ('billing_address', 'gst_number'),
@@ -639,6 +793,8 @@ class OrderAdmin(admin.ModelAdmin):
             'fields': (
                 'payment_method',
                 'payment_status',
+                'razorpay_order_id',
+                'razorpay_payment_id',
                 'subtotal',
                 'shipping_charge',
                 'tax_amount',
@@ -868,3 +1024,46 @@ class ShippingConfigAdmin(admin.ModelAdmin):
             return redirect(reverse('admin:products_shippingconfig_change', args=[config.pk]))
         return super().changelist_view(request, extra_context)
 
+
+
+# ====================
+# SHIPPING ZONE ADMIN
+# Purpose: Pincode-based shipping rates (products/shipping.py)
+# ====================
+class ShippingRateSlabInline(admin.TabularInline):
+    """Weight slabs of a zone"""
+    model = ShippingRateSlab
+    extra = 1
+    fields = ['max_weight_kg', 'standard_charge', 'express_charge']
+
+
+@admin.register(ShippingZone)
+class ShippingZoneAdmin(admin.ModelAdmin):
+    """
+    Shipping zones keyed by pincode prefix
+    Changes reach every worker's rate table on the next quote
+    """
+    
+    list_display = ['name', 'pincode_prefixes', 'slab_count', 'express_available', 'is_active', 'updated_at']
+    list_filter = ['is_active', 'express_available']
+    search_fields = ['name', 'pincode_prefixes']
+    inlines = [ShippingRateSlabInline]
+    
+    fieldsets = (
+        ('📍 Zone', {
+            'fields': ('name', 'pincode_prefixes', 'is_active'),
+            'description': 'A pincode belongs to the zone with the longest matching prefix. Pincodes outside every zone use the Shipping Configuration flat rate.'
+        }),
+        ('🚚 Delivery', {
+            'fields': ('standard_days', 'express_available', 'express_days', 'extra_per_kg'),
+            'description': 'A parcel pays the charge of the lightest slab it fits in. Heavier parcels pay the heaviest slab plus the extra charge per started kg.'
+        }),
+    )
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(slab_total=Count('slabs'))
+    
+    def slab_count(self, obj):
+        return obj.slab_total
+    slab_count.short_description = 'Slabs'
+    slab_count.admin_order_field = 'slab_total'
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        # Register signal handlers (search index, cache invalidation)
+        from . import signals  # noqa: F401
@@ -0,0 +1,304 @@
+"""
+Server-side carts for logged-in users
+
+Carts live in a cart store - Redis hashes in production
+(cart:<user id> -> {product id: quantity}) - so every add/update is one
+Redis command. Changed carts are recorded in a dirty set and written
+behind to CartItem rows by flush_dirty_carts (`manage.py flush_carts`, or
+the Celery beat task); CartItem is the durable copy and is read back when
+a cart is not in the store.
+
+Carts are returned priced through pricing.quote_cart (one product query
+for the whole cart).
+
+The store is picked by settings.CART_STORE: 'redis' (CART_REDIS_URL) or
+'memory' (a process-local dict). Each gunicorn worker has its own memory
+store, which no other process can read or flush, so with a store that is
+not shared every change is written through to CartItem at once and carts
+are always read from CartItem.
+set_cart_store() swaps it at runtime, e.g. in a test's setUp.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Carts untouched for this long are dropped from Redis (CartItem keeps them)
+CART_TTL = getattr(settings, 'CART_TTL', 60 * 60 * 24 * 30)
+
+# Cart lines carry this much product data
+CART_PRODUCT_FIELDS = (
+    'id', 'product_id', 'name', 'price', 'weight', 'in_stock', 'stock_quantity',
+    'image', 'image_url_full', 'image_variants',
+)
+
+
+class RedisCartStore:
+    """Carts as Redis hashes plus a set of carts awaiting write-behind"""
+
+    # Always present in a loaded cart, so an empty cart still exists
+    LOADED_FIELD = '_'
+    DIRTY_KEY = 'cart:dirty'
+
+    # Seen by every process: write behind
+    shared = True
+
+    def __init__(self, url):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, decode_responses=True, socket_timeout=2, socket_connect_timeout=2)
+
+    def key(self, user_id):
+        return f'cart:{user_id}'
+
+    def get(self, user_id):
+        """{product id: quantity}, or None when the cart isn't in the store"""
+        raw = self.redis.hgetall(self.key(user_id))
+        if not raw:
+            return None
+        raw.pop(self.LOADED_FIELD, None)
+        return {int(product_id): int(quantity) for product_id, quantity in raw.items()}
+
+    def put(self, user_id, items, dirty=True):
+        key = self.key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={self.LOADED_FIELD: 1, **items})
+        pipe.expire(key, CART_TTL)
+        if dirty:
+            pipe.sadd(self.DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def add(self, user_id, product_id, quantity):
+        key = self.key(user_id)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(key, product_id, quantity)
+        pipe.expire(key, CART_TTL)
+        pipe.sadd(self.DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def set(self, user_id, product_id, quantity):
+        key = self.key(user_id)
+        pipe = self.redis.pipeline()
+        if quantity > 0:
+            pipe.hset(key, product_id, quantity)
+        else:
+            pipe.hdel(key, product_id)
+        pipe.expire(key, CART_TTL)
+        pipe.sadd(self.DIRTY_KEY, user_id)
+        pipe.execute()
+
+    def pop_dirty(self, limit=500):
+        return [int(user_id) for user_id in self.redis.spop(self.DIRTY_KEY, limit) or []]
+
+    def mark_clean(self, user_id):
+        self.redis.srem(self.DIRTY_KEY, user_id)
+
+
+class MemoryCartStore:
+    """Process-local cart store with the same behaviour (tests / development)"""
+
+    # Only this process sees it: write through
+    shared = False
+
+    def __init__(self):
+        self.carts = {}
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            cart = self.carts.get(user_id)
+            return dict(cart) if cart is not None else None
+
+    def put(self, user_id, items, dirty=True):
+        with self.lock:
+            self.carts[user_id] = {int(product_id): int(quantity) for product_id, quantity in items.items()}
+            if dirty:
+                self.dirty.add(user_id)
+
+    def add(self, user_id, product_id, quantity):
+        with self.lock:
+            cart = self.carts.setdefault(user_id, {})
+            cart[product_id] = cart.get(product_id, 0) + quantity
+            self.dirty.add(user_id)
+
+    def set(self, user_id, product_id, quantity):
+        with self.lock:
+            cart = self.carts.setdefault(user_id, {})
+            if quantity > 0:
+                cart[product_id] = quantity
+            else:
+                cart.pop(product_id, None)
+            self.dirty.add(user_id)
+
+    def pop_dirty(self, limit=500):
+        with self.lock:
+            user_ids = list(self.dirty)[:limit]
+            self.dirty.difference_update(user_ids)
+            return user_ids
+
+    def mark_clean(self, user_id):
+        with self.lock:
+            self.dirty.discard(user_id)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cart_store():
+    """The configured cart store (created on first use)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if getattr(settings, 'CART_STORE', 'memory') == 'redis':
+                    _store = RedisCartStore(settings.CART_REDIS_URL)
+                else:
+                    _store = MemoryCartStore()
+    return _store
+
+
+def set_cart_store(store):
+    """Replace the cart store (tests); pass None to go back to the configured one"""
+    global _store
+    _store = store
+
+
+def load_cart(user_id):
+    """Cart contents, read through from CartItem when not in the store"""
+    from .models import CartItem
+
+    store = get_cart_store()
+    # Another process may have changed the cart since this one stored it
+    items = store.get(user_id) if store.shared else None
+    if items is None:
+        items = dict(CartItem.objects.filter(user_id=user_id).values_list('product_id', 'quantity'))
+        store.put(user_id, items, dirty=False)
+    return items
+
+
+def write_through(user_id):
+    """Persist a change right away when the store isn't shared between processes"""
+    store = get_cart_store()
+    if not store.shared:
+        store.mark_clean(user_id)
+        save_cart(store, user_id)
+
+
+def add_item(user_id, product_id, quantity):
+    load_cart(user_id)
+    get_cart_store().add(user_id, product_id, quantity)
+    write_through(user_id)
+
+
+def set_item(user_id, product_id, quantity):
+    load_cart(user_id)
+    get_cart_store().set(user_id, product_id, quantity)
+    write_through(user_id)
+
+
+def replace_cart(user_id, items):
+    get_cart_store().put(user_id, items)
+    write_through(user_id)
+
+
+def merge_guest_cart(user_id, items):
+    """
+    Fold a guest (localStorage) cart into the user's cart
+    A product in both keeps the larger quantity, so logging in twice
+    doesn't double it
+    """
+    cart = load_cart(user_id)
+    for product_id, quantity in items.items():
+        cart[product_id] = max(cart.get(product_id, 0), quantity)
+    get_cart_store().put(user_id, cart)
+    write_through(user_id)
+
+
+def price_cart(user_id):
+    """CartQuote for the user's cart; products that no longer exist are dropped"""
+    from .pricing import quote_cart
+
+    cart = load_cart(user_id)
+    quote = quote_cart([
+        {'product_id': product_id, 'quantity': quantity}
+        for product_id, quantity in sorted(cart.items())
+    ])
+    for product_id in quote.missing:
+        get_cart_store().set(user_id, product_id, 0)
+    if quote.missing:
+        write_through(user_id)
+    return quote
+
+
+def write_cart(user_id, items):
+    """Make the user's CartItem rows match `items`"""
+    from .models import CartItem
+
+    with transaction.atomic():
+        CartItem.objects.filter(user_id=user_id).exclude(product_id__in=list(items)).delete()
+        existing = {row.product_id: row for row in CartItem.objects.filter(user_id=user_id)}
+
+        now = timezone.now()
+        changed = []
+        for product_id, quantity in items.items():
+            row = existing.get(product_id)
+            if row is not None and row.quantity != quantity:
+                row.quantity = quantity
+                row.updated_at = now
+                changed.append(row)
+        CartItem.objects.bulk_update(changed, ['quantity', 'updated_at'])
+
+        CartItem.objects.bulk_create([
+            CartItem(user_id=user_id, product_id=product_id, quantity=quantity)
+            for product_id, quantity in items.items()
+            if product_id not in existing
+        ], ignore_conflicts=True)
+
+
+def save_cart(store, user_id):
+    """
+    Write one cart from the store to CartItem
+
+    Returns:
+        False when the cart is no longer in the store
+    """
+    from .models import Product
+
+    items = store.get(user_id)
+    if items is None:
+        # Expired from the store before it was flushed; CartItem is kept
+        return False
+    # Products deleted since they were added can't be referenced
+    known = set(Product.objects.filter(pk__in=list(items)).values_list('pk', flat=True))
+    write_cart(user_id, {pk: quantity for pk, quantity in items.items() if pk in known and quantity > 0})
+    return True
+
+
+def flush_dirty_carts():
+    """
+    Write changed carts behind to CartItem
+
+    Returns:
+        Number of carts written
+    """
+    store = get_cart_store()
+    written = 0
+    for user_id in store.pop_dirty():
+        try:
+            if save_cart(store, user_id):
+                written += 1
+        except Exception as e:
+            logger.error(f"Failed to write cart of user {user_id}: {e}")
+            items = store.get(user_id)
+            if items is not None:
+                store.put(user_id, items)  # stays dirty for the next flush
+    return written
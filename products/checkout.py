@@ -0,0 +1,233 @@
+"""
+Payment finalization
+
+Turning a paid Razorpay order into an Order no longer depends on the
+browser coming back to verify-payment:
+
+    create-razorpay-order   stores the order form and the priced cart
+                            (PendingCheckout)
+    razorpay-webhook        payment.captured / order.paid  -> PaymentEvent
+    verify-payment          signed browser callback        -> PaymentEvent
+
+Each PaymentEvent is stored together with a process_payment_event job
+(products/jobs.py) and acknowledged; the run_jobs worker (or Celery)
+finalizes it and retries transient failures with backoff, so neither
+request waits for the order to be created. finalize_payment() is
+idempotent: the unique razorpay_order_id / razorpay_payment_id columns on
+Order make the webhook and the browser callback race safely, and only
+the run that creates the order queues the confirmation emails (as jobs
+in the order's transaction). Events whose job ran out of attempts stay
+"received" for `manage.py process_payment_events` (or Celery beat).
+"""
+
+import logging
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+# Webhook events that mean the money has been captured
+FINALIZING_EVENTS = {'payment.captured', 'order.paid'}
+
+# Events still "received" after this long are picked up by process_payment_events
+STALE_AFTER = timedelta(minutes=1)
+
+
+class CheckoutError(Exception):
+    """The payment can't be turned into an order without staff help"""
+
+
+def find_order(razorpay_order_id):
+    """Order created for a Razorpay order, or None (one unique-index lookup)"""
+    from .models import Order
+
+    return Order.objects.filter(razorpay_order_id=razorpay_order_id).only('id', 'order_number').first()
+
+
+def queue_order_emails(order_id):
+    """Queue the customer confirmation and the admin notification (with the order's transaction)"""
+    from .jobs import enqueue
+    from .tasks import send_product_order_admin_notification, send_product_order_confirmation_email
+
+    enqueue(send_product_order_confirmation_email, order_id)
+    enqueue(send_product_order_admin_notification, order_id)
+
+
+def finalize_payment(razorpay_order_id, razorpay_payment_id, paid_amount=None):
+    """
+    Create the Order for a captured payment (idempotent)
+
+    Args:
+        razorpay_order_id: Razorpay order ID
+        razorpay_payment_id: Razorpay payment ID
+        paid_amount: Amount captured in paise, when known (webhooks)
+
+    Returns:
+        (order, created)
+
+    Raises:
+        CheckoutError: no stored checkout, the stored order form is invalid,
+            or the amount charged differs from the stored cart's total
+    """
+    from .inventory import confirm_stock
+    from .models import PendingCheckout
+    from .serializers import OrderSerializer
+
+    existing = find_order(razorpay_order_id)
+    if existing:
+        return existing, False
+
+    pending = PendingCheckout.objects.filter(razorpay_order_id=razorpay_order_id).first()
+    if pending is None:
+        raise CheckoutError(f"No checkout details stored for {razorpay_order_id}")
+    if not pending.order_data:
+        raise CheckoutError(f"No order form stored for {razorpay_order_id}")
+
+    order_data = dict(pending.order_data, payment_method='razorpay', payment_status=True)
+    context = {}
+    if pending.quote:
+        # The cart and prices the payment was created for, not today's
+        # prices (checkouts stored before snapshots are re-priced)
+        order_data['items'] = [
+            {'product': line['product'], 'quantity': line['quantity']} for line in pending.quote['lines']
+        ]
+        context['quote_snapshot'] = pending.quote
+    serializer = OrderSerializer(data=order_data, context=context)
+    if not serializer.is_valid():
+        raise CheckoutError(f"Stored order form is invalid: {serializer.errors}")
+
+    quantities = Counter()
+    for item in serializer.validated_data['items']:
+        quantities[item['product'].pk] += item['quantity']
+
+    # pending.amount is what create-razorpay-order asked Razorpay to charge
+    # (never a client figure, and the snapshot's total); webhooks report
+    # the captured amount itself
+    total = serializer.validated_data['total_amount']
+    charged = Decimal(paid_amount) / 100 if paid_amount is not None else pending.amount
+    if charged != total:
+        # Refused: no paid order for a cart the payment doesn't cover.
+        # The event is marked failed for staff to refund or follow up
+        raise CheckoutError(f"AMOUNT MISMATCH: charged ₹{charged}, order total ₹{total}")
+
+    notes = []
+
+    try:
+        with transaction.atomic():
+            # Turn the checkout's stock holds into a sale
+            shortfall = confirm_stock(razorpay_order_id, quantities)
+            if shortfall:
+                # Payment is already captured: keep the order, flag it for staff
+                notes.append(f"STOCK SHORTFALL (product id: units): {shortfall}")
+            order = serializer.save(
+                razorpay_order_id=razorpay_order_id,
+                razorpay_payment_id=razorpay_payment_id,
+                internal_notes='\n'.join(notes)
+            )
+            queue_order_emails(order.id)
+    except IntegrityError:
+        # A concurrent finalizer (webhook vs browser) won the insert
+        existing = find_order(razorpay_order_id)
+        if existing is None:
+            raise
+        return existing, False
+
+    logger.info(f"Order {order.order_number} created for {razorpay_order_id}")
+    return order, True
+
+
+def record_event(event_id, source, event_type, razorpay_order_id='', razorpay_payment_id='', payload=None):
+    """
+    Store an event (deduplicated on event_id) and queue it for processing
+
+    Returns:
+        (event, created)
+    """
+    from .models import PaymentEvent
+
+    with transaction.atomic():
+        event, created = PaymentEvent.objects.get_or_create(
+            event_id=event_id,
+            defaults={
+                'source': source,
+                'event_type': event_type,
+                'razorpay_order_id': razorpay_order_id or '',
+                'razorpay_payment_id': razorpay_payment_id or '',
+                'payload': payload or {},
+            }
+        )
+        if created:
+            queue_event(event.pk)
+    return event, created
+
+
+def queue_event(event_pk):
+    """Queue the finalizer for an event as a job (commits with the caller's transaction)"""
+    from .jobs import enqueue
+    from .tasks import process_payment_event
+
+    enqueue(process_payment_event, event_pk)
+
+
+def process_event(event_pk):
+    """
+    Finalize one stored event
+
+    Returns False when it should be retried later, True otherwise
+    """
+    from .models import PaymentEvent
+
+    event = PaymentEvent.objects.filter(pk=event_pk, status='received').first()
+    if event is None:
+        # Already finished (a duplicate run is harmless: finalize_payment is idempotent)
+        return True
+    PaymentEvent.objects.filter(pk=event.pk).update(attempts=F('attempts') + 1)
+
+    if event.source == 'webhook' and event.event_type not in FINALIZING_EVENTS:
+        finish_event(event, 'ignored')
+        return True
+
+    paid_amount = None
+    if event.source == 'webhook':
+        payment = event.payload.get('payload', {}).get('payment', {}).get('entity', {})
+        paid_amount = payment.get('amount')
+
+    try:
+        finalize_payment(event.razorpay_order_id, event.razorpay_payment_id, paid_amount)
+    except CheckoutError as e:
+        logger.error(f"Payment event {event.event_id} needs attention: {e}")
+        finish_event(event, 'failed', str(e))
+        return True
+    except Exception as e:
+        logger.error(f"Payment event {event.event_id} failed, will retry: {e}")
+        PaymentEvent.objects.filter(pk=event.pk).update(last_error=str(e))
+        return False
+
+    finish_event(event, 'processed')
+    return True
+
+
+def finish_event(event, status, error=''):
+    from .models import PaymentEvent
+
+    PaymentEvent.objects.filter(pk=event.pk).update(
+        status=status,
+        last_error=error,
+        processed_at=timezone.now(),
+    )
+
+
+def stale_events():
+    """Primary keys of events the queue never finished"""
+    from .models import PaymentEvent
+
+    return list(PaymentEvent.objects.filter(
+        status='received',
+        created_at__lte=timezone.now() - STALE_AFTER,
+    ).values_list('pk', flat=True))
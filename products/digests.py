@@ -0,0 +1,130 @@
+"""
+Admin notification digests
+
+Every new order, workshop registration, custom order and corporate
+inquiry used to send its own email to COMPANY_EMAIL. During a sale that
+floods the inbox and eats into Gmail's daily sending quota. With
+ADMIN_DIGEST_WINDOW set (seconds), the admin notification tasks record an
+AdminEvent instead, and one summarized email per window lists them all:
+
+- the first event of a window schedules a send_admin_digest job for the
+  end of the window (products/jobs.py); later events in the same window
+  just join it
+- send_digest() claims the pending events with a conditional UPDATE, so
+  two digests never list the same event, and puts them back if the send
+  fails (the job is retried)
+- urgent events bypass the buffer and are emailed at once: orders staff
+  must look at (stock shortfall notes), orders of
+  ADMIN_DIGEST_URGENT_ORDER_TOTAL or more, and any task called with
+  urgent=True
+
+ADMIN_DIGEST_WINDOW = 0 (the default) keeps one email per event.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .email_rendering import build_email
+
+
+logger = logging.getLogger(__name__)
+
+WINDOW = getattr(settings, 'ADMIN_DIGEST_WINDOW', 0)  # seconds, 0 = disabled
+URGENT_ORDER_TOTAL = getattr(settings, 'ADMIN_DIGEST_URGENT_ORDER_TOTAL', None)
+
+
+def enabled():
+    return WINDOW > 0
+
+
+def is_urgent_order(order):
+    """Orders emailed right away even in digest mode"""
+    if order.internal_notes:
+        # Set by checkout for stock shortfalls
+        return True
+    return URGENT_ORDER_TOTAL is not None and order.total_amount >= URGENT_ORDER_TOTAL
+
+
+def buffer(kind, reference, summary, admin_url=''):
+    """
+    Hold an admin notification for the next digest
+
+    Returns:
+        False when digest mode is off (the caller emails it now)
+    """
+    if not enabled():
+        return False
+
+    from .models import AdminEvent
+
+    with transaction.atomic():
+        AdminEvent.objects.create(kind=kind, reference=reference, summary=summary[:500], admin_url=admin_url)
+        schedule_digest()
+    return True
+
+
+def schedule_digest():
+    """Schedule the digest for the end of the window, unless one is already waiting"""
+    from .jobs import schedule
+    from .models import Job
+    from .tasks import send_admin_digest
+
+    if Job.objects.filter(task=send_admin_digest.name, status='queued').exists():
+        return
+    schedule(send_admin_digest, timezone.now() + timedelta(seconds=WINDOW))
+
+
+def send_digest():
+    """
+    Email every pending event in one message
+
+    Returns:
+        Number of events sent
+    """
+    from .models import AdminEvent
+
+    pending = list(AdminEvent.objects.filter(digest_sent_at__isnull=True).order_by('created_at', 'pk'))
+    if not pending:
+        return 0
+
+    now = timezone.now()
+    event_pks = [event.pk for event in pending]
+    claimed = AdminEvent.objects.filter(pk__in=event_pks, digest_sent_at__isnull=True).update(digest_sent_at=now)
+    if claimed != len(pending):
+        # A concurrent digest took some of them
+        pending = list(AdminEvent.objects.filter(pk__in=event_pks, digest_sent_at=now).order_by('created_at', 'pk'))
+        if not pending:
+            return 0
+
+    sections = {}
+    for event in pending:
+        sections.setdefault(event.kind, []).append(event)
+    context = {
+        'event_count': len(pending),
+        'window_start': timezone.localtime(pending[0].created_at).strftime('%B %d, %Y at %I:%M %p'),
+        'window_end': timezone.localtime(now).strftime('%I:%M %p'),
+        'sections': [
+            {'title': label, 'count': len(sections[kind]), 'events': sections[kind]}
+            for kind, label in AdminEvent.KIND_CHOICES if kind in sections
+        ],
+    }
+    counts = ', '.join(f"{section['count']} {section['title'].lower()}" for section in context['sections'])
+
+    msg = build_email(
+        'emails/admin_digest.html', context,
+        subject=f"📋 Admin Digest: {len(pending)} new ({counts})",
+        to=[settings.COMPANY_EMAIL],
+    )
+    try:
+        msg.send()
+    except Exception:
+        # Back into the buffer for the retry
+        AdminEvent.objects.filter(pk__in=[event.pk for event in pending]).update(digest_sent_at=None)
+        raise
+
+    logger.info(f"Admin digest sent with {len(pending)} events")
+    return len(pending)
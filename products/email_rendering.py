@@ -0,0 +1,484 @@
+"""
+Email rendering
+
+Templates in templates/emails/ are compiled once per process and reused
+for every send:
+
+- <style> rules are inlined into style="" attributes once, on the
+  template source, when the template is compiled; a render only fills in
+  the variables. Mail clients that strip <style> (Gmail app, Outlook)
+  still get the styling. {% %} / {{ }} / {# #} tokens are masked during
+  the HTML scan, so tags inside attributes stay intact; a style="" that
+  contains template syntax keeps its text and gets the stylesheet
+  declarations put in front of it. Rules that can't be inlined (media
+  queries, :hover, attribute selectors, vendor resets) stay in a <style>
+  block
+- when template syntax decides which rules apply (a {% %} / {{ }} in
+  class="", id="" or the stylesheet) or the template extends / includes
+  others, the rendered HTML is inlined instead, on every render
+- inline images referenced as cid:<name> (INLINE_IMAGES) are read from
+  disk and MIME-encoded once; only the images a template uses are attached
+- the plain-text part is derived from the rendered HTML, so no template
+  needs a hand-kept text copy
+
+    msg = build_email('emails/order_confirmation.html', context,
+                      subject='...', to=[order.customer_email])
+    msg.send()
+
+render_stats() reports renders and milliseconds per template;
+tests/benchmark_email_rendering.py compares this with render_to_string.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from email.mime.image import MIMEImage
+from functools import lru_cache
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template import engines
+
+
+logger = logging.getLogger(__name__)
+
+# Content-ID -> (path under BASE_DIR, attachment filename)
+INLINE_IMAGES = {
+    'header_image': (os.path.join('static', 'images', 'email_header.jpg'), 'header.jpg'),
+}
+
+
+# ====================
+# CSS INLINING (template source or rendered HTML)
+# ====================
+
+STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>\s*', re.S | re.I)
+CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+HTML_TAG = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)((?:[^>"\']|"[^"]*"|\'[^\']*\')*)>')
+COMPOUND = re.compile(r'^([a-z][a-z0-9]*)?((?:[.#][\w-]+)*)$', re.I)
+CID = re.compile(r'cid:([\w.-]+)')
+
+# Template syntax, and the placeholders it is masked with while inlining
+TEMPLATE_TOKEN = re.compile(r'{%.*?%}|{{.*?}}|{#.*?#}', re.S)
+MASKED_TOKEN = re.compile(r'\ue000(\d+)\ue001')
+COMPOSING_TAG = re.compile(r'{%\s*(extends|include)\b')
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+@lru_cache(maxsize=None)
+def attribute_pattern(name):
+    return re.compile(r'\s%s\s*=\s*("([^"]*)"|\'([^\']*)\')' % name, re.I)
+
+
+def attribute(attrs, name):
+    match = attribute_pattern(name).search(attrs)
+    if not match:
+        return None
+    return match.group(2) if match.group(2) is not None else match.group(3)
+
+
+def parse_declarations(text):
+    declarations = []
+    for declaration in text.split(';'):
+        prop, sep, value = declaration.partition(':')
+        if sep and prop.strip() and value.strip():
+            declarations.append((prop.strip().lower(), value.strip()))
+    return declarations
+
+
+def parse_compound(compound):
+    """'td.total#x' -> (tag, classes, id), or None if unsupported"""
+    match = COMPOUND.match(compound)
+    if not match or not compound:
+        return None
+    classes = set()
+    element_id = None
+    for part in re.findall(r'[.#][\w-]+', match.group(2)):
+        if part[0] == '.':
+            classes.add(part[1:])
+        else:
+            element_id = part[1:]
+    return ((match.group(1) or '').lower() or None, classes, element_id)
+
+
+def split_rules(css):
+    """
+    Split a stylesheet into (inlinable rules, leftover css)
+
+    Inlinable rules are (selector parts, specificity, order, declarations)
+    for descendant selectors built from tag / .class / #id
+    """
+    css = CSS_COMMENT.sub('', css)
+    rules = []
+    leftover = []
+    position = 0
+    order = 0
+    while position < len(css):
+        brace = css.find('{', position)
+        if brace == -1:
+            break
+        prelude = css[position:brace].strip()
+
+        # Find the matching close brace (at-rules nest)
+        depth = 0
+        end = brace
+        while end < len(css):
+            if css[end] == '{':
+                depth += 1
+            elif css[end] == '}':
+                depth -= 1
+                if depth == 0:
+                    break
+            end += 1
+        body = css[brace + 1:end]
+        position = end + 1
+
+        if prelude.startswith('@'):
+            leftover.append(f'{prelude} {{{body}}}')
+            continue
+
+        declarations = parse_declarations(body)
+        # Client-specific resets only make sense in a stylesheet
+        if declarations and all(prop.startswith(('-', 'mso-')) for prop, value in declarations):
+            leftover.append(f'{prelude} {{{body.strip()}}}')
+            continue
+
+        kept = []
+        for selector in prelude.split(','):
+            selector = selector.strip()
+            parts = [parse_compound(compound) for compound in selector.split()]
+            if not parts or any(part is None for part in parts):
+                kept.append(selector)
+                continue
+            specificity = (
+                sum(1 for tag, classes, element_id in parts if element_id),
+                sum(len(classes) for tag, classes, element_id in parts),
+                sum(1 for tag, classes, element_id in parts if tag),
+            )
+            rules.append((parts, specificity, order, declarations))
+            order += 1
+        if kept:
+            leftover.append(f'{", ".join(kept)} {{{body.strip()}}}')
+
+    return rules, '\n'.join(leftover)
+
+
+def matches(part, element):
+    tag, classes, element_id = part
+    element_tag, element_classes, element_id_value = element
+    return (
+        (tag is None or tag == element_tag)
+        and classes <= element_classes
+        and (element_id is None or element_id == element_id_value)
+    )
+
+
+def selector_matches(parts, element, ancestors):
+    if not matches(parts[-1], element):
+        return False
+    index = len(ancestors) - 1
+    for part in reversed(parts[:-1]):
+        while index >= 0 and not matches(part, ancestors[index]):
+            index -= 1
+        if index < 0:
+            return False
+        index -= 1
+    return True
+
+
+@lru_cache(maxsize=64)
+def parse_stylesheet(css):
+    """split_rules, once per distinct stylesheet"""
+    return split_rules(css)
+
+
+class TemplateSelector(Exception):
+    """Template syntax decides which rules apply to an element"""
+
+
+def inline_css(source, masked=False):
+    """
+    Move <style> rules into style="" attributes (HTML in, HTML out)
+
+    With masked=True the source is a template with its tokens masked
+    (inline_template_css): a masked class="" / id="" raises
+    TemplateSelector, and a masked style="" is kept as written, after
+    the stylesheet declarations.
+    """
+    blocks = STYLE_BLOCK.findall(source)
+    if not blocks:
+        return source
+    rules, leftover = parse_stylesheet('\n'.join(blocks))
+
+    # Remove the style blocks; leftover rules go back where the first one was
+    first = STYLE_BLOCK.search(source)
+    head, tail = source[:first.start()], STYLE_BLOCK.sub('', source[first.start():])
+    source = head + (f'<style>\n{leftover}\n</style>\n' if leftover else '') + tail
+    if not rules:
+        return source
+
+    output = []
+    stack = []
+    position = 0
+    for match in HTML_TAG.finditer(source):
+        closing, tag, attrs = match.group(1), match.group(2).lower(), match.group(3)
+        self_closing = attrs.rstrip().endswith('/')
+        if closing:
+            # Pop to the matching open tag (tolerates unclosed elements)
+            for index in range(len(stack) - 1, -1, -1):
+                if stack[index][0] == tag:
+                    del stack[index:]
+                    break
+            continue
+
+        element = (tag, set((attribute(attrs, 'class') or '').split()), attribute(attrs, 'id'))
+        if masked and any(MASKED_TOKEN.search(name) for name in element[1] | {element[2] or ''}):
+            raise TemplateSelector(match.group(0))
+        matched = sorted(
+            (rule for rule in rules if selector_matches(rule[0], element, stack)),
+            key=lambda rule: (rule[1], rule[2])
+        )
+        if matched:
+            styles = {}
+            for parts, specificity, order, declarations in matched:
+                styles.update(declarations)
+            inline_style = attribute(attrs, 'style') or ''
+            template_style = masked and MASKED_TOKEN.search(inline_style)
+            if not template_style:
+                for prop, value in parse_declarations(inline_style):
+                    # An !important stylesheet rule beats a plain inline one
+                    if '!important' in styles.get(prop, '') and '!important' not in value:
+                        continue
+                    styles[prop] = value
+            style = '; '.join(f'{prop}: {value}' for prop, value in styles.items()).replace('"', "'")
+            if template_style:
+                # Its declarations are only known per render: later ones win
+                style = f'{style}; {inline_style.strip()}'
+            attrs = re.sub(r'\sstyle\s*=\s*("[^"]*"|\'[^\']*\')', '', attrs, flags=re.I)
+            attrs = attrs.rstrip().rstrip('/').rstrip()
+            output.append(source[position:match.start()])
+            output.append(f'<{match.group(2)}{attrs} style="{style}"{" /" if self_closing else ""}>')
+            position = match.end()
+
+        if tag not in VOID_TAGS and not self_closing:
+            stack.append(element)
+
+    output.append(source[position:])
+    return ''.join(output)
+
+
+def inline_template_css(source):
+    """
+    inline_css on template source
+
+    Returns:
+        The template source with the CSS inlined, or None when it has to
+        be done per render (template syntax decides which rules apply, or
+        the template extends / includes others)
+    """
+    if COMPOSING_TAG.search(source):
+        return None
+
+    tokens = []
+
+    def mask(match):
+        tokens.append(match.group(0))
+        return f'\ue000{len(tokens) - 1}\ue001'
+
+    masked = TEMPLATE_TOKEN.sub(mask, source)
+    if any(MASKED_TOKEN.search(block) for block in STYLE_BLOCK.findall(masked)):
+        return None
+    try:
+        inlined = inline_css(masked, masked=True)
+    except TemplateSelector:
+        return None
+    return MASKED_TOKEN.sub(lambda match: tokens[int(match.group(1))], inlined)
+
+
+# ====================
+# PLAIN TEXT FROM HTML (every render)
+# ====================
+
+class TextExtractor(HTMLParser):
+    """Readable plain text of an email body"""
+
+    BLOCK_TAGS = {
+        'p', 'div', 'tr', 'table', 'ul', 'ol', 'li', 'hr',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote',
+    }
+    SKIP_TAGS = {'head', 'style', 'script', 'title'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skipping = 0
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skipping += 1
+        elif tag == 'br':
+            self.parts.append('\n')
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in ('td', 'th'):
+            self.parts.append(' ')
+        elif tag == 'a':
+            self.links.append((dict(attrs).get('href') or '', len(self.parts)))
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skipping = max(self.skipping - 1, 0)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag == 'a' and self.links:
+            href, start = self.links.pop()
+            text = ''.join(self.parts[start:]).strip()
+            if href.startswith(('http://', 'https://')) and href != text:
+                self.parts.append(f' ({href})')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(re.sub(r'\s+', ' ', data))
+
+
+def html_to_text(html):
+    """Plain-text part for an HTML email"""
+    parser = TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    lines = []
+    for line in ''.join(parser.parts).splitlines():
+        line = ' '.join(line.split())
+        # At most one blank line in a row
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return '\n'.join(lines).strip()
+
+
+# ====================
+# COMPILED TEMPLATES AND ASSETS
+# ====================
+
+class EmailTemplate:
+    """A compiled template with its CSS inlined, plus the images it uses"""
+
+    def __init__(self, name):
+        self.name = name
+        engine = engines['django']
+        template = engine.get_template(name)
+        source = template.template.source
+        inlined = inline_template_css(source)
+        # Fallback: inline the rendered HTML every time
+        self.inline_on_render = inlined is None
+        self.template = template if inlined is None else engine.from_string(inlined)
+        self.image_ids = [cid for cid in dict.fromkeys(CID.findall(source)) if cid in INLINE_IMAGES]
+
+    def render(self, context):
+        html = self.template.render(context)
+        return inline_css(html) if self.inline_on_render else html
+
+
+@lru_cache(maxsize=None)
+def get_email_template(name):
+    """Compiled email template (built on first use in each process)"""
+    return EmailTemplate(name)
+
+
+@lru_cache(maxsize=None)
+def inline_image(content_id):
+    """
+    MIME part for an inline image, read and encoded once per process
+    None when the file is missing (the email is sent without it)
+    """
+    path, filename = INLINE_IMAGES[content_id]
+    try:
+        with open(os.path.join(settings.BASE_DIR, path), 'rb') as image_file:
+            image = MIMEImage(image_file.read())
+    except OSError:
+        logger.warning(f"Inline email image {path} not found")
+        return None
+    image.add_header('Content-ID', f'<{content_id}>')
+    image.add_header('Content-Disposition', 'inline', filename=filename)
+    return image
+
+
+class RenderStats:
+    """Renders and total milliseconds per template, for this process"""
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def record(self, name, elapsed_ms):
+        with self.lock:
+            count, total = self.totals.get(name, (0, 0.0))
+            self.totals[name] = (count + 1, total + elapsed_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {'renders': count, 'total_ms': round(total, 3), 'avg_ms': round(total / count, 3)}
+                for name, (count, total) in self.totals.items()
+            }
+
+
+stats = RenderStats()
+
+
+def render_stats():
+    """{template: {'renders', 'total_ms', 'avg_ms'}} since the process started"""
+    return stats.snapshot()
+
+
+class RenderedEmail:
+    """HTML and text parts of one email, and its inline images"""
+
+    def __init__(self, html, text, images, render_ms):
+        self.html = html
+        self.text = text
+        self.images = images
+        self.render_ms = render_ms
+
+
+def render_email(template_name, context):
+    """Render a compiled email template to HTML + derived text"""
+    started = time.perf_counter()
+    template = get_email_template(template_name)
+    html = template.render(context)
+    text = html_to_text(html)
+    images = [image for image in map(inline_image, template.image_ids) if image is not None]
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    stats.record(template_name, elapsed_ms)
+    logger.debug(f"Rendered {template_name} in {elapsed_ms:.2f} ms")
+    return RenderedEmail(html, text, images, elapsed_ms)
+
+
+def build_email(template_name, context, subject, to, from_email=None):
+    """
+    EmailMultiAlternatives with the HTML, derived text and inline images
+
+    Args:
+        template_name: e.g. 'emails/order_confirmation.html'
+        context: Template context
+        subject: Subject line
+        to: List of recipients
+        from_email: Sender (DEFAULT_FROM_EMAIL when not given)
+    """
+    rendered = render_email(template_name, context)
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        body=rendered.text,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=to
+    )
+    msg.attach_alternative(rendered.html, "text/html")
+    for image in rendered.images:
+        msg.attach(image)
+    return msg
@@ -2,50 +2,31 @@
 Email utility functions for sending order-related emails
 """
 
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
 from django.conf import settings
-from email.mime.image import MIMEImage
-import os
 import logging
 
+from .email_rendering import build_email
+
 logger = logging.getLogger(__name__)
 
 
 def send_email_with_celery_fallback(task_func, *args, **kwargs):
     """
-    Smart email sender - uses Celery if enabled, otherwise sends synchronously
+    Queue an email task as a background job (see products/jobs.py)
+    
+    Kept for existing callers; the job is stored in the caller's
+    transaction and run by Celery or `manage.py run_jobs`, never inline
     
     Args:
         task_func: The Celery task function to call
-        *args, **kwargs: Arguments to pass to the task
+        *args, **kwargs: Arguments to pass to the task (JSON-serializable)
         
     Returns:
-        Result from task execution or None if failed
+        Job
     """
-    # Check if Celery is enabled
-    celery_enabled = getattr(settings, 'CELERY_ENABLED', False)
+    from .jobs import enqueue
     
-    if celery_enabled:
-        # Try async with Celery
-        try:
-            return task_func.delay(*args, **kwargs)
-        except Exception as e:
-            # If Celery fails (Redis not available), fall back to sync
-            logger.warning(f"Celery failed ({e}), executing task synchronously")
-            try:
-                # Call the task function directly (sync)
-                return task_func(*args, **kwargs)
-            except Exception as sync_error:
-                logger.error(f"Sync email also failed: {sync_error}")
-                return None
-    else:
-        # Celery disabled - execute synchronously
-        try:
-            return task_func(*args, **kwargs)
-        except Exception as e:
-            logger.error(f"Sync email failed: {e}")
-            return None
+    return enqueue(task_func, *args, **kwargs)
 
 
 def send_order_confirmation_email(order):
@@ -89,52 +70,14 @@ def send_order_confirmation_email(order):
                 'total_price': f"{item.get_total_price():,.2f}",
             })
         
-        # Render HTML email template
-        html_content = render_to_string('emails/order_confirmation.html', context)
-        
-        # Create plain text version (fallback)
-        text_content = f"""
-Dear {order.customer_name},
-
-Thank you for your order!
-
-Order Number: {order.order_number}
-Order Date: {context['order_date']}
-Payment Status: Paid
-Total Amount: ₹{context['total_amount']}
-
-We'll process your order and send you tracking details soon.
-
-Thank you for supporting Basho By Shivangi!
-
-Best regards,
-Basho By Shivangi Team
-        """.strip()
-        
-        # Create email message
-        subject = f"Order Confirmation #{order.order_number} - Basho By Shivangi"
-        from_email = settings.DEFAULT_FROM_EMAIL
+        # Compiled template with the header image; text derived from the HTML
         to_email = order.customer_email
-        
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=from_email,
+        msg = build_email(
+            'emails/order_confirmation.html', context,
+            subject=f"Order Confirmation #{order.order_number} - Basho By Shivangi",
             to=[to_email]
         )
         
-        # Attach HTML version
-        msg.attach_alternative(html_content, "text/html")
-        
-        # Attach header image inline
-        header_image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(header_image_path):
-            with open(header_image_path, 'rb') as img_file:
-                img = MIMEImage(img_file.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
-        
         # Send email
         msg.send()
         
@@ -157,41 +100,35 @@ def send_admin_order_notification(order):
         bool: True if email sent successfully, False otherwise
     """
     try:
-        # Prepare email content
-        subject = f"New Order Received - {order.order_number}"
-        
-        text_content = f"""
-New order received!
-
-Order Number: {order.order_number}
-Customer: {order.customer_name}
-Email: {order.customer_email}
-Phone: {order.customer_phone}
-Total Amount: ₹{order.total_amount:,.2f}
-Payment Status: {'Paid' if order.payment_status else 'Pending'}
-
-Items:
-"""
-        
-        for item in order.items.all():
-            text_content += f"- {item.product_name} x {item.quantity} = ₹{item.get_total_price():,.2f}\n"
-        
-        text_content += f"""
-Shipping Address:
-{order.shipping_address}
-{order.shipping_city}, {order.shipping_state} {order.shipping_pincode}
-
-Please process this order in the admin panel.
-        """.strip()
+        # Same template as the send_product_order_admin_notification task
+        context = {
+            'order_number': order.order_number,
+            'customer_name': order.customer_name,
+            'customer_email': order.customer_email,
+            'customer_phone': order.customer_phone,
+            'total_amount': f"{order.total_amount:,.2f}",
+            'payment_status': 'Paid' if order.payment_status else 'Pending',
+            'order_items': [
+                {
+                    'product_name': item.product_name,
+                    'quantity': item.quantity,
+                    'total_price': f"{item.get_total_price():,.2f}",
+                }
+                for item in order.items.all()
+            ],
+            'shipping_address': order.shipping_address,
+            'shipping_city': order.shipping_city,
+            'shipping_state': order.shipping_state,
+            'shipping_pincode': order.shipping_pincode,
+            'admin_url': f'http://127.0.0.1:8000/admin/products/order/{order.id}/',
+        }
         
-        # Create and send email
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/order_admin_notification.html', context,
+            subject=f"New Order Received - {order.order_number}",
             to=[settings.COMPANY_EMAIL]
         )
-        
         msg.send()
         
         logger.info(f"Admin notification email sent for order {order.order_number}")
@@ -229,47 +166,13 @@ def send_corporate_inquiry_customer_email_sync(inquiry_number, company_name, con
             'company_phone': settings.COMPANY_PHONE,
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/corporate_customer_confirmation.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-Dear {contact_name},
-
-Thank you for your corporate inquiry at Basho By Shivangi!
-
-Inquiry Number: {inquiry_number}
-Company: {company_name}
-Service Type: {service_type_display}
-
-We have received your inquiry and will contact you within 24 hours to discuss your project in detail.
-
-If you have any immediate questions, please contact us at:
-Email: {settings.COMPANY_EMAIL}
-Phone: {settings.COMPANY_PHONE}
-
-With heartfelt appreciation,
-BASHO BY SHIVANGI
-        '''.strip()
-        
-        # Create email message
-        subject = f'Thank You for Your Inquiry - {inquiry_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[email]
+        # Compiled template with the header image; text derived from the HTML
+        msg = build_email(
+            'emails/corporate_customer_confirmation.html', context,
+            subject=f'Thank You for Your Inquiry - {inquiry_number}',
+            to=[email],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
-
-        # Attach header image inline
-        header_image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(header_image_path):
-            with open(header_image_path, 'rb') as img_file:
-                img = MIMEImage(img_file.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
         
         # Send email
         msg.send()
@@ -319,37 +222,13 @@ def send_corporate_inquiry_admin_notification_sync(inquiry_id, inquiry_number, c
             'admin_url': f'http://127.0.0.1:8000/admin/products/corporateinquiry/{inquiry_id}/',
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/corporate_admin_notification.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-New Corporate Inquiry Received
-
-Inquiry Number: {inquiry_number}
-Company: {company_name}
-Contact: {contact_name}
-Email: {email}
-Phone: {phone}
-Service Type: {service_type_display}
-Team Size: {team_size}
-Budget Range: {budget_range}
-
-Message:
-{message}
-
-Login to admin panel: http://127.0.0.1:8000/admin/products/corporateinquiry/{inquiry_id}/
-        '''.strip()
-        
-        # Create email message
-        subject = f'🏢 New Corporate Inquiry: {inquiry_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[settings.COMPANY_EMAIL]
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/corporate_admin_notification.html', context,
+            subject=f'🏢 New Corporate Inquiry: {inquiry_number}',
+            to=[settings.COMPANY_EMAIL],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
         
         # Send email
         msg.send()
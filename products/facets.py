@@ -0,0 +1,135 @@
+"""
+Catalog facets (category, price-range and tag counts)
+
+All counts come from a single conditional-aggregation query over the
+in-stock catalog: one COUNT(...) FILTER (WHERE ...) per facet value.
+Facets are disjunctive - the category counts ignore the active category
+filter (but respect price/featured/search), and so on - so the UI can show
+how many products each alternative choice would return.
+
+Results are cached per filter combination under a catalog version token
+that products/signals.py bumps whenever a product is saved or deleted.
+Both live in the 'shared' cache, so a bump made by one worker process
+invalidates the facets cached by every other one.
+"""
+
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Q
+
+
+FACETS_TIMEOUT = getattr(settings, 'PRODUCT_FACETS_CACHE_TIMEOUT', 60 * 10)
+
+CATALOG_VERSION_KEY = 'product_catalog_version'
+
+# (min, max) in INR; max is exclusive, None means open ended
+PRICE_BUCKETS = getattr(settings, 'PRODUCT_PRICE_BUCKETS', (
+    (0, 500),
+    (500, 1000),
+    (1000, 2500),
+    (2500, 5000),
+    (5000, None),
+))
+
+
+def catalog_version():
+    """Current catalog version token (changes whenever any product changes)"""
+    shared = caches['shared']
+    version = shared.get(CATALOG_VERSION_KEY)
+    if version is None:
+        shared.add(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+        version = shared.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached facet result at once
+    A fresh random token rather than incr(): no read-modify-write, and a
+    shared cache that lost the key can't hand out an old number again
+    """
+    caches['shared'].set(CATALOG_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def bucket_condition(low, high):
+    condition = Q(price__gte=low)
+    if high is not None:
+        condition &= Q(price__lt=high)
+    return condition
+
+
+def combine(conditions, exclude=None):
+    """AND together every active filter except `exclude`"""
+    combined = Q()
+    for name, condition in conditions.items():
+        if name != exclude:
+            combined &= condition
+    return combined
+
+
+def facets_cache_key(conditions, search):
+    raw = repr(sorted((name, str(condition)) for name, condition in conditions.items())) + repr(search)
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'product_facets_{catalog_version()}_{digest}'
+
+
+def compute_facets(conditions, search=None):
+    """Run the single aggregate query and shape the response"""
+    from .models import PRODUCT_TAGS, Product, tag_filter
+
+    queryset = Product.objects.filter(in_stock=True)
+    if search:
+        # Matches as a subquery of the aggregate, still one query
+        from .search import search_products
+        queryset = search_products(queryset, search, ranked=False)
+
+    everything = combine(conditions)
+    without_category = combine(conditions, exclude='category')
+    without_price = combine(conditions, exclude='price')
+    without_tags = combine(conditions, exclude='tags')
+
+    aggregates = {'total': Count('pk', filter=everything)}
+    for value, label in Product.CATEGORY_CHOICES:
+        aggregates[f'category__{value}'] = Count('pk', filter=without_category & Q(category=value))
+    for index, (low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f'price__{index}'] = Count('pk', filter=without_price & bucket_condition(low, high))
+    for slug, field, label in PRODUCT_TAGS:
+        aggregates[f'tag__{slug}'] = Count('pk', filter=without_tags & tag_filter([slug]))
+
+    counts = queryset.aggregate(**aggregates)
+
+    return {
+        'total': counts['total'],
+        'categories': [
+            {'value': value, 'label': label, 'count': counts[f'category__{value}']}
+            for value, label in Product.CATEGORY_CHOICES
+        ],
+        'price_ranges': [
+            {'min': low, 'max': high, 'count': counts[f'price__{index}']}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        'tags': [
+            {'value': slug, 'label': label, 'count': counts[f'tag__{slug}']}
+            for slug, field, label in PRODUCT_TAGS
+        ],
+    }
+
+
+def get_facets(conditions, search=None):
+    """
+    Cached facet counts for the given filters
+
+    Args:
+        conditions: {facet name: Q} from ProductViewSet.get_filter_conditions
+        search: Raw search string, or None
+    """
+    shared = caches['shared']
+    key = facets_cache_key(conditions, search)
+    facets = shared.get(key)
+    if facets is None:
+        facets = compute_facets(conditions, search)
+        shared.set(key, facets, FACETS_TIMEOUT)
+    return facets
@@ -0,0 +1,84 @@
+"""
+Per-product serialized fragment cache
+
+ProductSerializer does real work for every card (tags, Cloudinary URL,
+absolute URI), so each product's JSON is cached on its own:
+- key: serializer class + product id, value: (updated_at stamp, host,
+  serialized dict), so each representation is cached separately
+- a fragment is only used while its stamp matches the row's updated_at
+- products/signals.py drops the fragment on post_save / post_delete
+A list page therefore costs the (light) page query plus one get_many;
+only the misses are serialized, with a single query for all of them.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# How long an unused fragment stays in the cache (seconds)
+FRAGMENT_TIMEOUT = getattr(settings, 'PRODUCT_FRAGMENT_CACHE_TIMEOUT', 60 * 60)
+
+# Columns a list page needs before fragments are looked up:
+# the cache key plus every column the catalog can be sorted by
+PAGE_FIELDS = ('id', 'updated_at', 'created_at', 'price', 'is_featured')
+
+
+def fragment_key(pk, serializer_class):
+    return f'product_fragment_{serializer_class.__name__}_{pk}'
+
+
+def fragment_serializers():
+    """Serializers whose fragments may be cached (ProductSerializer and subclasses)"""
+    from .serializers import ProductSerializer
+
+    return [ProductSerializer, *ProductSerializer.__subclasses__()]
+
+
+def fragment_stamp(product):
+    return product.updated_at.isoformat() if product.updated_at else ''
+
+
+def invalidate_fragment(pk):
+    """Drop the cached JSON of a single product, in every representation"""
+    cache.delete_many([fragment_key(pk, serializer_class) for serializer_class in fragment_serializers()])
+
+
+def render_products(products, serializer_class, context):
+    """
+    Serialize a page of products, reusing cached fragments
+
+    Args:
+        products: Product instances in page order (only PAGE_FIELDS needed)
+        serializer_class: Product serializer used for cache misses
+        context: Serializer context (request)
+
+    Returns:
+        list: Serialized products in the same order
+    """
+    from .models import Product
+
+    request = context.get('request')
+    host = request.get_host() if request else ''
+
+    cached = cache.get_many([fragment_key(product.pk, serializer_class) for product in products])
+
+    data = {}
+    missing = []
+    for product in products:
+        entry = cached.get(fragment_key(product.pk, serializer_class))
+        if entry and entry[0] == fragment_stamp(product) and entry[1] == host:
+            data[product.pk] = entry[2]
+        else:
+            missing.append(product.pk)
+
+    if missing:
+        columns = serializer_class.columns_for(serializer_class.Meta.fields)
+        fresh = list(Product.objects.filter(pk__in=missing).only('updated_at', *columns))
+        serialized = serializer_class(fresh, many=True, context=context).data
+        to_cache = {}
+        for product, item in zip(fresh, serialized):
+            data[product.pk] = dict(item)
+            to_cache[fragment_key(product.pk, serializer_class)] = (fragment_stamp(product), host, dict(item))
+        cache.set_many(to_cache, FRAGMENT_TIMEOUT)
+
+    return [data[product.pk] for product in products if product.pk in data]
@@ -0,0 +1,211 @@
+"""
+Razorpay gateway access
+
+- one razorpay.Client per process, on a keep-alive requests.Session with a
+  bounded connection pool, so calls reuse TLS connections
+- every call has connect/read deadlines (RAZORPAY_CONNECT_TIMEOUT /
+  RAZORPAY_READ_TIMEOUT), so a slow gateway can't pin a sync worker
+- a circuit breaker fails fast (GatewayUnavailable) after repeated
+  timeouts / 5xx / unparseable responses, and lets a single trial call through once
+  RAZORPAY_BREAKER_RESET seconds have passed
+- payment and webhook signatures are verified locally (HMAC-SHA256),
+  no client needed
+
+With RAZORPAY_STUB = True (env RAZORPAY_STUB=True) calls go to StubClient,
+an in-process fake gateway for tests and local development; stub_signature()
+signs payments the way checkout.js would receive them.
+"""
+
+import hashlib
+import hmac
+import logging
+import threading
+import time
+import uuid
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = getattr(settings, 'RAZORPAY_CONNECT_TIMEOUT', 3)
+READ_TIMEOUT = getattr(settings, 'RAZORPAY_READ_TIMEOUT', 10)
+POOL_SIZE = getattr(settings, 'RAZORPAY_POOL_SIZE', 4)
+
+# Consecutive failures that open the breaker, and seconds before a retry
+BREAKER_THRESHOLD = getattr(settings, 'RAZORPAY_BREAKER_THRESHOLD', 5)
+BREAKER_RESET = getattr(settings, 'RAZORPAY_BREAKER_RESET', 30)
+
+# Errors that mean the gateway is unhealthy: network failures, 5xx answers,
+# and bodies that aren't JSON (an HTML error page from a proxy raises a
+# JSONDecodeError, a ValueError)
+GATEWAY_ERRORS = (
+    requests.RequestException,
+    ValueError,
+    razorpay.errors.ServerError,
+    razorpay.errors.GatewayError,
+)
+
+
+class GatewayUnavailable(Exception):
+    """Razorpay is unreachable, too slow, or the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures; after `reset`
+    seconds one trial call is let through (half open) and its outcome closes
+    or re-opens the breaker. State is per process.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset = reset
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_running or time.monotonic() - self.opened_at < self.reset:
+                return False
+            self.trial_running = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Razorpay circuit breaker opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        """Run func through the breaker, translating gateway failures"""
+        if not self.allow():
+            raise GatewayUnavailable('Payment gateway is temporarily unavailable')
+        try:
+            result = func(*args, **kwargs)
+        except razorpay.errors.BadRequestError:
+            # The gateway answered; a rejected request says nothing about its health
+            self.record_success()
+            raise
+        except GATEWAY_ERRORS as e:
+            self.record_failure()
+            raise GatewayUnavailable(f'Payment gateway error: {e}') from e
+        except BaseException:
+            # Unknown outcome: don't count it as healthy (and don't leave a
+            # half-open trial running forever)
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+class TimeoutSession(requests.Session):
+    """Session that applies the gateway deadlines to every request"""
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault('timeout', (CONNECT_TIMEOUT, READ_TIMEOUT))
+        return super().request(*args, **kwargs)
+
+
+class StubClient:
+    """
+    Fake gateway for tests and local development (RAZORPAY_STUB = True)
+    Mirrors the parts of razorpay.Client this app uses.
+    """
+
+    class Orders:
+        def create(self, data=None, **kwargs):
+            data = data or {}
+            return {
+                'id': f"order_stub{uuid.uuid4().hex[:14]}",
+                'entity': 'order',
+                'amount': data.get('amount', 0),
+                'amount_paid': 0,
+                'currency': data.get('currency', 'INR'),
+                'receipt': data.get('receipt'),
+                'notes': data.get('notes', {}),
+                'status': 'created',
+                'created_at': int(time.time()),
+            }
+
+    def __init__(self):
+        self.order = self.Orders()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+breaker = CircuitBreaker()
+
+
+def get_client():
+    """Process-wide Razorpay client (created on first use)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                if getattr(settings, 'RAZORPAY_STUB', False):
+                    _client = StubClient()
+                else:
+                    session = TimeoutSession()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                    session.mount('https://', adapter)
+                    _client = razorpay.Client(
+                        auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET),
+                        session=session,
+                    )
+    return _client
+
+
+def create_order(data):
+    """
+    Create a Razorpay order
+
+    Raises:
+        GatewayUnavailable: timeout, connection error, 5xx or breaker open
+    """
+    return breaker.call(get_client().order.create, data=data)
+
+
+def sign(message):
+    return hmac.new(
+        settings.RAZORPAY_KEY_SECRET.encode('utf-8'),
+        message.encode('utf-8'),
+        hashlib.sha256,
+    ).hexdigest()
+
+
+def verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature):
+    """Check the checkout signature locally: HMAC-SHA256(order_id|payment_id)"""
+    expected = sign(f"{razorpay_order_id}|{razorpay_payment_id}")
+    return hmac.compare_digest(expected, str(razorpay_signature))
+
+
+def verify_webhook_signature(body, signature):
+    """Check X-Razorpay-Signature: HMAC-SHA256 of the raw body with the webhook secret"""
+    secret = getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', '')
+    if not secret or not signature:
+        return False
+    expected = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, str(signature))
+
+
+def stub_signature(razorpay_order_id, razorpay_payment_id):
+    """Signature checkout.js would hand back for a payment (tests / stub gateway)"""
+    return sign(f"{razorpay_order_id}|{razorpay_payment_id}")
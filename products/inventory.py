@@ -0,0 +1,280 @@
+"""
+Stock reservations for Razorpay checkouts
+
+    create_razorpay_order -> reserve_stock()   units move to reserved_quantity
+                             (under a provisional reference, before the
+                             Razorpay order exists; rename_holds() then
+                             keys them by its id, release_stock() gives
+                             them back if the order can't be created)
+    verify_payment        -> confirm_stock()   reserved units become a sale
+    sweeper               -> release_expired_holds()
+                             a release_expired_stock_holds job, scheduled
+                             for when the first hold expires and run by
+                             `manage.py run_jobs` (or Celery); product
+                             list / detail requests also sweep, so stock
+                             comes back even without a worker
+
+Every change is a single conditional UPDATE ... SET x = x + n WHERE ...
+on the product row, so the database serialises concurrent checkouts from
+any number of gunicorn workers: a hold is only taken while
+stock_quantity - reserved_quantity covers it, and each StockHold row is
+claimed (held -> confirmed / released) by exactly one caller.
+
+in_stock is recomputed in the same UPDATE from the remaining available
+stock. QuerySet.update() skips auto_now and the post_save signals, so
+updated_at is set explicitly (product fragments and conditional GET
+validators key on it) and the facet cache is invalidated afterwards.
+"""
+
+import logging
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min, Value
+from django.db.models.functions import Greatest
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
+
+from .facets import bump_catalog_version
+
+
+logger = logging.getLogger(__name__)
+
+# How long a checkout may keep stock before the sweeper releases it
+HOLD_TTL = timedelta(seconds=getattr(settings, 'STOCK_HOLD_TTL', 15 * 60))
+
+
+class InsufficientStock(Exception):
+    """Raised when a cart asks for more units than are available"""
+
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(product.name for product in products)
+        super().__init__(f"Not enough stock for: {names}")
+
+
+def in_stock_after(change):
+    """in_stock for a row once its available stock drops by `change` units"""
+    return GreaterThan(F('stock_quantity') - F('reserved_quantity') - change, 0)
+
+
+def cart_quantities(lines):
+    """Total units per product id for priced cart lines (products may repeat)"""
+    quantities = Counter()
+    for line in lines:
+        quantities[line.product.pk] += line.quantity
+    return quantities
+
+
+def reserve_stock(lines, reference, ttl=HOLD_TTL):
+    """
+    Hold stock for every cart line, all or nothing
+
+    Args:
+        lines: CartLine list from pricing.quote_cart
+        reference: Razorpay order ID the holds belong to
+        ttl: How long the holds last
+
+    Raises:
+        InsufficientStock: some product can't cover its quantity
+    """
+    from .models import Product, StockHold
+
+    quantities = cart_quantities(lines)
+
+    # Stock from abandoned checkouts is available again
+    release_expired_holds(product_ids=list(quantities))
+
+    now = timezone.now()
+    short = []
+    with transaction.atomic():
+        # Fixed row order so concurrent checkouts can't deadlock
+        for product_id, quantity in sorted(quantities.items()):
+            updated = Product.objects.filter(
+                pk=product_id,
+                stock_quantity__gte=F('reserved_quantity') + quantity,
+            ).update(
+                reserved_quantity=F('reserved_quantity') + quantity,
+                in_stock=in_stock_after(quantity),
+                updated_at=now,
+            )
+            if not updated:
+                short.append(product_id)
+
+        if short:
+            products = {line.product.pk: line.product for line in lines}
+            raise InsufficientStock([products[product_id] for product_id in short])
+
+        StockHold.objects.bulk_create([
+            StockHold(reference=reference, product_id=product_id, quantity=quantity, expires_at=now + ttl)
+            for product_id, quantity in quantities.items()
+        ])
+        schedule_sweep(now + ttl)
+
+    bump_catalog_version()
+
+
+def schedule_sweep(run_after):
+    """Queue the sweeper job for `run_after`, unless one is already due by then"""
+    from .jobs import schedule
+    from .models import Job
+    from .tasks import release_expired_stock_holds
+
+    if Job.objects.filter(
+        task=release_expired_stock_holds.name, status='queued', run_after__lte=run_after
+    ).exists():
+        return
+    schedule(release_expired_stock_holds, run_after)
+
+
+def schedule_next_sweep():
+    """Queue the sweeper job for the next hold to expire, if any"""
+    from .models import StockHold
+
+    next_expiry = StockHold.objects.filter(status='held').aggregate(next=Min('expires_at'))['next']
+    if next_expiry is not None:
+        schedule_sweep(next_expiry)
+
+
+def set_stock(product_id, quantity):
+    """
+    Set a product's stock count (staff edits)
+
+    reserved_quantity is left as the checkouts moved it, and in_stock is
+    recomputed from it in the same UPDATE, so an edit can't undo a hold
+    taken while the admin form was open.
+    """
+    from .models import Product
+
+    Product.objects.filter(pk=product_id).update(
+        stock_quantity=quantity,
+        in_stock=GreaterThan(Value(quantity) - F('reserved_quantity'), 0),
+        updated_at=timezone.now(),
+    )
+    transaction.on_commit(bump_catalog_version)
+
+
+def new_hold_reference():
+    """Provisional reference for holds taken before the Razorpay order exists"""
+    return f'checkout_{uuid.uuid4().hex}'
+
+
+def rename_holds(reference, new_reference):
+    """Key a checkout's holds by the Razorpay order ID once it is known"""
+    from .models import StockHold
+
+    StockHold.objects.filter(reference=reference).update(reference=new_reference, updated_at=timezone.now())
+
+
+def confirm_stock(reference, quantities):
+    """
+    Turn the checkout's holds into a sale
+
+    Held units are confirmed; units whose hold already expired (or that
+    were never held) are taken from the available stock if possible.
+    Must run inside the transaction that creates the order.
+
+    Args:
+        reference: Razorpay order ID
+        quantities: {product id: units sold}
+
+    Returns:
+        {product id: units} that could not be covered (oversold)
+    """
+    from .models import Product, StockHold
+
+    now = timezone.now()
+    remaining = Counter(quantities)
+
+    for hold in StockHold.objects.filter(reference=reference, status='held').order_by('product_id'):
+        # Claim the hold; loses cleanly against the sweeper or a retry
+        if not StockHold.objects.filter(pk=hold.pk, status='held').update(status='confirmed', updated_at=now):
+            continue
+
+        sold = min(hold.quantity, remaining[hold.product_id])
+        Product.objects.filter(pk=hold.product_id).update(
+            stock_quantity=Greatest(F('stock_quantity') - sold, 0),
+            reserved_quantity=Greatest(F('reserved_quantity') - hold.quantity, 0),
+            in_stock=in_stock_after(sold - hold.quantity),
+            updated_at=now,
+        )
+        remaining[hold.product_id] -= sold
+
+    shortfall = {}
+    for product_id, quantity in sorted(remaining.items()):
+        if quantity <= 0:
+            continue
+        updated = Product.objects.filter(
+            pk=product_id,
+            stock_quantity__gte=F('reserved_quantity') + quantity,
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            in_stock=in_stock_after(quantity),
+            updated_at=now,
+        )
+        if not updated:
+            shortfall[product_id] = quantity
+
+    transaction.on_commit(bump_catalog_version)
+    if shortfall:
+        logger.warning(f"Checkout {reference} oversold products: {shortfall}")
+    return shortfall
+
+
+def release_holds(holds, now):
+    """Claim each held row of `holds` and return its units; returns the number released"""
+    from .models import Product, StockHold
+
+    released = 0
+    for hold in holds.filter(status='held').only('pk', 'product_id', 'quantity'):
+        with transaction.atomic():
+            if not StockHold.objects.filter(pk=hold.pk, status='held').update(status='released', updated_at=now):
+                continue
+            Product.objects.filter(pk=hold.product_id).update(
+                reserved_quantity=Greatest(F('reserved_quantity') - hold.quantity, 0),
+                in_stock=in_stock_after(-hold.quantity),
+                updated_at=now,
+            )
+            released += 1
+    if released:
+        bump_catalog_version()
+    return released
+
+
+def release_stock(reference):
+    """
+    Give back the holds of a checkout that won't go ahead
+    (e.g. the Razorpay order could not be created)
+
+    Returns:
+        Number of holds released
+    """
+    from .models import StockHold
+
+    return release_holds(StockHold.objects.filter(reference=reference), timezone.now())
+
+
+def release_expired_holds(product_ids=None):
+    """
+    Return the stock of expired holds (the sweeper)
+
+    Args:
+        product_ids: Only sweep these products (None sweeps everything)
+
+    Returns:
+        Number of holds released
+    """
+    from .models import StockHold
+
+    now = timezone.now()
+    expired = StockHold.objects.filter(expires_at__lte=now)
+    if product_ids is not None:
+        expired = expired.filter(product_id__in=product_ids)
+
+    released = release_holds(expired, now)
+    if released:
+        logger.info(f"Released {released} expired stock holds")
+    return released
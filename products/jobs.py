@@ -0,0 +1,214 @@
+"""
+Durable job queue (transactional outbox)
+
+Emails and other follow-up work are stored as Job rows by enqueue(), in the
+same transaction as the order / registration / inquiry that caused them:
+if the request rolls back there is no job, and once it commits the job
+can't be lost. The request never talks to the mail server.
+
+Jobs are run by:
+- `manage.py run_jobs`: a worker that claims due jobs and runs them on a
+  thread pool (the deployment default; see --help)
+- Celery, when CELERY_ENABLED: each job is handed to the run_job task as
+  soon as it commits, and the drain_jobs beat task picks up anything the
+  broker missed. If the broker is down the job simply waits in the table
+- the request itself, when JOB_RUN_INLINE is set and Celery is off: for
+  deployments without a worker process, each job runs right after its
+  transaction commits (the pre-queue behaviour); failed attempts still
+  wait in the table for a worker
+
+A job is claimed with a conditional UPDATE (queued -> running), so the
+worker and Celery never run it twice at the same time. Failures are
+retried with exponential backoff (JOB_BACKOFF_BASE * 2^n, capped at
+JOB_BACKOFF_MAX) until JOB_MAX_ATTEMPTS, then the job is marked failed.
+Jobs running longer than JOB_LEASE are considered stuck (worker killed
+mid-job) and are queued again; job_stats() and `run_jobs --status` show
+the queue depth, oldest due job, stuck and failed jobs.
+
+A job is any Celery task of this project (called directly, so its code
+runs unchanged); its arguments must be JSON-serializable.
+"""
+
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = getattr(settings, 'JOB_MAX_ATTEMPTS', 5)
+BACKOFF_BASE = getattr(settings, 'JOB_BACKOFF_BASE', 30)  # seconds
+BACKOFF_MAX = getattr(settings, 'JOB_BACKOFF_MAX', 60 * 60)
+LEASE = timedelta(seconds=getattr(settings, 'JOB_LEASE', 10 * 60))
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue(task, *args, **kwargs):
+    """
+    Store a job for a task; commits with the caller's transaction
+
+    Args:
+        task: Celery task (its name is stored, e.g. products.tasks.send_...)
+        *args, **kwargs: JSON-serializable task arguments
+
+    Returns:
+        Job
+    """
+    return schedule(task, None, *args, **kwargs)
+
+
+def schedule(task, run_after, *args, **kwargs):
+    """enqueue() for a job that must not run before `run_after` (None: now)"""
+    from .models import Job
+
+    job = Job.objects.create(
+        task=task.name, args=list(args), kwargs=kwargs, max_attempts=MAX_ATTEMPTS,
+        run_after=run_after or timezone.now(),
+    )
+    transaction.on_commit(lambda: dispatch(job.pk, run_after))
+    return job
+
+
+def dispatch(job_pk, eta=None):
+    """Hand a committed job to Celery (or run it inline); otherwise the worker polls for it"""
+    if not getattr(settings, 'CELERY_ENABLED', False):
+        if getattr(settings, 'JOB_RUN_INLINE', False) and eta is None:
+            # No worker deployed: run it now, in this request
+            try:
+                run(job_pk)
+            except Exception as e:
+                logger.error(f"Job {job_pk} could not be run inline: {e}")
+        return
+    from .tasks import run_job
+
+    try:
+        run_job.apply_async((job_pk,), eta=eta)
+    except Exception as e:
+        # Broker unreachable: the job stays queued for drain_jobs / run_jobs
+        logger.warning(f"Could not hand job {job_pk} to Celery ({e}), leaving it queued")
+
+
+def backoff(attempts):
+    """Seconds before attempt number `attempts + 1`"""
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+
+def claim(job_pk, worker=None):
+    """Mark a due job as running; False when someone else got it first"""
+    from .models import Job
+
+    now = timezone.now()
+    return Job.objects.filter(pk=job_pk, status='queued', run_after__lte=now).update(
+        status='running',
+        locked_by=(worker or worker_id())[:200],
+        locked_at=now,
+        attempts=F('attempts') + 1,
+        updated_at=now,
+    ) == 1
+
+
+def claim_due(limit, worker=None):
+    """Claim up to `limit` due jobs, oldest first; returns their primary keys"""
+    from .models import Job
+
+    candidates = Job.objects.filter(
+        status='queued', run_after__lte=timezone.now()
+    ).order_by('run_after', 'pk').values_list('pk', flat=True)[:limit * 2]
+    claimed = []
+    for job_pk in candidates:
+        if claim(job_pk, worker):
+            claimed.append(job_pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def execute(job_pk):
+    """
+    Run a claimed job and record the outcome
+
+    Returns:
+        'done', 'retry' or 'failed'
+    """
+    from .models import Job
+
+    job = Job.objects.get(pk=job_pk)
+    try:
+        task = import_string(job.task)
+        task(*job.args, **job.kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:2000]
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            logger.error(f"Job {job.pk} ({job.task}) failed permanently: {error}")
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', last_error=error, finished_at=now, updated_at=now
+            )
+            return 'failed'
+        delay = backoff(job.attempts)
+        logger.warning(f"Job {job.pk} ({job.task}) failed, retrying in {delay}s: {error}")
+        Job.objects.filter(pk=job.pk).update(
+            status='queued', last_error=error, run_after=now + timedelta(seconds=delay),
+            locked_by='', locked_at=None, updated_at=now
+        )
+        return 'retry'
+
+    now = timezone.now()
+    Job.objects.filter(pk=job.pk).update(status='done', finished_at=now, updated_at=now)
+    return 'done'
+
+
+def run(job_pk, worker=None):
+    """Claim and execute one job (Celery path); None if it wasn't claimable"""
+    if not claim(job_pk, worker):
+        return None
+    return execute(job_pk)
+
+
+def run_in_thread(job_pk):
+    """execute() for pool threads: each thread uses and closes its own connection"""
+    close_old_connections()
+    try:
+        return execute(job_pk)
+    except Exception as e:
+        logger.error(f"Job {job_pk} could not be executed: {e}")
+        return 'retry'
+    finally:
+        close_old_connections()
+
+
+def requeue_stuck():
+    """Queue again jobs whose worker died mid-run; returns how many"""
+    from .models import Job
+
+    now = timezone.now()
+    return Job.objects.filter(status='running', locked_at__lt=now - LEASE).update(
+        status='queued', locked_by='', locked_at=None, run_after=now,
+        last_error='Requeued: worker lease expired', updated_at=now
+    )
+
+
+def job_stats():
+    """Queue health: counts per status, oldest due job age, stuck jobs"""
+    from .models import Job
+
+    now = timezone.now()
+    counts = dict(Job.objects.values('status').annotate(total=Count('pk')).values_list('status', 'total'))
+    oldest_due = Job.objects.filter(status='queued', run_after__lte=now).aggregate(oldest=Min('run_after'))['oldest']
+    return {
+        'counts': counts,
+        'oldest_due_seconds': int((now - oldest_due).total_seconds()) if oldest_due else 0,
+        'stuck': Job.objects.filter(status='running', locked_at__lt=now - LEASE).count(),
+        'failed': counts.get('failed', 0),
+    }
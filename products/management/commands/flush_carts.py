@@ -0,0 +1,41 @@
+"""
+Write changed server-side carts behind to CartItem
+
+Same flush as the flush_dirty_carts Celery beat task, for deployments
+that run without Celery. Only needed with the Redis cart store; the
+process-local memory store writes every change through already.
+
+Usage:
+    python manage.py flush_carts                # flush once (cron)
+    python manage.py flush_carts --every 30     # flush every 30 seconds until stopped
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.carts import flush_dirty_carts, get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Write changed server-side carts to the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=float, default=0,
+                            help='Keep flushing every N seconds instead of exiting (default: flush once)')
+
+    def handle(self, *args, **options):
+        if not get_cart_store().shared:
+            self.stdout.write(self.style.SUCCESS('✓ Cart store writes through, nothing to flush'))
+            return
+
+        try:
+            while True:
+                written = flush_dirty_carts()
+                if options['every'] <= 0 or options['verbosity'] >= 2:
+                    self.stdout.write(self.style.SUCCESS(f'✓ Wrote {written} changed carts'))
+                if options['every'] <= 0:
+                    break
+                time.sleep(options['every'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping')
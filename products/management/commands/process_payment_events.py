@@ -0,0 +1,25 @@
+"""
+Finalize payment events the queue never finished
+
+Events are finalized by their process_payment_event job; this picks up
+the ones whose job ran out of attempts (same sweep as the
+process_pending_payment_events Celery beat task).
+
+Usage:
+    python manage.py process_payment_events
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.checkout import process_event, stale_events
+
+
+class Command(BaseCommand):
+    help = 'Process stored Razorpay payment events that are still pending'
+
+    def handle(self, *args, **options):
+        pending = stale_events()
+        failed = [event_pk for event_pk in pending if not process_event(event_pk)]
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Processed {len(pending) - len(failed)} payment events ({len(failed)} will be retried)'
+        ))
@@ -0,0 +1,21 @@
+"""
+Release stock held by abandoned checkouts
+
+Same sweep as the release_expired_stock_holds job, which run_jobs runs
+when the first hold expires; for running it by hand or from cron.
+
+Usage:
+    python manage.py release_stock_holds
+"""
+
+from django.core.management.base import BaseCommand
+
+from products.inventory import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Release expired checkout stock holds'
+
+    def handle(self, *args, **options):
+        released = release_expired_holds()
+        self.stdout.write(self.style.SUCCESS(f'✓ Released {released} expired stock holds'))
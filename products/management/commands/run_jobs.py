@@ -0,0 +1,93 @@
+"""
+Background job worker
+
+Drains the Job table (products/jobs.py): claims due jobs, runs them on a
+thread pool and records the outcome. Failed jobs are retried with backoff,
+jobs whose worker died are requeued after JOB_LEASE. Several workers can
+run side by side; a job is only ever claimed by one of them.
+
+Usage:
+    python manage.py run_jobs                    # run until stopped
+    python manage.py run_jobs --concurrency 8
+    python manage.py run_jobs --once             # drain what is due, then exit (cron)
+    python manage.py run_jobs --status           # queue depth, stuck and failed jobs
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from products.jobs import claim_due, job_stats, requeue_stuck, run_in_thread, worker_id
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (order, registration and inquiry emails)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Jobs run at the same time (default: 4)')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Seconds to wait when no job is due (default: 2)')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no job is due instead of polling')
+        parser.add_argument('--status', action='store_true',
+                            help='Print queue health and exit')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.print_status()
+            return
+
+        concurrency = max(options['concurrency'], 1)
+        worker = worker_id()
+        totals = {'done': 0, 'retry': 0, 'failed': 0}
+        self.stdout.write(f'Running jobs as {worker} (concurrency {concurrency})')
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                while True:
+                    requeued = requeue_stuck()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f'Requeued {requeued} stuck job(s)'))
+
+                    # Keep every thread busy; one slow email doesn't hold up the rest
+                    free = concurrency - len(running)
+                    if free:
+                        for job_pk in claim_due(free, worker):
+                            running.add(executor.submit(run_in_thread, job_pk))
+
+                    if not running:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll'])
+                        continue
+
+                    finished, running = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        outcome = future.result()
+                        totals[outcome] += 1
+                        if options['verbosity'] >= 2:
+                            self.stdout.write(f'  {outcome}')
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping (claimed jobs are finishing)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {totals['done']} job(s) done, {totals['retry']} to retry, {totals['failed']} failed"
+        ))
+
+    def print_status(self):
+        stats = job_stats()
+        counts = stats['counts']
+        self.stdout.write(
+            f"queued {counts.get('queued', 0)}  running {counts.get('running', 0)}  "
+            f"done {counts.get('done', 0)}  failed {counts.get('failed', 0)}"
+        )
+        self.stdout.write(f"oldest due job waiting {stats['oldest_due_seconds']}s")
+        if stats['stuck'] or stats['failed']:
+            self.stdout.write(self.style.WARNING(
+                f"{stats['stuck']} stuck job(s), {stats['failed']} failed job(s) (see admin: Background Jobs)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ No stuck or failed jobs'))
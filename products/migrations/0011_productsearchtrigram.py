@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-17 16:25
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copied from products/search.py as of this migration, so later changes
+# to the live module don't change what this migration does
+FIELD_WEIGHTS = (
+    ('name', 3),
+    ('short_description', 2),
+    ('description', 1),
+)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def build_trigram_weights(product):
+    """{trigram: weight} for a product, keeping the highest field weight"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for word in WORD_RE.findall((getattr(product, field, '') or '').lower()):
+            padded = f"  {word} "
+            for i in range(len(padded) - 2):
+                gram = padded[i:i + 3]
+                if weights.get(gram, 0) < weight:
+                    weights[gram] = weight
+    return weights
+
+
+def build_search_index(apps, schema_editor):
+    """Index every existing product so search works straight after migrating"""
+    Product = apps.get_model('products', 'Product')
+    ProductSearchTrigram = apps.get_model('products', 'ProductSearchTrigram')
+
+    rows = []
+    for product in Product.objects.all():
+        rows.extend(
+            ProductSearchTrigram(trigram=gram, product_id=product.pk, weight=weight)
+            for gram, weight in build_trigram_weights(product).items()
+        )
+    ProductSearchTrigram.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_alter_customorder_reference_images_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField(default=1, help_text='Highest field weight the trigram appears in (name > short description > description)')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Product Search Trigram',
+                'verbose_name_plural': 'Product Search Trigrams',
+                'unique_together': {('trigram', 'product')},
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 18:05
+
+from django.db import migrations, models
+
+
+def fill_tag_masks(apps, schema_editor):
+    """Compute tag_mask for existing products"""
+    from products.models import PRODUCT_TAGS, TAG_BITS
+
+    Product = apps.get_model('products', 'Product')
+    for slug, field, label in PRODUCT_TAGS:
+        Product.objects.filter(**{field: True}).update(tag_mask=models.F('tag_mask').bitor(TAG_BITS[slug]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_product_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='tag_mask',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Bitmask of the tag booleans above (kept in sync on save)'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['in_stock', 'tag_mask'], name='product_stock_tags_idx'),
+        ),
+        migrations.RunPython(fill_tag_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 6.0 on 2026-10-17 20:10
+
+import re
+
+from django.db import migrations, models
+
+
+def copy_razorpay_ids(apps, schema_editor):
+    """Move the Razorpay ids verify_payment used to write into internal_notes"""
+    Order = apps.get_model('products', 'Order')
+    pattern = re.compile(r'Order ID: (\S+)\nPayment ID: (\S+)')
+
+    seen_orders, seen_payments = set(), set()
+    for order in Order.objects.filter(internal_notes__startswith='Razorpay Payment').order_by('pk'):
+        match = pattern.search(order.internal_notes)
+        if not match:
+            continue
+        razorpay_order_id, razorpay_payment_id = match.groups()
+        # Earlier duplicates of the same payment keep their notes only
+        if razorpay_order_id in seen_orders or razorpay_payment_id in seen_payments:
+            continue
+        seen_orders.add(razorpay_order_id)
+        seen_payments.add(razorpay_payment_id)
+        Order.objects.filter(pk=order.pk).update(
+            razorpay_order_id=razorpay_order_id,
+            razorpay_payment_id=razorpay_payment_id,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_stock_holds'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='payment_method',
+            field=models.CharField(choices=[('cod', 'Cash on Delivery'), ('upi', 'UPI'), ('card', 'Credit/Debit Card'), ('netbanking', 'Net Banking'), ('wallet', 'Digital Wallet'), ('razorpay', 'Razorpay')], default='cod', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='razorpay_order_id',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='razorpay_payment_id',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.RunPython(copy_razorpay_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 6.0 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_order_razorpay_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingCheckout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('razorpay_order_id', models.CharField(max_length=100, unique=True)),
+                ('order_data', models.JSONField(help_text='OrderSerializer input')),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Amount charged (₹)', max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Pending Checkout',
+                'verbose_name_plural': 'Pending Checkouts',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(help_text='Razorpay event ID (deduplicates retries)', max_length=100, unique=True)),
+                ('source', models.CharField(choices=[('webhook', 'Razorpay Webhook'), ('checkout', 'Browser Checkout')], max_length=20)),
+                ('event_type', models.CharField(max_length=50)),
+                ('razorpay_order_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('razorpay_payment_id', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField(default=dict, help_text='Raw event body')),
+                ('status', models.CharField(choices=[('received', 'Received'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')], default='received', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Payment Event',
+                'verbose_name_plural': 'Payment Events',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='paymentevent_status_idx')],
+            },
+        ),
+    ]
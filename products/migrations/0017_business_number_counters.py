@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-17 21:40
+
+from django.db import migrations, models
+
+
+def create_sequences(apps, schema_editor):
+    """PostgreSQL: one sequence per business number, leased in blocks"""
+    from products.numbering import BLOCK_SIZE, SEQUENCES, sequence_name
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEQUENCES:
+        schema_editor.execute(
+            f'CREATE SEQUENCE IF NOT EXISTS {sequence_name(name)} START 1 INCREMENT BY {BLOCK_SIZE}'
+        )
+
+
+def drop_sequences(apps, schema_editor):
+    from products.numbering import SEQUENCES, sequence_name
+
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in SEQUENCES:
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {sequence_name(name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_payment_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusinessNumberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+            ],
+            options={
+                'verbose_name': 'Business Number Counter',
+                'verbose_name_plural': 'Business Number Counters',
+            },
+        ),
+        migrations.RunPython(create_sequences, drop_sequences),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0 on 2026-10-17 22:40
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_cartitem_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='shipping_tier',
+            field=models.CharField(choices=[('standard', 'Standard'), ('express', 'Express')], default='standard', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ShippingZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text="e.g. 'Mumbai Metro', 'North East'", max_length=100)),
+                ('pincode_prefixes', models.TextField(help_text="Comma separated pincode prefixes, e.g. '400, 401, 41'. The longest matching prefix decides the zone.")),
+                ('is_active', models.BooleanField(default=True)),
+                ('extra_per_kg', models.DecimalField(decimal_places=2, default=50.0, help_text='Charge per kg above the heaviest slab (₹)', max_digits=8)),
+                ('standard_days', models.PositiveIntegerField(default=5, help_text='Standard delivery estimate (days)')),
+                ('express_available', models.BooleanField(default=True)),
+                ('express_days', models.PositiveIntegerField(default=2, help_text='Express delivery estimate (days)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Shipping Zone',
+                'verbose_name_plural': 'Shipping Zones',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShippingRateSlab',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_weight_kg', models.DecimalField(decimal_places=2, help_text='Parcels up to this weight (kg)', max_digits=8, validators=[django.core.validators.MinValueValidator(0.01)])),
+                ('standard_charge', models.DecimalField(decimal_places=2, help_text='Standard shipping (₹)', max_digits=8)),
+                ('express_charge', models.DecimalField(blank=True, decimal_places=2, help_text="Express shipping (₹). Leave blank if express isn't offered for this weight.", max_digits=8, null=True)),
+                ('zone', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slabs', to='products.shippingzone')),
+            ],
+            options={
+                'verbose_name': 'Shipping Rate Slab',
+                'verbose_name_plural': 'Shipping Rate Slabs',
+                'ordering': ['zone', 'max_weight_kg'],
+                'constraints': [models.UniqueConstraint(fields=('zone', 'max_weight_kg'), name='shippingrateslab_unique_weight')],
+            },
+        ),
+    ]
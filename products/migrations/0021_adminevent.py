@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-17 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('order', 'Product Order'), ('workshop', 'Workshop Registration'), ('custom_order', 'Custom Order'), ('corporate', 'Corporate Inquiry')], max_length=20)),
+                ('reference', models.CharField(help_text='Order / registration / inquiry number', max_length=50)),
+                ('summary', models.CharField(max_length=500)),
+                ('admin_url', models.CharField(blank=True, max_length=300)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('digest_sent_at', models.DateTimeField(blank=True, help_text='Empty until a digest included this event', null=True)),
+            ],
+            options={
+                'verbose_name': 'Admin Digest Event',
+                'verbose_name_plural': 'Admin Digest Events',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['digest_sent_at', 'created_at'], name='adminevent_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0 on 2026-10-18 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_adminevent'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_stock_newest_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_stock_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_cat_newest_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_cat_price_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_featured_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_stock_tags_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_at', '-id'], condition=models.Q(in_stock=True), name='product_stock_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], condition=models.Q(in_stock=True), name='product_stock_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(in_stock=True), name='product_cat_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'price', 'id'], condition=models.Q(in_stock=True), name='product_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-is_featured', '-created_at', '-id'], condition=models.Q(in_stock=True), name='product_featured_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['tag_mask'], condition=models.Q(in_stock=True), name='product_stock_tags_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0022_product_partial_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingcheckout',
+            name='quote',
+            field=models.JSONField(blank=True, default=dict, help_text='Priced lines and shipping charged (CartQuote.snapshot)'),
+        ),
+    ]
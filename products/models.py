@@ -3,11 +3,59 @@
 # Database models for the products page
 # These models define the structure of your database tables
 
-from django.db import models
+import uuid
+from functools import lru_cache
+
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.lookups import Exact, GreaterThan
+from django.utils import timezone
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import User
 from cloudinary.models import CloudinaryField
 
+from .numbering import allocate_number
+
+
+# Product tags: (slug, boolean field, label)
+# Each tag gets one bit in Product.tag_mask, in this order - only append
+PRODUCT_TAGS = (
+    ('food_safe', 'is_food_safe', 'Food Safe'),
+    ('microwave_safe', 'is_microwave_safe', 'Microwave Safe'),
+    ('dishwasher_safe', 'is_dishwasher_safe', 'Dishwasher Safe'),
+    ('handmade', 'is_handmade', 'Handmade'),
+)
+TAG_BITS = {slug: 1 << index for index, (slug, field, label) in enumerate(PRODUCT_TAGS)}
+TAG_FIELDS = {field for slug, field, label in PRODUCT_TAGS}
+
+# Fields in_stock is derived from
+STOCK_FIELDS = {'stock_quantity', 'reserved_quantity'}
+
+
+def tag_filter(slugs, match='any'):
+    """
+    Q for products carrying any (or all) of the given tag slugs
+    Evaluated with bitwise operators in SQL: (tag_mask & bits) > 0 / = bits
+    Returns None when none of the slugs is a known tag
+    """
+    bits = 0
+    for slug in slugs:
+        bits |= TAG_BITS.get(slug.strip(), 0)
+    if not bits:
+        return None
+    
+    hits = models.F('tag_mask').bitand(bits)
+    if match == 'all':
+        return models.Q(Exact(hits, bits))
+    return models.Q(GreaterThan(hits, 0))
+
+
+@lru_cache(maxsize=None)
+def tag_labels(mask):
+    """Tag labels for a tag mask (built once per distinct mask)"""
+    return tuple(label for slug, field, label in PRODUCT_TAGS if mask & TAG_BITS[slug])
+
 
 # ====================
 # PRODUCT MODEL
@@ -64,10 +112,20 @@ class Product(models.Model):
     is_microwave_safe = models.BooleanField(default=True)
     is_dishwasher_safe = models.BooleanField(default=True)
     is_handmade = models.BooleanField(default=True)
+    tag_mask = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Bitmask of the tag booleans above (kept in sync on save)"
+    )
     
     # Inventory
     in_stock = models.BooleanField(default=True)
     stock_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    reserved_quantity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Units held by checkouts awaiting payment (see products/inventory.py)"
+    )
     
     # Display
     is_featured = models.BooleanField(default=False, help_text="Show on homepage")
@@ -85,22 +143,84 @@ class Product(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        # Cover the filter/sort combinations of ProductViewSet.get_queryset
+        # (checked by `manage.py check_catalog_plans`). Partial on in_stock:
+        # Django compiles in_stock=True to a bare `WHERE in_stock`, which
+        # SQLite can't match against an in_stock index column, only against
+        # the same condition on a partial index.
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], condition=models.Q(in_stock=True), name='product_stock_newest_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(in_stock=True), name='product_stock_price_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(in_stock=True), name='product_cat_newest_idx'),
+            models.Index(fields=['category', 'price', 'id'], condition=models.Q(in_stock=True), name='product_cat_price_idx'),
+            models.Index(fields=['-is_featured', '-created_at', '-id'], condition=models.Q(in_stock=True), name='product_featured_idx'),
+            models.Index(fields=['tag_mask'], condition=models.Q(in_stock=True), name='product_stock_tags_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - ₹{self.price}"
     
+    def save(self, *args, **kwargs):
+        """Keep tag_mask and in_stock in sync with the fields they derive from"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.tag_mask = self.compute_tag_mask()
+            self.in_stock = self.available_quantity > 0
+        else:
+            derived = set()
+            if TAG_FIELDS.intersection(update_fields):
+                self.tag_mask = self.compute_tag_mask()
+                derived.add('tag_mask')
+            if STOCK_FIELDS.intersection(update_fields):
+                self.in_stock = self.available_quantity > 0
+                derived.add('in_stock')
+            if derived:
+                kwargs['update_fields'] = set(update_fields) | derived
+        super().save(*args, **kwargs)
+    
+    @property
+    def available_quantity(self):
+        """Units that can still be sold (stock not held by pending checkouts)"""
+        return self.stock_quantity - self.reserved_quantity
+    
+    def compute_tag_mask(self):
+        """Pack the tag booleans into one integer"""
+        mask = 0
+        for slug, field, label in PRODUCT_TAGS:
+            if getattr(self, field):
+                mask |= TAG_BITS[slug]
+        return mask
+    
     def get_tags(self):
         """Returns list of product tags for display"""
-        tags = []
-        if self.is_food_safe:
-            tags.append('Food Safe')
-        if self.is_microwave_safe:
-            tags.append('Microwave Safe')
-        if self.is_dishwasher_safe:
-            tags.append('Dishwasher Safe')
-        if self.is_handmade:
-            tags.append('Handmade')
-        return tags
+        return list(tag_labels(self.tag_mask))
+
+
+# ====================
+# PRODUCT SEARCH INDEX MODEL
+# Purpose: Trigram inverted index behind the ?search= catalog parameter
+# ====================
+class ProductSearchTrigram(models.Model):
+    """
+    One row per (trigram, product) pair
+    Kept up to date by products/signals.py whenever a Product is saved;
+    rows are removed with the product through the cascading foreign key
+    """
+
+    trigram = models.CharField(max_length=3)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_trigrams')
+    weight = models.PositiveSmallIntegerField(
+        default=1,
+        help_text="Highest field weight the trigram appears in (name > short description > description)"
+    )
+
+    class Meta:
+        unique_together = ['trigram', 'product']
+        verbose_name = 'Product Search Trigram'
+        verbose_name_plural = 'Product Search Trigrams'
+
+    def __str__(self):
+        return f"'{self.trigram}' -> {self.product_id}"
 
 
 # ====================
@@ -172,8 +292,7 @@ class CustomOrder(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate order number if not exists"""
         if not self.order_number:
-            from datetime import datetime
-            self.order_number = f"CO-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            self.order_number = allocate_number('custom_order')
         super().save(*args, **kwargs)
 
 
@@ -236,38 +355,61 @@ class CorporateInquiry(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate inquiry number if not exists"""
         if not self.inquiry_number:
-            from datetime import datetime
             # Format: CORP-YYYY-sequential
-            year = datetime.now().year
-            # Count existing inquiries this year
-            count = CorporateInquiry.objects.filter(
-                inquiry_number__startswith=f"CORP-{year}"
-            ).count() + 1
-            self.inquiry_number = f"CORP-{year}-{count:03d}"
+            self.inquiry_number = allocate_number('corporate_inquiry')
         super().save(*args, **kwargs)
 
 
+# ====================
+# BUSINESS NUMBER COUNTER MODEL
+# Purpose: Shared counters behind ORD-/CO-/WS-/CORP- numbers
+# ====================
+class BusinessNumberCounter(models.Model):
+    """
+    Next free value of one business number sequence
+    Used by products/numbering.py on databases without sequences
+    (PostgreSQL uses real sequences instead)
+    """
+    
+    name = models.CharField(max_length=50, unique=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    
+    class Meta:
+        verbose_name = 'Business Number Counter'
+        verbose_name_plural = 'Business Number Counters'
+    
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
 # ====================
 # CART ITEM MODEL (Optional - for future use)
 # Purpose: Store cart items for logged-in users
 # ====================
 class CartItem(models.Model):
     """
-    Optional: For implementing persistent cart functionality
-    Currently the frontend uses localStorage
-    This can be used later for logged-in users
+    Persistent cart lines
+    Carts of logged-in users live in the cart store (products/carts.py)
+    and are written behind to these rows, which are the durable copy
     """
-    # If using Django's built-in User model:
-    # user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
     
-    session_key = models.CharField(max_length=40, help_text="For guest users")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='cart_items')
+    session_key = models.CharField(max_length=40, blank=True, help_text="For guest users")
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = 'Cart Item'
         verbose_name_plural = 'Cart Items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'product'],
+                condition=models.Q(user__isnull=False),
+                name='cartitem_unique_user_product',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
@@ -276,6 +418,211 @@ class CartItem(models.Model):
         return self.product.price * self.quantity
 
 
+# ====================
+# STOCK HOLD MODEL
+# Purpose: Units reserved by a checkout until payment is verified
+# ====================
+class StockHold(models.Model):
+    """
+    Stock reserved for one product in one pending Razorpay checkout
+    Created when the Razorpay order is created, confirmed by verify_payment
+    and released by the sweeper once it expires (see products/inventory.py)
+    """
+    
+    STATUS_CHOICES = [
+        ('held', 'Held'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+    ]
+    
+    reference = models.CharField(max_length=100, db_index=True, help_text="Razorpay order ID")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_holds')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='held')
+    expires_at = models.DateTimeField()
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Stock Hold'
+        verbose_name_plural = 'Stock Holds'
+        indexes = [
+            # The sweeper's "held and expired" scan
+            models.Index(fields=['status', 'expires_at'], name='stockhold_status_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.reference}: {self.product_id} x {self.quantity} ({self.status})"
+
+
+# ====================
+# PENDING CHECKOUT MODEL
+# Purpose: Checkout details kept until the payment is finalized
+# ====================
+class PendingCheckout(models.Model):
+    """
+    The order form submitted with create-razorpay-order, and the cart as
+    it was priced for the payment
+    Lets the order be created from a webhook even if the browser never
+    comes back to verify-payment (see products/checkout.py)
+    """
+    
+    razorpay_order_id = models.CharField(max_length=100, unique=True)
+    order_data = models.JSONField(help_text="OrderSerializer input")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, help_text="Amount charged (₹)")
+    quote = models.JSONField(default=dict, blank=True, help_text="Priced lines and shipping charged (CartQuote.snapshot)")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Pending Checkout'
+        verbose_name_plural = 'Pending Checkouts'
+    
+    def __str__(self):
+        return f"{self.razorpay_order_id} - ₹{self.amount}"
+
+
+# ====================
+# PAYMENT EVENT MODEL
+# Purpose: Durable inbox of payment notifications awaiting finalization
+# ====================
+class PaymentEvent(models.Model):
+    """
+    A Razorpay webhook or a verified browser checkout callback
+    Stored before anything else happens, then finalized by a queue worker;
+    unprocessed events are picked up again by the sweeper
+    """
+    
+    SOURCE_CHOICES = [
+        ('webhook', 'Razorpay Webhook'),
+        ('checkout', 'Browser Checkout'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('received', 'Received'),
+        ('processed', 'Processed'),
+        ('ignored', 'Ignored'),
+        ('failed', 'Failed'),
+    ]
+    
+    event_id = models.CharField(max_length=100, unique=True, help_text="Razorpay event ID (deduplicates retries)")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    event_type = models.CharField(max_length=50)
+    razorpay_order_id = models.CharField(max_length=100, blank=True, db_index=True)
+    razorpay_payment_id = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField(default=dict, help_text="Raw event body")
+    
+    # Processing
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='received')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Payment Event'
+        verbose_name_plural = 'Payment Events'
+        indexes = [
+            # The sweeper's "still received" scan
+            models.Index(fields=['status', 'created_at'], name='paymentevent_status_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} {self.razorpay_order_id} ({self.status})"
+
+
+# ====================
+# JOB QUEUE MODEL
+# Purpose: Durable background jobs written with the rows they belong to
+# ====================
+class Job(models.Model):
+    """
+    A queued call of a Celery task (see products/jobs.py)
+    Created in the same transaction as the order / registration / inquiry,
+    run by `manage.py run_jobs` or Celery, retried with backoff
+    """
+    
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    task = models.CharField(max_length=200, help_text="Task path, e.g. products.tasks.send_workshop_confirmation_email")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not run before this time (retry backoff)")
+    locked_by = models.CharField(max_length=200, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Background Job'
+        verbose_name_plural = 'Background Jobs'
+        indexes = [
+            # The worker's "queued and due" scan and the stuck-job check
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_at'], name='job_status_locked_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.task.rsplit('.', 1)[-1]} #{self.pk} ({self.status})"
+
+
+# ====================
+# ADMIN DIGEST MODEL
+# Purpose: Admin notifications buffered for the next digest email
+# ====================
+class AdminEvent(models.Model):
+    """
+    One new order / registration / request, waiting to be listed in the
+    admin digest email (see products/digests.py)
+    """
+    
+    KIND_CHOICES = [
+        ('order', 'Product Order'),
+        ('workshop', 'Workshop Registration'),
+        ('custom_order', 'Custom Order'),
+        ('corporate', 'Corporate Inquiry'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    reference = models.CharField(max_length=50, help_text="Order / registration / inquiry number")
+    summary = models.CharField(max_length=500)
+    admin_url = models.CharField(max_length=300, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    digest_sent_at = models.DateTimeField(null=True, blank=True, help_text="Empty until a digest included this event")
+    
+    class Meta:
+        ordering = ['created_at']
+        verbose_name = 'Admin Digest Event'
+        verbose_name_plural = 'Admin Digest Events'
+        indexes = [
+            models.Index(fields=['digest_sent_at', 'created_at'], name='adminevent_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.reference}"
+
+
 # ====================
 # ORDER MODEL
 # Purpose: Track customer purchases and order history
@@ -302,6 +649,12 @@ class Order(models.Model):
         ('card', 'Credit/Debit Card'),
         ('netbanking', 'Net Banking'),
         ('wallet', 'Digital Wallet'),
+        ('razorpay', 'Razorpay'),
+    ]
+    
+    SHIPPING_TIER_CHOICES = [
+        ('standard', 'Standard'),
+        ('express', 'Express'),
     ]
     
     # Order Identification
@@ -328,9 +681,14 @@ class Order(models.Model):
     
     # Order Details
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    shipping_tier = models.CharField(max_length=20, choices=SHIPPING_TIER_CHOICES, default='standard')
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default='cod')
     payment_status = models.BooleanField(default=False, help_text="Payment received?")
     
+    # Razorpay references (unique, so one payment can only ever create one order)
+    razorpay_order_id = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
+    razorpay_payment_id = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
+    
     # Pricing
     subtotal = models.DecimalField(max_digits=10, decimal_places=2, help_text="Total before tax/shipping")
     shipping_charge = models.DecimalField(max_digits=8, decimal_places=2, default=0)
@@ -365,9 +723,8 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """Auto-generate order number if not exists"""
         if not self.order_number:
-            from datetime import datetime
-            # Format: ORD-YYYYMMDDHHMMSS
-            self.order_number = f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+            # Format: ORD-YYYY-sequential
+            self.order_number = allocate_number('order')
         super().save(*args, **kwargs)
     
     def get_item_count(self):
@@ -463,19 +820,55 @@ class ShippingConfig(models.Model):
     def __str__(self):
         return f"Shipping: ₹{self.rate_per_kg}/kg (Min: ₹{self.minimum_charge})"
     
+    # Key in the shared cache holding the current configuration version
+    VERSION_KEY = 'shipping_config_version'
+    
+    # (version, instance) kept in process memory by load()
+    _cached = None
+    
     def save(self, *args, **kwargs):
         """Ensure only one configuration exists"""
         self.pk = 1
         super().save(*args, **kwargs)
+        # Every worker reloads on its next load() once the new rates are committed
+        transaction.on_commit(type(self).bump_version)
     
     def delete(self, *args, **kwargs):
         """Prevent deletion"""
         pass
     
+    @classmethod
+    def current_version(cls):
+        """Version token from the shared cache (created when missing)"""
+        shared = caches['shared']
+        version = shared.get(cls.VERSION_KEY)
+        if version is None:
+            shared.add(cls.VERSION_KEY, uuid.uuid4().hex, None)
+            version = shared.get(cls.VERSION_KEY)
+        return version
+    
+    @classmethod
+    def bump_version(cls):
+        """Invalidate the in-process copies held by every worker"""
+        caches['shared'].set(cls.VERSION_KEY, uuid.uuid4().hex, None)
+    
     @classmethod
     def load(cls):
-        """Get or create the shipping configuration"""
+        """
+        Get or create the shipping configuration
+        Served from process memory while the shared version token is
+        unchanged: one cache lookup, no database query
+        """
+        version = cls.current_version()
+        cached = cls._cached
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
         obj, created = cls.objects.get_or_create(pk=1)
+        if created:
+            # A new row still holds the float field defaults; reload the Decimals
+            obj.refresh_from_db()
+        cls._cached = (version, obj)
         return obj
     
     def calculate_shipping(self, weight_kg, order_subtotal):
@@ -503,3 +896,103 @@ class ShippingConfig(models.Model):
             shipping = self.minimum_charge
         
         return shipping
+
+
+# ====================
+# SHIPPING ZONE MODELS
+# Purpose: Pincode-based shipping rates managed from admin
+# ====================
+class ShippingZone(models.Model):
+    """
+    A delivery region identified by pincode prefixes
+    Rates come from its weight slabs; quotes are served from an in-memory
+    prefix trie (see products/shipping.py). Pincodes outside every zone
+    use the flat ShippingConfig rate.
+    """
+    
+    name = models.CharField(max_length=100, help_text="e.g. 'Mumbai Metro', 'North East'")
+    pincode_prefixes = models.TextField(
+        help_text="Comma separated pincode prefixes, e.g. '400, 401, 41'. "
+                  "The longest matching prefix decides the zone."
+    )
+    is_active = models.BooleanField(default=True)
+    
+    # Above the heaviest slab: its charge plus this much per started kg
+    extra_per_kg = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        default=50.00,
+        help_text="Charge per kg above the heaviest slab (₹)"
+    )
+    
+    # Delivery estimates shown at checkout
+    standard_days = models.PositiveIntegerField(default=5, help_text="Standard delivery estimate (days)")
+    express_available = models.BooleanField(default=True)
+    express_days = models.PositiveIntegerField(default=2, help_text="Express delivery estimate (days)")
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Shipping Zone'
+        verbose_name_plural = 'Shipping Zones'
+    
+    def __str__(self):
+        return self.name
+    
+    def prefix_list(self):
+        """Parsed pincode prefixes"""
+        return [prefix for prefix in self.pincode_prefixes.replace(',', ' ').split() if prefix]
+    
+    def clean(self):
+        """Prefixes must be 1-6 digits and not claimed by another active zone"""
+        prefixes = self.prefix_list()
+        invalid = [prefix for prefix in prefixes if not (prefix.isdigit() and len(prefix) <= 6)]
+        if invalid:
+            raise ValidationError({'pincode_prefixes': f"Not a pincode prefix: {', '.join(invalid)}"})
+        if not self.is_active:
+            return
+        
+        taken = set()
+        for zone in ShippingZone.objects.filter(is_active=True).exclude(pk=self.pk):
+            taken.update(set(prefixes).intersection(zone.prefix_list()))
+        if taken:
+            raise ValidationError({
+                'pincode_prefixes': f"Already used by another zone: {', '.join(sorted(taken))}"
+            })
+
+
+class ShippingRateSlab(models.Model):
+    """
+    Charge for parcels up to a weight in one zone
+    A parcel uses the lightest slab it fits in
+    """
+    
+    zone = models.ForeignKey(ShippingZone, on_delete=models.CASCADE, related_name='slabs')
+    max_weight_kg = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        validators=[MinValueValidator(0.01)],
+        help_text="Parcels up to this weight (kg)"
+    )
+    standard_charge = models.DecimalField(max_digits=8, decimal_places=2, help_text="Standard shipping (₹)")
+    express_charge = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Express shipping (₹). Leave blank if express isn't offered for this weight."
+    )
+    
+    class Meta:
+        ordering = ['zone', 'max_weight_kg']
+        verbose_name = 'Shipping Rate Slab'
+        verbose_name_plural = 'Shipping Rate Slabs'
+        constraints = [
+            models.UniqueConstraint(fields=['zone', 'max_weight_kg'], name='shippingrateslab_unique_weight'),
+        ]
+    
+    def __str__(self):
+        return f"{self.zone.name}: up to {self.max_weight_kg} kg"
@@ -0,0 +1,105 @@
+"""
+Business number allocator (ORD-, CO-, WS-, CORP- numbers)
+
+Numbers look like ORD-2026-000123: prefix, year, then a counter that is
+shared by all processes and never hands out the same value twice.
+
+Each process leases a block of BLOCK_SIZE values and serves numbers from
+memory, so most inserts need no extra query:
+
+- PostgreSQL: one `nextval()` per block on a sequence created with
+  INCREMENT BY BLOCK_SIZE (migration 0017). Sequences are not
+  transactional, so a rolled back insert can never lead to a reused block.
+- other databases (SQLite in development): a BusinessNumberCounter row is
+  advanced by BLOCK_SIZE in its own transaction. Inside a caller's
+  transaction the row is advanced by one instead, so the number is rolled
+  back together with the insert that used it.
+
+Unused values of a block are lost when the process exits, so numbers are
+unique and increasing per process but may have gaps.
+"""
+
+import os
+import threading
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+# Changing this requires altering the PostgreSQL sequences (INCREMENT BY)
+BLOCK_SIZE = 20
+
+# Sequence name -> number prefix
+SEQUENCES = {
+    'order': 'ORD',
+    'custom_order': 'CO',
+    'workshop_registration': 'WS',
+    'corporate_inquiry': 'CORP',
+}
+
+
+def sequence_name(name):
+    return f'business_number_{name}'
+
+
+class NumberAllocator:
+    """Per-process cache of leased blocks: {name: (next value, end)}"""
+
+    def __init__(self):
+        self.blocks = {}
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Forget leased blocks (a forked worker must not share its parent's)"""
+        self.blocks = {}
+        self.lock = threading.Lock()
+
+    def next_value(self, name):
+        with self.lock:
+            value, end = self.blocks.get(name, (0, 0))
+            if value >= end:
+                value, end = self.lease(name)
+            self.blocks[name] = (value + 1, end)
+            return value
+
+    def lease(self, name):
+        """Reserve a block of values; returns (first, end)"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT nextval(%s)', [sequence_name(name)])
+                start = cursor.fetchone()[0]
+            return start, start + BLOCK_SIZE
+
+        # A block leased inside the caller's transaction would be handed out
+        # again by other processes if that transaction rolled back
+        size = 1 if connection.in_atomic_block else BLOCK_SIZE
+        return lease_counter(name, size)
+
+
+def lease_counter(name, size):
+    """Advance the counter row by `size`; returns (first, end)"""
+    from .models import BusinessNumberCounter
+
+    with transaction.atomic():
+        BusinessNumberCounter.objects.get_or_create(name=name)
+        BusinessNumberCounter.objects.filter(name=name).update(next_value=F('next_value') + size)
+        end = BusinessNumberCounter.objects.filter(name=name).values_list('next_value', flat=True).get()
+    return end - size, end
+
+
+allocator = NumberAllocator()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=allocator.reset)
+
+
+def allocate_number(name):
+    """
+    Next business number, e.g. allocate_number('order') -> 'ORD-2026-000123'
+
+    Args:
+        name: Key of SEQUENCES
+    """
+    value = allocator.next_value(name)
+    return f"{SEQUENCES[name]}-{timezone.now().year}-{value:06d}"
@@ -0,0 +1,224 @@
+"""
+Pagination for list endpoints
+
+Page-number pagination (?page=N) costs a COUNT(*) plus an OFFSET scan that
+grows with every page. Clients can opt in to keyset (cursor) pagination by
+sending ?pagination=cursor on the first request and following the `next`
+link afterwards:
+- the cursor stores the values of every ORDER BY column of the last row
+- the next page is fetched with a WHERE on those values, so page 50 costs
+  the same as page 1 and no COUNT(*) is run
+- the primary key is always appended to the ordering, so rows that tie on
+  price / date are never skipped or repeated
+- a cursor that doesn't decode, belongs to another sort or carries values
+  of the wrong type is answered with 400
+"""
+
+import base64
+import datetime
+import decimal
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_value(value):
+    """Make an ordering value JSON safe without losing precision"""
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def ordering_field(model, name):
+    """Model field an ordering entry such as '-created_at' or 'workshop__date' refers to"""
+    field = None
+    for part in name.lstrip('-').split('__'):
+        field = model._meta.pk if part == 'pk' else model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    if field.is_relation:
+        field = model._meta.pk
+    return field
+
+
+class KeysetPagination(BasePagination):
+    """
+    Forward-only keyset pagination over whatever ordering the view applied
+
+    Response: {"next": url or null, "previous": null, "results": [...]}
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """ORDER BY of the queryset with the primary key appended as tie-break"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or [])
+        ordering = [field for field in ordering if isinstance(field, str) and field != '?']
+
+        names = {field.lstrip('-') for field in ordering}
+        if not names.intersection({'pk', 'id', queryset.model._meta.pk.name}):
+            descending = bool(ordering) and ordering[-1].startswith('-')
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    def invalid_cursor(self):
+        return ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def decode_cursor(self, token, ordering, model):
+        """
+        Return the ordering values stored in a cursor token
+
+        Raises a 400 for tokens that aren't ours, belong to another sort or
+        hold values the ordering columns can't take (a tampered cursor must
+        not reach the query)
+        """
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = payload['v']
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise self.invalid_cursor()
+
+        # A cursor is only valid for the sort it was created with
+        if not isinstance(values, list) or payload.get('o') != ordering or len(values) != len(ordering):
+            raise self.invalid_cursor()
+
+        try:
+            return [
+                ordering_field(model, field).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (DjangoValidationError, FieldDoesNotExist, TypeError):
+            raise self.invalid_cursor()
+
+    def encode_cursor(self, obj, ordering):
+        values = []
+        for field in ordering:
+            value = obj
+            for part in field.lstrip('-').split('__'):
+                value = getattr(value, part)
+            values.append(encode_value(getattr(value, 'pk', value)))
+
+        payload = json.dumps({'o': ordering, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+
+    def build_filter(self, ordering, values):
+        """
+        Rows that come strictly after `values` in `ordering`
+
+        (a, b, c) > (x, y, z) expands to
+        a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+            equal_so_far &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(queryset)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            values = self.decode_cursor(token, ordering, queryset.model)
+            queryset = queryset.filter(self.build_filter(ordering, values))
+
+        # Fetch one extra row to know whether a next page exists
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        self.next_cursor = self.encode_cursor(self.page[-1], ordering) if self.has_next else None
+        return self.page
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ListPagination(PageNumberPagination):
+    """
+    Default page-number pagination with an opt-in keyset mode
+
+    ?pagination=cursor (or any ?cursor=...) switches the request to
+    KeysetPagination; everything else behaves exactly like before.
+    """
+
+    page_size_query_param = 'page_size'
+    # Same cap as keyset mode: ?page_size=100000 must not dump the catalog
+    max_page_size = KeysetPagination.max_page_size
+    mode_query_param = 'pagination'
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination(self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return None
+        return super().get_previous_link()
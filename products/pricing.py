@@ -0,0 +1,145 @@
+"""
+Cart pricing engine
+
+One place that turns cart lines into money, shared by the shipping quote,
+payment verification and OrderSerializer:
+- every product in the cart is loaded with a single in_bulk query, so the
+  number of queries does not grow with the cart size
+- prices, weight, shipping, tax and discount are computed server-side;
+  amounts sent by the client are never trusted
+- shipping comes from the pincode zone tables (products/shipping.py),
+  which are looked up in memory
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+
+# GST (or other tax) charged on top of the subtotal, e.g. Decimal('0.18')
+# Catalog prices are tax inclusive by default
+TAX_RATE = Decimal(str(getattr(settings, 'PRODUCT_TAX_RATE', '0')))
+
+# Weight used when no product in the cart has a weight set
+DEFAULT_WEIGHT_KG = Decimal('1.0')
+
+CENT = Decimal('0.01')
+
+
+class PricingError(ValueError):
+    """Raised for cart lines that can't be priced (bad id or quantity)"""
+
+
+class CartLine:
+    """A priced cart line"""
+
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+        self.unit_price = product.price
+        self.line_total = product.price * quantity
+        self.weight = (product.weight or Decimal('0')) * quantity
+
+
+class CartQuote:
+    """Server-side totals for a cart"""
+
+    def __init__(self, lines, missing, shipping_config, pincode=None, shipping_tier='standard'):
+        from .shipping import quote_shipping
+        
+        self.lines = lines
+        self.missing = missing
+
+        self.subtotal = sum((line.line_total for line in lines), Decimal('0.00'))
+
+        self.total_weight = sum((line.weight for line in lines), Decimal('0.0'))
+        if self.total_weight == 0:
+            self.total_weight = DEFAULT_WEIGHT_KG
+
+        self.shipping_config = shipping_config
+        # Raises ShippingUnavailable (a PricingError) for a tier the pincode can't get
+        self.shipping = quote_shipping(self.total_weight, self.subtotal, pincode, shipping_tier, shipping_config)
+        self.shipping_charge = self.shipping.charge
+        self.is_free_shipping = self.shipping.is_free
+
+        self.tax_amount = (self.subtotal * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+
+        # No server-side discount rules exist yet; client discounts are ignored
+        self.discount_amount = Decimal('0.00')
+
+        self.total_amount = self.subtotal + self.shipping_charge + self.tax_amount - self.discount_amount
+
+    def order_fields(self):
+        """Pricing fields for an Order"""
+        return {
+            'subtotal': self.subtotal,
+            'shipping_tier': self.shipping.tier,
+            'shipping_charge': self.shipping_charge,
+            'tax_amount': self.tax_amount,
+            'discount_amount': self.discount_amount,
+            'total_amount': self.total_amount,
+        }
+
+    def snapshot(self):
+        """The priced lines and order_fields() as JSON, stored with a checkout"""
+        fields = {name: str(value) for name, value in self.order_fields().items()}
+        fields['lines'] = [
+            {
+                'product': line.product.pk,
+                'product_name': line.product.name,
+                'product_price': str(line.unit_price),
+                'quantity': line.quantity,
+            }
+            for line in self.lines
+        ]
+        return fields
+
+
+def parse_quantity(value):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise PricingError(f"Invalid quantity: {value!r}")
+    if quantity < 1:
+        raise PricingError("Quantity must be at least 1")
+    return quantity
+
+
+def quote_cart(items, id_key='product_id', pincode=None, shipping_tier='standard'):
+    """
+    Price a cart with a single product query
+
+    Args:
+        items: list of dicts like {"product_id": 1, "quantity": 2}
+        id_key: key holding the product primary key in each item
+        pincode: Shipping pincode; None uses the flat ShippingConfig rate
+        shipping_tier: 'standard' or 'express'
+
+    Returns:
+        CartQuote (products that don't exist are listed in quote.missing)
+
+    Raises:
+        PricingError: malformed product id or quantity, or the shipping
+            tier isn't available for the pincode
+    """
+    from .models import Product, ShippingConfig
+
+    wanted = []
+    for item in items:
+        try:
+            pk = int(item[id_key])
+        except (KeyError, TypeError, ValueError):
+            raise PricingError(f"Each item needs a numeric '{id_key}'")
+        wanted.append((pk, parse_quantity(item.get('quantity', 1))))
+
+    products = Product.objects.in_bulk([pk for pk, quantity in wanted])
+
+    lines = []
+    missing = []
+    for pk, quantity in wanted:
+        if pk in products:
+            lines.append(CartLine(products[pk], quantity))
+        else:
+            missing.append(pk)
+
+    return CartQuote(lines, missing, ShippingConfig.load(), pincode, shipping_tier or 'standard')
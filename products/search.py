@@ -0,0 +1,115 @@
+"""
+Trigram search index for the product catalog
+
+Every product is broken into three-letter chunks (trigrams) that are stored
+in ProductSearchTrigram. A search looks the query's trigrams up through the
+index instead of scanning every description with icontains, so:
+- only indexed rows are read, no matter how large the catalog gets
+- a typo only breaks a few trigrams, so near matches are still found
+- products are ranked by how many (and how important) trigrams they share
+
+The match and the rank are subqueries of the caller's queryset, so a
+search is a single query and the catalog filters apply to every match.
+"""
+
+import math
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+
+
+# Fields that are indexed, with the weight a match in that field is worth
+FIELD_WEIGHTS = (
+    ('name', 3),
+    ('short_description', 2),
+    ('description', 1),
+)
+
+# Share of the query's trigrams a product must contain to count as a match
+MIN_SIMILARITY = getattr(settings, 'PRODUCT_SEARCH_MIN_SIMILARITY', 0.3)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def trigrams(text):
+    """
+    Split text into a set of trigrams (same padding scheme as PostgreSQL pg_trgm)
+
+    Each word is lowercased and padded with two leading spaces and one
+    trailing space, so "Bowl" becomes {"  b", " bo", "bow", "owl", "wl "}.
+    """
+    grams = set()
+    for word in WORD_RE.findall((text or '').lower()):
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+
+def build_trigram_weights(product):
+    """Return {trigram: weight} for a product, keeping the highest field weight"""
+    weights = {}
+    for field, weight in FIELD_WEIGHTS:
+        for gram in trigrams(getattr(product, field, '')):
+            if weights.get(gram, 0) < weight:
+                weights[gram] = weight
+    return weights
+
+
+def index_product(product):
+    """
+    (Re)build the search index rows for a single product
+
+    Args:
+        product: Saved Product instance
+    """
+    from .models import ProductSearchTrigram
+
+    rows = [
+        ProductSearchTrigram(trigram=gram, product_id=product.pk, weight=weight)
+        for gram, weight in build_trigram_weights(product).items()
+    ]
+
+    with transaction.atomic():
+        ProductSearchTrigram.objects.filter(product_id=product.pk).delete()
+        ProductSearchTrigram.objects.bulk_create(rows)
+
+
+def trigram_matches(grams):
+    """Index rows sharing a trigram with the query, grouped per product"""
+    from .models import ProductSearchTrigram
+
+    return (
+        ProductSearchTrigram.objects
+        .filter(trigram__in=grams)
+        .values('product_id')
+        .annotate(matched=Count('id'), score=Sum('weight'))
+    )
+
+
+def search_products(queryset, query, ranked=True):
+    """
+    Restrict a Product queryset to search matches
+
+    The returned queryset is annotated with `search_rank` so callers can
+    order by relevance.
+
+    Args:
+        queryset: Product queryset (filters already applied)
+        query: Raw search string from the request
+        ranked: False skips the `search_rank` annotation (counts only)
+    """
+    grams = trigrams(query)
+    if not grams:
+        return queryset.none()
+
+    min_matches = max(1, math.ceil(len(grams) * MIN_SIMILARITY))
+    matches = trigram_matches(grams).filter(matched__gte=min_matches)
+    queryset = queryset.filter(pk__in=matches.values('product_id'))
+    if not ranked:
+        return queryset
+
+    scores = trigram_matches(grams).filter(product_id=OuterRef('pk')).values('score')
+    return queryset.annotate(search_rank=Subquery(scores, output_field=IntegerField()))
@@ -2,18 +2,46 @@
 #
 # Serializers convert Django models to JSON for the React frontend
 
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import transaction
+from basho_project.images import ImageVariantsField
 from .models import Product, CustomOrder, CorporateInquiry, Order, OrderItem
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Lets the view restrict a serializer to some of its fields
+    Usage: ProductSerializer(product, fields=['id', 'name', 'price'])
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Product model
     Converts Product objects to JSON for React frontend
+    Full representation, used for detail/create/update
     """
+    # Model columns read by serializer fields that are not model fields
+    # (used to build .only() for sparse fieldsets)
+    SOURCE_COLUMNS = {
+        'tags': ['tag_mask'],
+        'image_url_full': ['image', 'image_url'],
+        'image_variants': ['image', 'image_url'],
+    }
+    
     tags = serializers.SerializerMethodField()
     image_url_full = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image', fallback_field='image_url')
     
     class Meta:
         model = Product
@@ -41,6 +69,7 @@ class ProductSerializer(serializers.ModelSerializer):
             'image',
             'image_url',
             'image_url_full',
+            'image_variants',
             'tags',
             'created_at',
         ]
@@ -57,6 +86,42 @@ class ProductSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.image.url)
         return obj.image_url or None
+    
+    @classmethod
+    def columns_for(cls, fields):
+        """Model columns needed to render the given serializer fields"""
+        columns = {'id'}
+        for name in fields:
+            columns.update(cls.SOURCE_COLUMNS.get(name, [name]))
+        return sorted(columns)
+
+
+class ProductListSerializer(ProductSerializer):
+    """
+    Slim product card for catalog listings
+    Leaves out the long text columns (description, material, instructions)
+    """
+    
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            'id',
+            'product_id',
+            'name',
+            'category',
+            'short_description',
+            'price',
+            'weight',
+            'in_stock',
+            'stock_quantity',
+            'is_featured',
+            'is_bestseller',
+            'image',
+            'image_url',
+            'image_url_full',
+            'image_variants',
+            'tags',
+            'created_at',
+        ]
 
 
 class CustomOrderSerializer(serializers.ModelSerializer):
@@ -147,17 +212,21 @@ class CorporateInquirySerializer(serializers.ModelSerializer):
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    """Serializer for OrderItem model"""
-    product_name = serializers.CharField(required=False, allow_blank=True)
+    """
+    Serializer for OrderItem model
+    Name and price are snapshotted server-side by OrderSerializer.validate
+    """
+    # Plain id so validating a cart doesn't fetch each product separately
+    product = serializers.IntegerField(source='product_id')
     product_image = serializers.SerializerMethodField()
     
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'product_price', 'product_image', 'quantity']
-        read_only_fields = ['id', 'product_image']
+        read_only_fields = ['id', 'product_name', 'product_price', 'product_image']
     
     def get_product_image(self, obj):
-        """Return product image URL"""
+        """Return product image URL (querysets prefetch items__product)"""
         if obj.product.image:
             request = self.context.get('request')
             if request:
@@ -176,30 +245,109 @@ class OrderSerializer(serializers.ModelSerializer):
             'id', 'order_number', 'user_firebase_uid',
             'customer_name', 'customer_email', 'customer_phone',
             'shipping_address', 'shipping_city', 'shipping_state', 'shipping_pincode',
-            'billing_address', 'status', 'payment_method', 'payment_status',
+            'billing_address', 'status', 'shipping_tier', 'payment_method', 'payment_status',
             'subtotal', 'shipping_charge', 'tax_amount', 'discount_amount', 'total_amount',
             'items', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'order_number', 'created_at', 'updated_at', 'status']
+        # Amounts are always computed server-side (products/pricing.py)
+        read_only_fields = [
+            'id', 'order_number', 'created_at', 'updated_at', 'status',
+            'subtotal', 'shipping_charge', 'tax_amount', 'discount_amount', 'total_amount',
+        ]
+    
+    def validate(self, data):
+        """Price every item with one product query and snapshot name/price"""
+        from .pricing import PricingError, quote_cart
+        from .shipping import ShippingUnavailable
+        
+        if self.partial and 'items' not in data:
+            return data
+        
+        items = data.get('items') or []
+        if not items:
+            raise serializers.ValidationError({'items': 'Order must contain at least one item'})
+        
+        # Paid checkouts keep the prices the payment was created for
+        snapshot = self.context.get('quote_snapshot')
+        if snapshot:
+            return self.apply_snapshot(data, snapshot)
+        
+        try:
+            quote = quote_cart(
+                items,
+                id_key='product_id',
+                pincode=data.get('shipping_pincode'),
+                shipping_tier=data.get('shipping_tier', 'standard'),
+            )
+        except ShippingUnavailable as e:
+            raise serializers.ValidationError({'shipping_tier': str(e)})
+        except PricingError as e:
+            raise serializers.ValidationError({'items': str(e)})
+        
+        if quote.missing:
+            raise serializers.ValidationError({
+                'items': f"Unknown products: {', '.join(str(pk) for pk in quote.missing)}"
+            })
+        
+        for item, line in zip(items, quote.lines):
+            item.pop('product_id', None)
+            item['product'] = line.product
+            item['quantity'] = line.quantity
+            item['product_name'] = line.product.name
+            item['product_price'] = line.unit_price
+        
+        data.update(quote.order_fields())
+        return data
+    
+    def apply_snapshot(self, data, snapshot):
+        """Items and amounts from a stored CartQuote.snapshot(), without re-pricing"""
+        lines = snapshot['lines']
+        products = Product.objects.in_bulk([line['product'] for line in lines])
+        missing = [str(line['product']) for line in lines if line['product'] not in products]
+        if missing:
+            raise serializers.ValidationError({'items': f"Unknown products: {', '.join(missing)}"})
+        
+        data['items'] = [
+            {
+                'product': products[line['product']],
+                'quantity': line['quantity'],
+                'product_name': line['product_name'],
+                'product_price': Decimal(line['product_price']),
+            }
+            for line in lines
+        ]
+        data['shipping_tier'] = snapshot['shipping_tier']
+        for name in ('subtotal', 'shipping_charge', 'tax_amount', 'discount_amount', 'total_amount'):
+            data[name] = Decimal(snapshot[name])
+        return data
     
     def create(self, validated_data):
-        """Create order with items and link to user if firebase_uid provided"""
+        """
+        Create order with items and link to user if firebase_uid provided
+        One atomic unit: a single order insert plus one bulk insert of items
+        (name/price snapshots were taken in validate, so no per-item queries)
+        """
         items_data = validated_data.pop('items')
         firebase_uid = validated_data.pop('user_firebase_uid', None)
         
         # Link to user if firebase_uid provided
         if firebase_uid:
-            try:
-                user = User.objects.get(username=firebase_uid)
+            user = User.objects.filter(username=firebase_uid).first()
+            if user:
                 validated_data['user'] = user
-            except User.DoesNotExist:
-                pass  # Continue without user link (guest checkout)
-        
-        # Create the order
-        order = Order.objects.create(**validated_data)
+            # Otherwise continue without user link (guest checkout)
         
-        # Create order items
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        with transaction.atomic():
+            # Create the order (extra fields such as internal_notes arrive
+            # through serializer.save(...) so the row is written once)
+            order = Order.objects.create(**validated_data)
+            
+            # Create order items
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, **item_data) for item_data in items_data
+            ])
         
+        # Serve order.items (and each item.product, set in validate) from
+        # memory when the new order is serialized, instead of re-querying
+        order._prefetched_objects_cache = {'items': items}
         return order
@@ -0,0 +1,224 @@
+"""
+Pincode-zone shipping rates
+
+Staff manage ShippingZone rows (a set of pincode prefixes, weight slabs
+with a standard and an express charge). For quoting, all active zones are
+compiled into a digit trie kept in process memory:
+
+    "40"  -> Mumbai region
+    "400" -> Mumbai city       (longest matching prefix wins)
+
+A quote walks at most six trie nodes and bisects a handful of slabs; no
+database query is made. Saving or deleting a zone or slab bumps a version
+token in the shared cache (same scheme as ShippingConfig.load()), and
+every worker rebuilds its trie on the next quote.
+
+Pincodes no zone covers fall back to the flat ShippingConfig rate
+(standard tier only). The ShippingConfig free-shipping threshold applies
+to standard shipping in every zone; express is always charged.
+"""
+
+import math
+import threading
+import uuid
+from bisect import bisect_left
+from decimal import Decimal
+
+from django.core.cache import caches
+
+from .pricing import PricingError
+
+
+# Key in the shared cache holding the current zone table version
+VERSION_KEY = 'shipping_zones_version'
+
+STANDARD = 'standard'
+EXPRESS = 'express'
+TIERS = (STANDARD, EXPRESS)
+
+
+class ShippingUnavailable(PricingError):
+    """The requested tier can't be shipped to the pincode"""
+
+
+class CompiledZone:
+    """A zone's rates in lookup-ready form"""
+
+    __slots__ = (
+        'id', 'name', 'weights', 'standard', 'express',
+        'extra_per_kg', 'standard_days', 'express_days',
+    )
+
+    def __init__(self, zone, slabs):
+        self.id = zone.id
+        self.name = zone.name
+        self.weights = [slab.max_weight_kg for slab in slabs]
+        self.standard = [slab.standard_charge for slab in slabs]
+        self.express = [slab.express_charge if zone.express_available else None for slab in slabs]
+        self.extra_per_kg = zone.extra_per_kg
+        self.standard_days = zone.standard_days
+        self.express_days = zone.express_days if zone.express_available else None
+
+    def charge(self, weight_kg, tier):
+        """Charge for a parcel, or None when the tier isn't offered"""
+        charges = self.express if tier == EXPRESS else self.standard
+
+        index = bisect_left(self.weights, weight_kg)
+        if index < len(self.weights):
+            return charges[index]
+
+        # Heavier than the last slab: its charge plus every started extra kg
+        base = charges[-1]
+        if base is None:
+            return None
+        extra_kg = math.ceil(weight_kg - self.weights[-1])
+        return base + self.extra_per_kg * extra_kg
+
+    def delivery_days(self, tier):
+        return self.express_days if tier == EXPRESS else self.standard_days
+
+
+class ZoneTrie:
+    """Digit trie of pincode prefixes -> CompiledZone"""
+
+    def __init__(self):
+        # Each node is [zone or None, {digit: node}]
+        self.root = [None, {}]
+
+    def insert(self, prefix, zone):
+        """Map a prefix to a zone; a prefix already taken keeps its zone"""
+        node = self.root
+        for digit in prefix:
+            node = node[1].setdefault(digit, [None, {}])
+        if node[0] is None:
+            node[0] = zone
+
+    def find(self, pincode):
+        """Zone of the longest prefix matching the pincode, or None"""
+        node = self.root
+        found = node[0]
+        for digit in pincode:
+            node = node[1].get(digit)
+            if node is None:
+                break
+            if node[0] is not None:
+                found = node[0]
+        return found
+
+
+def normalize_pincode(pincode):
+    return ''.join(ch for ch in str(pincode or '') if ch.isdigit())
+
+
+def build_trie():
+    """Compile every active zone (two queries)"""
+    from .models import ShippingZone
+
+    trie = ZoneTrie()
+    for zone in ShippingZone.objects.filter(is_active=True).prefetch_related('slabs').order_by('id'):
+        # Slabs come back in Meta.ordering (ascending max weight)
+        slabs = list(zone.slabs.all())
+        if not slabs:
+            continue
+        compiled = CompiledZone(zone, slabs)
+        for prefix in zone.prefix_list():
+            trie.insert(prefix, compiled)
+    return trie
+
+
+def current_version():
+    """Version token from the shared cache (created when missing)"""
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        shared.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = shared.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Make every worker rebuild its trie on the next quote"""
+    caches['shared'].set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+# (version, ZoneTrie) for this process
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_trie():
+    """The compiled zone trie, rebuilt when the shared version changed"""
+    global _table
+    version = current_version()
+    table = _table
+    if table is not None and table[0] == version:
+        return table[1]
+    with _table_lock:
+        if _table is None or _table[0] != version:
+            _table = (version, build_trie())
+        return _table[1]
+
+
+def find_zone(pincode):
+    """CompiledZone serving the pincode, or None"""
+    pincode = normalize_pincode(pincode)
+    if not pincode:
+        return None
+    return get_trie().find(pincode)
+
+
+class ShippingQuote:
+    """Shipping charge for one parcel"""
+
+    def __init__(self, charge, tier, zone=None, is_free=False):
+        self.charge = charge
+        self.tier = tier
+        self.zone = zone
+        self.is_free = is_free
+
+    @property
+    def zone_name(self):
+        return self.zone.name if self.zone else None
+
+    @property
+    def delivery_days(self):
+        return self.zone.delivery_days(self.tier) if self.zone else None
+
+
+def quote_shipping(weight_kg, subtotal, pincode=None, tier=STANDARD, config=None):
+    """
+    Shipping for a parcel to a pincode
+
+    Args:
+        weight_kg: Parcel weight (Decimal)
+        subtotal: Cart subtotal, for the free-shipping threshold
+        pincode: Destination pincode; None/blank uses the flat rate
+        tier: 'standard' or 'express'
+        config: ShippingConfig (loaded when not given)
+
+    Returns:
+        ShippingQuote
+
+    Raises:
+        ShippingUnavailable: unknown tier, or the tier isn't offered there
+    """
+    from .models import ShippingConfig
+
+    if tier not in TIERS:
+        raise ShippingUnavailable(f"Unknown shipping tier: {tier!r}")
+    config = config or ShippingConfig.load()
+    zone = find_zone(pincode)
+
+    if zone is None:
+        if tier == EXPRESS:
+            raise ShippingUnavailable("Express shipping is not available for this pincode")
+        charge = config.calculate_shipping(weight_kg, subtotal)
+        return ShippingQuote(charge, tier, is_free=charge == 0 and config.free_shipping_threshold > 0)
+
+    charge = zone.charge(weight_kg, tier)
+    if charge is None:
+        raise ShippingUnavailable(f"{tier.capitalize()} shipping is not available for this pincode")
+
+    if tier == STANDARD and config.free_shipping_threshold > 0 and subtotal >= config.free_shipping_threshold:
+        return ShippingQuote(Decimal('0.00'), tier, zone, is_free=True)
+    return ShippingQuote(charge, tier, zone)
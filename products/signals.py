@@ -0,0 +1,48 @@
+"""
+Signal handlers for the products app
+Keeps derived data (search index, caches, shipping zone trie) in sync
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .facets import bump_catalog_version
+from .fragments import invalidate_fragment
+from .models import Product, ShippingRateSlab, ShippingZone
+from .search import FIELD_WEIGHTS, index_product
+from .shipping import bump_version as bump_shipping_zones_version
+
+
+INDEXED_FIELDS = {field for field, weight in FIELD_WEIGHTS}
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, update_fields=None, **kwargs):
+    """Re-index a product whenever one of its searchable fields may have changed"""
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    index_product(instance)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_fragment(sender, instance, **kwargs):
+    """Drop the cached serialized JSON of a changed or deleted product"""
+    invalidate_fragment(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_facets(sender, **kwargs):
+    """Any product change can move facet counts"""
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=ShippingZone)
+@receiver(post_delete, sender=ShippingZone)
+@receiver(post_save, sender=ShippingRateSlab)
+@receiver(post_delete, sender=ShippingRateSlab)
+def rebuild_shipping_zones(sender, **kwargs):
+    """Workers recompile their zone trie once the rate change is committed"""
+    transaction.on_commit(bump_shipping_zones_version)
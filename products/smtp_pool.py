@@ -0,0 +1,219 @@
+"""
+Pooled SMTP email backend
+
+Django's SMTP backend opens a connection (TCP + STARTTLS + AUTH) for every
+msg.send() and quits afterwards, so each email pays a full handshake with
+smtp.gmail.com. PooledEmailBackend keeps authenticated connections open
+per process instead:
+
+- close() hands the connection back to the pool rather than sending QUIT;
+  the next send in the same worker (the next task, or the admin email
+  right after a customer email) picks it up without a handshake
+- connections idle longer than EMAIL_POOL_IDLE_TIMEOUT are dropped on
+  acquire, and a connection is retired after EMAIL_POOL_MAX_MESSAGES
+  messages (Gmail limits messages per connection)
+- a connection the server has dropped is replaced and the message
+  re-sent once
+- send_batch() sends many messages through one connection with
+  send_messages()
+
+The pool is per process: a forked worker starts with an empty pool and
+never writes to its parent's sockets.
+
+    EMAIL_BACKEND = 'products.smtp_pool.PooledEmailBackend'
+
+tests/benchmark_smtp_pool.py compares it with the stock backend against a
+local aiosmtpd server.
+"""
+
+import atexit
+import logging
+import os
+import smtplib
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.smtp import EmailBackend
+
+
+logger = logging.getLogger(__name__)
+
+# Idle connections kept per process and server
+POOL_SIZE = getattr(settings, 'EMAIL_POOL_SIZE', 2)
+
+# Seconds an idle connection is trusted (servers close idle sessions)
+IDLE_TIMEOUT = getattr(settings, 'EMAIL_POOL_IDLE_TIMEOUT', 60)
+
+# Messages sent over one connection before it is retired
+MAX_MESSAGES = getattr(settings, 'EMAIL_POOL_MAX_MESSAGES', 90)
+
+# The server went away: reconnect and send again
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class PooledConnection:
+    """An authenticated smtplib connection and its usage"""
+
+    __slots__ = ('smtp', 'sent', 'last_used')
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+    def quit(self):
+        try:
+            self.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self.smtp.close()
+
+
+class SMTPConnectionPool:
+    """Idle connections keyed by (host, port, user, tls, ssl)"""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, key):
+        """A fresh idle connection, or None"""
+        stale = []
+        found = None
+        now = time.monotonic()
+        with self.lock:
+            connections = self.idle.get(key, [])
+            while connections:
+                pooled = connections.pop()
+                if now - pooled.last_used < IDLE_TIMEOUT:
+                    found = pooled
+                    break
+                stale.append(pooled)
+        for pooled in stale:
+            # Probably closed by the server already; don't wait for a QUIT reply
+            pooled.smtp.close()
+        return found
+
+    def release(self, key, pooled):
+        """Keep a healthy connection for the next send (or retire it)"""
+        pooled.last_used = time.monotonic()
+        if pooled.sent < MAX_MESSAGES:
+            with self.lock:
+                connections = self.idle.setdefault(key, [])
+                if len(connections) < self.size:
+                    connections.append(pooled)
+                    return
+        pooled.quit()
+
+    def reset(self):
+        """Forget every connection without touching the sockets (after fork)"""
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def close_all(self):
+        with self.lock:
+            connections = [pooled for pooled_list in self.idle.values() for pooled in pooled_list]
+            self.idle = {}
+        for pooled in connections:
+            pooled.quit()
+
+
+pool = SMTPConnectionPool()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=pool.reset)
+atexit.register(pool.close_all)
+
+
+class PooledEmailBackend(EmailBackend):
+    """SMTP backend that borrows connections from the process pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pooled = None
+
+    def pool_key(self):
+        return (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+
+    def open(self):
+        if self.connection:
+            return False
+
+        pooled = pool.acquire(self.pool_key())
+        if pooled is not None:
+            self.connection = pooled.smtp
+            self.pooled = pooled
+            return True
+
+        opened = super().open()
+        if self.connection:
+            self.pooled = PooledConnection(self.connection)
+        return opened
+
+    def close(self):
+        """Return the connection to the pool instead of quitting"""
+        if self.connection is None:
+            return
+        pooled, self.pooled = self.pooled, None
+        self.connection = None
+        if pooled is not None:
+            pool.release(self.pool_key(), pooled)
+
+    def discard(self):
+        """Drop a connection the server closed"""
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
+        self.pooled = None
+
+    def _send(self, email_message):
+        # Let errors through so a dropped connection can be replaced;
+        # fail_silently is applied below
+        fail_silently, self.fail_silently = self.fail_silently, False
+        try:
+            if self.connection is None:
+                # Discarded after a failure earlier in this batch
+                self.open()
+            try:
+                sent = super()._send(email_message)
+            except RECONNECT_ERRORS as e:
+                logger.info(f"SMTP connection to {self.host} dropped ({e}), reconnecting")
+                self.discard()
+                # A new connection rather than another idle one that may be dead too
+                super().open()
+                self.pooled = PooledConnection(self.connection)
+                sent = super()._send(email_message)
+        except (smtplib.SMTPException, OSError) as e:
+            if isinstance(e, RECONNECT_ERRORS):
+                # Never hand a dead connection back to the pool
+                self.discard()
+            if not fail_silently:
+                raise
+            return False
+        finally:
+            self.fail_silently = fail_silently
+
+        if sent and self.pooled is not None:
+            self.pooled.sent += 1
+        return sent
+
+
+def send_batch(messages, fail_silently=False):
+    """
+    Send messages through one connection (EmailBackend.send_messages)
+
+    Args:
+        messages: EmailMessage / EmailMultiAlternatives instances
+        fail_silently: swallow SMTP errors
+
+    Returns:
+        Number of messages sent
+    """
+    sent = 0
+    messages = list(messages)
+    connection = get_connection(fail_silently=fail_silently)
+    for start in range(0, len(messages), MAX_MESSAGES):
+        sent += connection.send_messages(messages[start:start + MAX_MESSAGES])
+    return sent
@@ -3,14 +3,35 @@ Celery tasks for the products app
 Handles asynchronous operations like email sending
 """
 from celery import shared_task
-from django.core.mail import EmailMultiAlternatives
 from django.conf import settings
-from django.template.loader import render_to_string
+
+from . import digests
+from .email_rendering import build_email
+
+
+# ====================
+# ENTITY LOADERS
+# Each email task loads everything it renders in a fixed number of
+# queries, however many items an order has (EmailTaskQueryTests)
+# ====================
+
+def load_order(order_id):
+    """Order with its items prefetched (2 queries), or None"""
+    from .models import Order
+    
+    return Order.objects.prefetch_related('items').filter(pk=order_id).first()
+
+
+def load_registration(registration_id):
+    """Registration joined with its workshop and slot (1 query), or None"""
+    from workshops.models import WorkshopRegistration
+    
+    return WorkshopRegistration.objects.select_related('workshop', 'slot').filter(pk=registration_id).first()
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_custom_order_admin_email(self, order_id, order_number, name, email, phone, 
-                                   project_type_display, budget_display, description):
+                                   project_type_display, budget_display, description, urgent=False):
     """
     Send HTML email notification to admin about new custom order
     
@@ -23,6 +44,7 @@ def send_custom_order_admin_email(self, order_id, order_number, name, email, pho
         project_type_display: Human-readable project type
         budget_display: Human-readable budget range
         description: Order description
+        urgent: Email now even in digest mode
     """
     try:
         # Context for template
@@ -37,36 +59,19 @@ def send_custom_order_admin_email(self, order_id, order_number, name, email, pho
             'admin_url': f'http://127.0.0.1:8000/admin/products/customorder/{order_id}/',
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/admin_notification.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-New Custom Order Received
-
-Order Number: {order_number}
-Customer: {name}
-Email: {email}
-Phone: {phone}
-Project Type: {project_type_display}
-Budget: {budget_display if budget_display else 'Not specified'}
-
-Description:
-{description}
-
-Login to admin panel: http://127.0.0.1:8000/admin/products/customorder/{order_id}/
-        '''
-        
-        # Create email
-        subject = f'🔔 New Custom Order: {order_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[settings.COMPANY_EMAIL]
+        # Digest mode: listed in the next admin digest instead
+        summary = f"{name} ({email}, {phone}) - {project_type_display}, budget {context['budget']}"
+        if not urgent and digests.buffer('custom_order', order_number, summary, context['admin_url']):
+            return f"Admin notification for order {order_number} added to the digest"
+        
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/admin_notification.html', context,
+            subject=f'🔔 New Custom Order: {order_number}',
+            to=[settings.COMPANY_EMAIL],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Admin email sent successfully for order {order_number}"
         
@@ -75,196 +80,6 @@ Login to admin panel: http://127.0.0.1:8000/admin/products/customorder/{order_id
         raise self.retry(exc=exc)
 
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_product_order_confirmation_email(self, order_id):
-    """
-    Send order confirmation email to customer after successful payment
-    
-    Args:
-        order_id: Order database ID
-    """
-    try:
-        from .models import Order
-        
-        order = Order.objects.get(id=order_id)
-        
-        # Calculate total items
-        total_items = sum(item.quantity for item in order.items.all())
-        
-        # Context for template
-        context = {
-            'customer_name': order.customer_name,
-            'order_number': order.order_number,
-            'order_date': order.created_at.strftime('%B %d, %Y'),
-            'order_items': order.items.all(),
-            'total_items': total_items,
-            'subtotal': order.subtotal,
-            'shipping': order.shipping_charge,
-            'total_amount': order.total_amount,
-            'shipping_address': f"{order.shipping_address}, {order.shipping_city}, {order.shipping_state} - {order.shipping_pincode}",
-            'customer_phone': order.customer_phone,
-            'customer_email': order.customer_email,
-            'company_email': settings.COMPANY_EMAIL,
-            'company_phone': settings.COMPANY_PHONE,
-        }
-        
-        # Render HTML template
-        try:
-            html_content = render_to_string('emails/order_confirmation.html', context)
-        except:
-            # Fallback if template doesn't exist
-            html_content = None
-        
-        # Plain text content
-        items_text = '\n'.join([
-            f"  - {item.product.name} x {item.quantity} @ ₹{item.product_price} = ₹{item.quantity * item.product_price}"
-            for item in order.items.all()
-        ])
-        
-        text_content = f'''
-Dear {order.customer_name},
-
-Thank you for your order at Basho By Shivangi!
-
-Order Number: {order.order_number}
-Order Date: {order.created_at.strftime('%B %d, %Y')}
-
-Order Items:
-{items_text}
-
-Subtotal: ₹{order.subtotal}
-Shipping: ₹{order.shipping_charge}
-Total Amount: ₹{order.total_amount}
-
-Shipping Address:
-{order.shipping_address}
-{order.shipping_city}, {order.shipping_state} - {order.shipping_pincode}
-
-We will process your order and ship it within 3-5 business days.
-You will receive a tracking number once your order is shipped.
-
-If you have any questions, please contact us at:
-Email: {settings.COMPANY_EMAIL}
-Phone: {settings.COMPANY_PHONE}
-
-Thank you for supporting handcrafted pottery!
-
-With heartfelt appreciation,
-BASHO BY SHIVANGI
-        '''
-        
-        # Create email
-        subject = f'Order Confirmation - {order.order_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[order.customer_email]
-        )
-        
-        if html_content:
-            msg.attach_alternative(html_content, "text/html")
-        
-        msg.send(fail_silently=True)
-        
-        return f"Order confirmation email sent to {order.customer_email} for order {order.order_number}"
-        
-    except Exception as exc:
-        raise self.retry(exc=exc)
-
-
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_product_order_admin_notification(self, order_id):
-    """
-    Send order notification to admin after successful payment
-    
-    Args:
-        order_id: Order database ID
-    """
-    try:
-        from .models import Order
-        
-        order = Order.objects.get(id=order_id)
-        
-        # Calculate total items
-        total_items = sum(item.quantity for item in order.items.all())
-        
-        # Context for template
-        context = {
-            'order_number': order.order_number,
-            'customer_name': order.customer_name,
-            'customer_email': order.customer_email,
-            'customer_phone': order.customer_phone,
-            'order_date': order.created_at.strftime('%B %d, %Y'),
-            'order_items': order.items.all(),
-            'total_items': total_items,
-            'subtotal': order.subtotal,
-            'shipping': order.shipping_charge,
-            'total_amount': order.total_amount,
-            'shipping_address': f"{order.shipping_address}, {order.shipping_city}, {order.shipping_state} - {order.shipping_pincode}",
-            'payment_status': 'Paid via Razorpay',
-            'admin_url': f'http://127.0.0.1:8000/admin/products/order/{order_id}/',
-        }
-        
-        # Render HTML template  
-        try:
-            html_content = render_to_string('emails/admin_order_notification.html', context)
-        except:
-            html_content = None
-        
-        # Plain text content
-        items_text = '\n'.join([
-            f"  - {item.product.name} x {item.quantity} @ ₹{item.product_price} = ₹{item.quantity * item.product_price}"
-            for item in order.items.all()
-        ])
-        
-        text_content = f'''
-New Product Order Received
-
-Order Number: {order.order_number}
-Order Date: {order.created_at.strftime('%B %d, %Y')}
-
-Customer Details:
-Name: {order.customer_name}
-Email: {order.customer_email}
-Phone: {order.customer_phone}
-
-Order Items ({total_items} items):
-{items_text}
-
-Subtotal: ₹{order.subtotal}
-Shipping: ₹{order.shipping_charge}
-Total Amount: ₹{order.total_amount}
-
-Shipping Address:
-{order.shipping_address}
-{order.shipping_city}, {order.shipping_state} - {order.shipping_pincode}
-
-Payment Status: Paid via Razorpay
-
-View in admin panel: http://127.0.0.1:8000/admin/products/order/{order_id}/
-        '''
-        
-        # Create email
-        subject = f'🛒 New Order Received: {order.order_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[settings.COMPANY_EMAIL]
-        )
-        
-        if html_content:
-            msg.attach_alternative(html_content, "text/html")
-        
-        msg.send(fail_silently=True)
-        
-        return f"Admin notification sent for order {order.order_number}"
-        
-    except Exception as exc:
-        raise self.retry(exc=exc)
-
-
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_custom_order_customer_email(self, order_number, name, email, project_type_display):
     """
@@ -286,51 +101,14 @@ def send_custom_order_customer_email(self, order_number, name, email, project_ty
             'company_phone': settings.COMPANY_PHONE,
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/customer_confirmation.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-Dear {name},
-
-Thank you for your custom order request at Basho By Shivangi!
-
-Order Number: {order_number}
-Project Type: {project_type_display}
-
-We have received your request and will contact you within 24 hours to discuss your project in detail.
-
-If you have any immediate questions, please contact us at:
-Email: {settings.COMPANY_EMAIL}
-Phone: {settings.COMPANY_PHONE}
-
-With heartfelt appreciation,
-BASHO BY SHIVANGI
-        '''
-        
-        # Create email
-        subject = f'Thank You for Your Order - {order_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[email]
+        # Compiled template with the header image; text derived from the HTML
+        msg = build_email(
+            'emails/customer_confirmation.html', context,
+            subject=f'Thank You for Your Order - {order_number}',
+            to=[email],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
-
-        # Attach image with Content-ID
-        import os
-        from email.mime.image import MIMEImage
-        
-        image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(image_path):
-            with open(image_path, 'rb') as f:
-                img = MIMEImage(f.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
-        
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Customer email sent successfully to {email} for order {order_number}"
         
@@ -367,52 +145,14 @@ def send_corporate_inquiry_customer_email(self, inquiry_number, company_name, co
             'company_phone': settings.COMPANY_PHONE,
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/corporate_customer_confirmation.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-Dear {contact_name},
-
-Thank you for your corporate inquiry at Basho By Shivangi!
-
-Inquiry Number: {inquiry_number}
-Company: {company_name}
-Service Type: {service_type_display}
-
-We have received your inquiry and will contact you within 24 hours to discuss your project in detail.
-
-If you have any immediate questions, please contact us at:
-Email: {settings.COMPANY_EMAIL}
-Phone: {settings.COMPANY_PHONE}
-
-With heartfelt appreciation,
-BASHO BY SHIVANGI
-        '''
-        
-        # Create email
-        subject = f'Thank You for Your Inquiry - {inquiry_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[email]
+        # Compiled template with the header image; text derived from the HTML
+        msg = build_email(
+            'emails/corporate_customer_confirmation.html', context,
+            subject=f'Thank You for Your Inquiry - {inquiry_number}',
+            to=[email],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
-
-        # Attach image with Content-ID
-        import os
-        from email.mime.image import MIMEImage
-        
-        image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(image_path):
-            with open(image_path, 'rb') as f:
-                img = MIMEImage(f.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
-        
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Customer email sent successfully to {email} for inquiry {inquiry_number}"
         
@@ -424,7 +164,7 @@ BASHO BY SHIVANGI
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
 def send_corporate_inquiry_admin_notification(self, inquiry_id, inquiry_number, company_name, 
                                                contact_name, email, phone, service_type_display,
-                                               team_size, budget_range, message):
+                                               team_size, budget_range, message, urgent=False):
     """
     Send HTML email notification to admin about new corporate inquiry
     
@@ -439,6 +179,7 @@ def send_corporate_inquiry_admin_notification(self, inquiry_id, inquiry_number,
         team_size: Team size or participant count
         budget_range: Budget range
         message: Inquiry message
+        urgent: Email now even in digest mode
     """
     try:
         # Context for template
@@ -455,38 +196,19 @@ def send_corporate_inquiry_admin_notification(self, inquiry_id, inquiry_number,
             'admin_url': f'http://127.0.0.1:8000/admin/products/corporateinquiry/{inquiry_id}/',
         }
         
-        # Render HTML template
-        html_content = render_to_string('emails/corporate_admin_notification.html', context)
-        
-        # Plain text fallback
-        text_content = f'''
-New Corporate Inquiry Received
-
-Inquiry Number: {inquiry_number}
-Company: {company_name}
-Contact: {contact_name}
-Email: {email}
-Phone: {phone}
-Service Type: {service_type_display}
-Team Size: {team_size}
-Budget Range: {budget_range}
-
-Message:
-{message}
-
-Login to admin panel: http://127.0.0.1:8000/admin/products/corporateinquiry/{inquiry_id}/
-        '''
-        
-        # Create email
-        subject = f'🏢 New Corporate Inquiry: {inquiry_number}'
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.COMPANY_EMAIL,
-            to=[settings.COMPANY_EMAIL]
+        # Digest mode: listed in the next admin digest instead
+        summary = f"{company_name} - {contact_name} ({email}), {service_type_display}, team {team_size}, budget {budget_range}"
+        if not urgent and digests.buffer('corporate', inquiry_number, summary, context['admin_url']):
+            return f"Admin notification for inquiry {inquiry_number} added to the digest"
+        
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/corporate_admin_notification.html', context,
+            subject=f'🏢 New Corporate Inquiry: {inquiry_number}',
+            to=[settings.COMPANY_EMAIL],
+            from_email=settings.COMPANY_EMAIL
         )
-        msg.attach_alternative(html_content, "text/html")
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Admin email sent successfully for inquiry {inquiry_number}"
         
@@ -508,12 +230,9 @@ def send_product_order_confirmation_email(self, order_id):
         order_id: Order database ID
     """
     try:
-        from .models import Order
-        
-        # Get order from database
-        try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
+        # Order and items in one go (item lines use the name/price snapshots, not Product)
+        order = load_order(order_id)
+        if order is None:
             return f"Order {order_id} not found"
         
         # Prepare context data for email template
@@ -546,54 +265,13 @@ def send_product_order_confirmation_email(self, order_id):
                 'total_price': f"{item.get_total_price():,.2f}",
             })
         
-        # Render HTML email template
-        html_content = render_to_string('emails/order_confirmation.html', context)
-        
-        # Create plain text version (fallback)
-        text_content = f"""
-Dear {order.customer_name},
-
-Thank you for your order!
-
-Order Number: {order.order_number}
-Order Date: {context['order_date']}
-Payment Status: Paid
-Total Amount: ₹{context['total_amount']}
-
-We'll process your order and send you tracking details soon.
-
-Thank you for supporting Basho By Shivangi!
-
-Best regards,
-Basho By Shivangi Team
-        """.strip()
-        
-        # Create email message
-        subject = f"Order Confirmation #{order.order_number} - Basho By Shivangi"
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        # Compiled template with the header image; text derived from the HTML
+        msg = build_email(
+            'emails/order_confirmation.html', context,
+            subject=f"Order Confirmation #{order.order_number} - Basho By Shivangi",
             to=[order.customer_email]
         )
-        
-        # Attach HTML version
-        msg.attach_alternative(html_content, "text/html")
-        
-        # Attach header image inline
-        import os
-        from email.mime.image import MIMEImage
-        
-        header_image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(header_image_path):
-            with open(header_image_path, 'rb') as img_file:
-                img = MIMEImage(img_file.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
-        
-        # Send email
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Order confirmation email sent to {order.customer_email} for order {order.order_number}"
         
@@ -603,60 +281,57 @@ Basho By Shivangi Team
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_product_order_admin_notification(self, order_id):
+def send_product_order_admin_notification(self, order_id, urgent=False):
     """
     Send notification email to admin when new product order is placed
     
     Args:
         order_id: Order database ID
+        urgent: Email now even in digest mode (flagged and large orders always are)
     """
     try:
-        from .models import Order
-        
-        # Get order from database
-        try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
+        # Order and items in one go (item lines use the name/price snapshots, not Product)
+        order = load_order(order_id)
+        if order is None:
             return f"Order {order_id} not found"
         
-        # Prepare email content
-        subject = f"New Order Received - {order.order_number}"
-        
-        text_content = f"""
-New order received!
-
-Order Number: {order.order_number}
-Customer: {order.customer_name}
-Email: {order.customer_email}
-Phone: {order.customer_phone}
-Total Amount: ₹{order.total_amount:,.2f}
-Payment Status: {'Paid' if order.payment_status else 'Pending'}
-
-Items:
-"""
-        
-        for item in order.items.all():
-            text_content += f"- {item.product_name} x {item.quantity} = ₹{item.get_total_price():,.2f}\n"
+        # Digest mode: listed in the next admin digest instead
+        admin_url = f'http://127.0.0.1:8000/admin/products/order/{order.id}/'
+        if not (urgent or digests.is_urgent_order(order)):
+            summary = f"{order.customer_name} ({order.customer_email}) - ₹{order.total_amount:,.2f}, {order.shipping_city}"
+            if digests.buffer('order', order.order_number, summary, admin_url):
+                return f"Admin notification for order {order.order_number} added to the digest"
         
-        text_content += f"""
-Shipping Address:
-{order.shipping_address}
-{order.shipping_city}, {order.shipping_state} {order.shipping_pincode}
-
-View in admin: http://127.0.0.1:8000/admin/products/order/{order.id}/
-
-Please process this order in the admin panel.
-        """.strip()
+        # Context for template
+        context = {
+            'order_number': order.order_number,
+            'customer_name': order.customer_name,
+            'customer_email': order.customer_email,
+            'customer_phone': order.customer_phone,
+            'total_amount': f"{order.total_amount:,.2f}",
+            'payment_status': 'Paid' if order.payment_status else 'Pending',
+            'order_items': [
+                {
+                    'product_name': item.product_name,
+                    'quantity': item.quantity,
+                    'total_price': f"{item.get_total_price():,.2f}",
+                }
+                for item in order.items.all()
+            ],
+            'shipping_address': order.shipping_address,
+            'shipping_city': order.shipping_city,
+            'shipping_state': order.shipping_state,
+            'shipping_pincode': order.shipping_pincode,
+            'admin_url': admin_url,
+        }
         
-        # Create and send email
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/order_admin_notification.html', context,
+            subject=f"New Order Received - {order.order_number}",
             to=[settings.COMPANY_EMAIL]
         )
-        
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Admin notification sent for order {order.order_number}"
         
@@ -678,12 +353,9 @@ def send_workshop_confirmation_email(self, registration_id):
         registration_id: WorkshopRegistration database ID
     """
     try:
-        from workshops.models import WorkshopRegistration
-        
-        # Get registration from database
-        try:
-            registration = WorkshopRegistration.objects.get(id=registration_id)
-        except WorkshopRegistration.DoesNotExist:
+        # Registration, workshop and slot in one query
+        registration = load_registration(registration_id)
+        if registration is None:
             return f"Workshop registration {registration_id} not found"
         
         # Prepare context data for email template
@@ -707,56 +379,13 @@ def send_workshop_confirmation_email(self, registration_id):
             context['slot_date'] = registration.slot.date.strftime('%B %d, %Y')
             context['slot_time'] = f"{registration.slot.start_time.strftime('%I:%M %p')} - {registration.slot.end_time.strftime('%I:%M %p')}"
         
-        # Render HTML email template
-        html_content = render_to_string('emails/workshop_confirmation.html', context)
-        
-        # Create plain text version (fallback)
-        text_content = f"""
-Dear {registration.full_name},
-
-Thank you for registering for our pottery workshop!
-
-Registration Number: {registration.registration_number}
-Workshop: {registration.workshop.name}
-Participants: {registration.number_of_participants}
-Total Amount: ₹{registration.total_amount:,.2f}
-
-We're excited to have you join us for a creative and enriching experience.
-
-If you have any questions, please contact us:
-Email: {settings.COMPANY_EMAIL}
-Phone: {settings.COMPANY_PHONE}
-
-See you soon!
-Team Basho By Shivangi
-        """.strip()
-        
-        # Create email message
-        subject = f"Workshop Registration Confirmed - {registration.registration_number}"
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        # Compiled template with the header image; text derived from the HTML
+        msg = build_email(
+            'emails/workshop_confirmation.html', context,
+            subject=f"Workshop Registration Confirmed - {registration.registration_number}",
             to=[registration.email]
         )
-        
-        # Attach HTML version
-        msg.attach_alternative(html_content, "text/html")
-        
-        # Attach header image inline
-        import os
-        from email.mime.image import MIMEImage
-        
-        header_image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
-        if os.path.exists(header_image_path):
-            with open(header_image_path, 'rb') as img_file:
-                img = MIMEImage(img_file.read())
-                img.add_header('Content-ID', '<header_image>')
-                img.add_header('Content-Disposition', 'inline', filename='header.jpg')
-                msg.attach(img)
-        
-        # Send email
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Workshop confirmation email sent to {registration.email} for {registration.registration_number}"
         
@@ -766,66 +395,52 @@ Team Basho By Shivangi
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def send_workshop_admin_notification(self, registration_id):
+def send_workshop_admin_notification(self, registration_id, urgent=False):
     """
     Send notification email to admin when new workshop registration is created
     
     Args:
         registration_id: WorkshopRegistration database ID
+        urgent: Email now even in digest mode
     """
     try:
-        from workshops.models import WorkshopRegistration
-        
-        # Get registration from database
-        try:
-            registration = WorkshopRegistration.objects.get(id=registration_id)
-        except WorkshopRegistration.DoesNotExist:
+        # Registration, workshop and slot in one query
+        registration = load_registration(registration_id)
+        if registration is None:
             return f"Workshop registration {registration_id} not found"
         
-        # Prepare email content
-        subject = f"New Workshop Registration - {registration.registration_number}"
-        
-        text_content = f"""
-New workshop registration received!
-
-Registration Number: {registration.registration_number}
-Workshop: {registration.workshop.name}
-Customer: {registration.full_name}
-Email: {registration.email}
-Phone: {registration.phone}
-Participants: {registration.number_of_participants}
-Total Amount: ₹{registration.total_amount:,.2f}
-Status: {registration.get_status_display()}
-"""
-        
+        # Digest mode: listed in the next admin digest instead
+        admin_url = f'http://127.0.0.1:8000/admin/workshops/workshopregistration/{registration.id}/'
+        summary = f"{registration.full_name} - {registration.workshop.name}, {registration.number_of_participants} participant(s)"
         if registration.slot:
-            text_content += f"""
-Scheduled Slot:
-Date: {registration.slot.date.strftime('%B %d, %Y')}
-Time: {registration.slot.start_time.strftime('%I:%M %p')} - {registration.slot.end_time.strftime('%I:%M %p')}
-"""
-        
-        if registration.special_requests:
-            text_content += f"""
-Special Requests:
-{registration.special_requests}
-"""
+            summary += f", {registration.slot.date.strftime('%B %d')} {registration.slot.start_time.strftime('%I:%M %p')}"
+        if not urgent and digests.buffer('workshop', registration.registration_number, summary, admin_url):
+            return f"Admin notification for registration {registration.registration_number} added to the digest"
         
-        text_content += f"""
-View in admin: http://127.0.0.1:8000/admin/workshops/workshopregistration/{registration.id}/
-
-Please confirm the registration and prepare for the workshop.
-        """.strip()
+        # Context for template
+        context = {
+            'registration_number': registration.registration_number,
+            'workshop_name': registration.workshop.name,
+            'customer_name': registration.full_name,
+            'customer_email': registration.email,
+            'customer_phone': registration.phone,
+            'number_of_participants': registration.number_of_participants,
+            'total_amount': f"{registration.total_amount:,.2f}",
+            'status': registration.get_status_display(),
+            'special_requests': registration.special_requests,
+            'admin_url': admin_url,
+        }
+        if registration.slot:
+            context['slot_date'] = registration.slot.date.strftime('%B %d, %Y')
+            context['slot_time'] = f"{registration.slot.start_time.strftime('%I:%M %p')} - {registration.slot.end_time.strftime('%I:%M %p')}"
         
-        # Create and send email
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
+        # Compiled template; the text part is derived from the HTML
+        msg = build_email(
+            'emails/workshop_admin_notification.html', context,
+            subject=f"New Workshop Registration - {registration.registration_number}",
             to=[settings.COMPANY_EMAIL]
         )
-        
-        msg.send(fail_silently=True)
+        msg.send()
         
         return f"Admin notification sent for workshop registration {registration.registration_number}"
         
@@ -833,3 +448,84 @@ Please confirm the registration and prepare for the workshop.
         # Retry the task if it fails
         raise self.retry(exc=exc)
 
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def send_admin_digest(self):
+    """
+    Send one email listing the admin events buffered in this window
+    Scheduled by products.digests when the window's first event arrives
+    """
+    try:
+        sent = digests.send_digest()
+        return f"Admin digest sent with {sent} events"
+        
+    except Exception as exc:
+        # Retry the task if it fails
+        raise self.retry(exc=exc)
+
+
+@shared_task(ignore_result=True)
+def release_expired_stock_holds():
+    """
+    Sweeper: return stock held by abandoned checkouts
+    Queued as a job for the first hold's expiry (products.inventory.reserve_stock),
+    then for the next one after each run; also in CELERY_BEAT_SCHEDULE
+    """
+    from .inventory import release_expired_holds, schedule_next_sweep
+    
+    released = release_expired_holds()
+    schedule_next_sweep()
+    return released
+
+
+@shared_task(bind=True, max_retries=5, default_retry_delay=30)
+def process_payment_event(self, event_pk):
+    """
+    Finalize a stored Razorpay webhook / checkout callback into an Order
+    Queued as a job with the event (products.checkout.record_event); a
+    transient failure fails the job, which is retried with backoff
+    """
+    from .checkout import process_event
+    
+    if not process_event(event_pk):
+        raise self.retry(exc=RuntimeError(f"Payment event {event_pk} was not finalized"))
+
+
+@shared_task(ignore_result=True)
+def process_pending_payment_events():
+    """Periodic sweeper: process payment events whose job ran out of attempts"""
+    from .checkout import process_event, stale_events
+    
+    for event_pk in stale_events():
+        process_event(event_pk)
+
+
+@shared_task(ignore_result=True)
+def flush_dirty_carts():
+    """Periodic write-behind of changed server-side carts to CartItem"""
+    from .carts import flush_dirty_carts as flush
+    
+    return flush()
+
+
+@shared_task(ignore_result=True)
+def run_job(job_pk):
+    """Run one queued Job (handed over by products.jobs.dispatch on commit)"""
+    from .jobs import run
+    
+    return run(job_pk)
+
+
+@shared_task(ignore_result=True)
+def drain_jobs(limit=50):
+    """
+    Periodic sweep of the job table: requeue stuck jobs, run due ones
+    Catches jobs whose dispatch never reached the broker and retries whose
+    backoff has passed; `manage.py run_jobs` does the same without Celery
+    """
+    from .jobs import claim_due, execute, requeue_stuck
+    
+    requeue_stuck()
+    for job_pk in claim_due(limit):
+        execute(job_pk)
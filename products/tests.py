@@ -1,3 +1,1398 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import time, timedelta
+from decimal import Decimal
+from html.parser import HTMLParser
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+from django.forms.models import model_to_dict
+from django.template.loader import render_to_string
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from razorpay import errors as razorpay_errors
+from rest_framework.request import Request
+
+from workshops.models import Workshop, WorkshopRegistration, WorkshopSlot
+
+from . import carts, digests, gateway, smtp_pool, tasks
+from .admin import ProductAdmin
+from .checkout import finalize_payment, record_event
+from .email_rendering import get_email_template, html_to_text, render_email
+from .facets import CATALOG_VERSION_KEY, bump_catalog_version, catalog_version, get_facets
+from .fragments import render_products
+from .inventory import InsufficientStock, confirm_stock, release_expired_holds, reserve_stock
+from .jobs import claim_due, execute, run
+from .models import (
+    AdminEvent, CartItem, Job, Order, OrderItem, PaymentEvent, PendingCheckout, Product, ShippingRateSlab, ShippingZone,
+    StockHold, TAG_BITS,
+)
+from .numbering import BLOCK_SIZE, NumberAllocator, allocate_number
+from .pagination import KeysetPagination, ListPagination
+from .pricing import PricingError, quote_cart
+from .serializers import ProductListSerializer, ProductSerializer
+from .shipping import ShippingUnavailable, find_zone, quote_shipping
+from .tasks import release_expired_stock_holds
+
+
+# The shared cache as Redis deployments have it: outside the database, so
+# query budgets count only the queries of the code under test
+SHARED_CACHE_OUTSIDE_DB = override_settings(CACHES={
+    **settings.CACHES,
+    'shared': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-shared'},
+})
+
+
+def make_product(product_id, price, stock=10, **fields):
+    fields.setdefault('description', 'Test product')
+    return Product.objects.create(
+        product_id=product_id,
+        name=product_id.replace('-', ' ').title(),
+        price=Decimal(price),
+        stock_quantity=stock,
+        **fields
+    )
+
+
+def run_due_jobs():
+    """One pass of the run_jobs worker: run every job that is due"""
+    for job_pk in claim_due(100):
+        execute(job_pk)
+
+
+def order_form(items, **fields):
+    """OrderSerializer input for a cart"""
+    form = {
+        'customer_name': 'Asha Mehta',
+        'customer_email': 'asha@example.com',
+        'customer_phone': '9876543210',
+        'shipping_address': '12 Hill Road',
+        'shipping_city': 'Mumbai',
+        'shipping_state': 'Maharashtra',
+        'shipping_pincode': '400050',
+        'items': [{'product': product.pk, 'quantity': quantity} for product, quantity in items],
+    }
+    form.update(fields)
+    return form
+
+
+class QuoteCartTests(TestCase):
+    """quote_cart refuses carts it can't price"""
+
+    def setUp(self):
+        self.mug = make_product('test-mug', '450.00')
+
+    def test_malformed_lines_are_rejected(self):
+        for items in (
+            [{'quantity': 1}],
+            [{'product_id': 'mug', 'quantity': 1}],
+            [{'product_id': None}],
+            [{'product_id': self.mug.pk, 'quantity': 0}],
+            [{'product_id': self.mug.pk, 'quantity': -2}],
+            [{'product_id': self.mug.pk, 'quantity': 'two'}],
+        ):
+            with self.subTest(items=items), self.assertRaises(PricingError):
+                quote_cart(items)
+
+    def test_unknown_products_are_listed_not_priced(self):
+        quote = quote_cart([{'product_id': self.mug.pk, 'quantity': 2}, {'product_id': 999999}])
+        self.assertEqual(quote.missing, [999999])
+        self.assertEqual(quote.subtotal, Decimal('900.00'))
+
+    def test_unavailable_shipping_tiers_are_rejected(self):
+        items = [{'product_id': self.mug.pk}]
+        with self.assertRaises(ShippingUnavailable):
+            quote_cart(items, shipping_tier='overnight')
+        with self.assertRaises(ShippingUnavailable):
+            quote_cart(items, pincode='400050', shipping_tier='express')
+
+    @SHARED_CACHE_OUTSIDE_DB
+    def test_one_product_query_per_cart(self):
+        quote_cart([{'product_id': self.mug.pk}])  # shipping config is loaded once
+        items = [{'product_id': make_product(f'test-cup-{i}', '100.00').pk, 'quantity': 1} for i in range(5)]
+        with self.assertNumQueries(1):
+            quote_cart(items)
+
+
+class ShippingZoneTests(TestCase):
+    """The pincode trie and weight slabs behind shipping quotes"""
+
+    def setUp(self):
+        caches['shared'].clear()
+        self.region = self.make_zone('Mumbai Region', '40', [('1.00', '80.00', '150.00'), ('5.00', '200.00', '350.00')])
+        self.city = self.make_zone('Mumbai City', '400', [('2.00', '60.00', '120.00')], extra_per_kg='40.00')
+
+    def make_zone(self, name, prefixes, slabs, **fields):
+        # Zone changes bump the trie version once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            zone = ShippingZone.objects.create(name=name, pincode_prefixes=prefixes, **fields)
+            for max_weight, standard, express in slabs:
+                ShippingRateSlab.objects.create(
+                    zone=zone, max_weight_kg=Decimal(max_weight),
+                    standard_charge=Decimal(standard), express_charge=Decimal(express),
+                )
+        return zone
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(find_zone('400050').id, self.city.id)
+        self.assertEqual(find_zone('401101').id, self.region.id)
+        self.assertIsNone(find_zone('560001'))
+
+    def test_slab_boundaries(self):
+        zone = find_zone('401101')
+        self.assertEqual(zone.charge(Decimal('1.00'), 'standard'), Decimal('80.00'))
+        self.assertEqual(zone.charge(Decimal('1.01'), 'standard'), Decimal('200.00'))
+        self.assertEqual(zone.charge(Decimal('5.00'), 'express'), Decimal('350.00'))
+
+    def test_above_the_last_slab_charges_every_started_kg(self):
+        zone = find_zone('400050')
+        self.assertEqual(zone.charge(Decimal('2.00'), 'standard'), Decimal('60.00'))
+        self.assertEqual(zone.charge(Decimal('2.10'), 'standard'), Decimal('100.00'))
+        self.assertEqual(zone.charge(Decimal('4.50'), 'standard'), Decimal('180.00'))
+
+    def test_unknown_pincode(self):
+        with self.assertRaises(ShippingUnavailable):
+            quote_shipping(Decimal('1.00'), Decimal('100.00'), pincode='560001', tier='express')
+        # Standard falls back to the flat rate, outside any zone
+        self.assertIsNone(quote_shipping(Decimal('1.00'), Decimal('100.00'), pincode='560001').zone)
+
+    def test_zone_save_rebuilds_the_trie(self):
+        self.assertEqual(find_zone('400050').id, self.city.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.city.pincode_prefixes = '4000'
+            self.city.save()
+        self.assertEqual(find_zone('400050').id, self.city.id)
+        self.assertEqual(find_zone('400150').id, self.region.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.city.is_active = False
+            self.city.save()
+        self.assertEqual(find_zone('400050').id, self.region.id)
+
+
+class InventoryTests(TestCase):
+    """Holds: reserve, confirm, release, and running out of stock"""
+
+    def setUp(self):
+        self.mug = make_product('test-mug', '450.00', stock=3)
+        self.vase = make_product('test-vase', '4000.00', stock=1)
+
+    def lines(self, *items):
+        return quote_cart([{'product_id': product.pk, 'quantity': quantity} for product, quantity in items]).lines
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock_quantity, product.reserved_quantity, product.in_stock
+
+    def test_reserve_holds_the_units(self):
+        reserve_stock(self.lines((self.mug, 2), (self.vase, 1)), 'order_a')
+        self.assertEqual(self.stock(self.mug), (3, 2, True))
+        self.assertEqual(self.stock(self.vase), (1, 1, False))
+        self.assertEqual(StockHold.objects.filter(reference='order_a', status='held').count(), 2)
+
+    def test_reserve_is_all_or_nothing(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_stock(self.lines((self.mug, 1), (self.vase, 2)), 'order_a')
+        self.assertEqual(raised.exception.products, [self.vase])
+        self.assertEqual(self.stock(self.mug), (3, 0, True))
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_second_checkout_runs_out(self):
+        reserve_stock(self.lines((self.vase, 1)), 'order_a')
+        with self.assertRaises(InsufficientStock):
+            reserve_stock(self.lines((self.vase, 1)), 'order_b')
+        self.assertEqual(self.stock(self.vase), (1, 1, False))
+
+    def test_confirm_turns_the_hold_into_a_sale(self):
+        reserve_stock(self.lines((self.mug, 2)), 'order_a', ttl=timedelta(seconds=-1))
+        self.assertEqual(confirm_stock('order_a', {self.mug.pk: 2}), {})
+        self.assertEqual(self.stock(self.mug), (1, 0, True))
+        self.assertEqual(StockHold.objects.get().status, 'confirmed')
+
+        # The sweeper can't give back a hold that was already sold
+        self.assertEqual(release_expired_holds(), 0)
+        self.assertEqual(self.stock(self.mug), (1, 0, True))
+
+    def test_expired_holds_are_released(self):
+        reserve_stock(self.lines((self.vase, 1)), 'order_a', ttl=timedelta(seconds=-1))
+        reserve_stock(self.lines((self.mug, 1)), 'order_b')
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(self.stock(self.vase), (1, 0, True))
+        self.assertEqual(self.stock(self.mug), (3, 1, True))
+
+    def test_confirm_after_release_reports_the_shortfall(self):
+        reserve_stock(self.lines((self.vase, 1)), 'order_a', ttl=timedelta(seconds=-1))
+        # The unit went back on sale and another checkout took it
+        reserve_stock(self.lines((self.vase, 1)), 'order_b')
+        self.assertEqual(confirm_stock('order_a', {self.vase.pk: 1}), {self.vase.pk: 1})
+        self.assertEqual(StockHold.objects.get(reference='order_a').status, 'released')
+        self.assertEqual(self.stock(self.vase), (1, 1, False))
+
+    def test_holds_queue_their_sweep_job(self):
+        reserve_stock(self.lines((self.vase, 1)), 'order_a', ttl=timedelta(seconds=-1))
+        reserve_stock(self.lines((self.mug, 1)), 'order_b')
+        job = Job.objects.get(task=release_expired_stock_holds.name)
+        self.assertEqual(job.run_after, StockHold.objects.get(reference='order_a').expires_at)
+
+        run(job.pk)
+        self.assertEqual(self.stock(self.vase), (1, 0, True))
+        # Queued again for the hold still waiting
+        job = Job.objects.get(task=release_expired_stock_holds.name, status='queued')
+        self.assertEqual(job.run_after, StockHold.objects.get(reference='order_b').expires_at)
+
+    def test_catalog_reads_release_expired_holds(self):
+        reserve_stock(self.lines((self.vase, 1)), 'order_a', ttl=timedelta(seconds=-1))
+        response = self.client.get(f'/api/products/products/{self.vase.product_id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stock(self.vase), (1, 0, True))
+
+
+class ProductAdminStockTests(TestCase):
+    """Staff stock edits don't undo holds taken while the form was open"""
+
+    def setUp(self):
+        self.mug = make_product('test-mug', '450.00', stock=3)
+        self.request = RequestFactory().post('/admin/')
+        self.request.user = User.objects.create_superuser('staff', 'staff@example.com', 'pass')
+        self.model_admin = ProductAdmin(Product, admin.site)
+
+    def save_form(self, product, **changes):
+        form_class = self.model_admin.get_form(self.request, product, change=True)
+        data = {name: value for name, value in model_to_dict(product, fields=form_class.base_fields).items()
+                if value not in (None, False)}
+        data.update(changes)
+        form = form_class(data, instance=product)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.model_admin.save_model(self.request, form.save(commit=False), form, change=True)
+
+    def test_in_stock_is_read_only(self):
+        self.assertIn('in_stock', self.model_admin.get_readonly_fields(self.request, self.mug))
+
+    def test_stock_edit_keeps_concurrent_holds(self):
+        product = Product.objects.get(pk=self.mug.pk)  # the form is opened
+        reserve_stock(quote_cart([{'product_id': self.mug.pk, 'quantity': 2}]).lines, 'order_a')
+
+        self.save_form(product, stock_quantity=2)
+
+        self.mug.refresh_from_db()
+        self.assertEqual((self.mug.stock_quantity, self.mug.reserved_quantity, self.mug.in_stock), (2, 2, False))
+
+    def test_other_edits_leave_stock_alone(self):
+        product = Product.objects.get(pk=self.mug.pk)
+        reserve_stock(quote_cart([{'product_id': self.mug.pk, 'quantity': 3}]).lines, 'order_a')
+
+        self.save_form(product, name='Tall Mug')
+
+        self.mug.refresh_from_db()
+        self.assertEqual((self.mug.name, self.mug.reserved_quantity, self.mug.in_stock), ('Tall Mug', 3, False))
+
+
+@override_settings(RAZORPAY_STUB=True, RAZORPAY_KEY_SECRET='test-secret', CELERY_ENABLED=False)
+class CheckoutTestCase(TestCase):
+    """Base for tests going through create-razorpay-order / verify-payment"""
+
+    def setUp(self):
+        # The gateway client is created once per process; use the stub
+        gateway._client = gateway.StubClient()
+        self.addCleanup(setattr, gateway, '_client', None)
+
+    def create_razorpay_order(self, **body):
+        return self.client.post('/api/products/create-razorpay-order/', body, content_type='application/json')
+
+    def verify_payment(self, razorpay_order_id, payment_id='pay_test1', **body):
+        body.update(
+            razorpay_order_id=razorpay_order_id,
+            razorpay_payment_id=payment_id,
+            razorpay_signature=gateway.stub_signature(razorpay_order_id, payment_id),
+        )
+        response = self.client.post('/api/products/verify-payment/', body, content_type='application/json')
+        # The payment event is finalized by the job worker
+        run_due_jobs()
+        return response
+
+
+class PaymentAmountTests(CheckoutTestCase):
+    """The order is only created for the amount Razorpay actually charged"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product('test-mug', '1.00')
+        self.vase = make_product('test-vase', '4000.00')
+
+    def test_amount_without_items_is_refused(self):
+        response = self.create_razorpay_order(amount=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PendingCheckout.objects.exists())
+
+    def test_charged_amount_is_recorded_server_side(self):
+        form = order_form([(self.vase, 1)], total_amount='1.00')
+        response = self.create_razorpay_order(order_data=form)
+        self.assertEqual(response.status_code, 201)
+
+        pending = PendingCheckout.objects.get(razorpay_order_id=response.json()['order_id'])
+        self.assertEqual(pending.amount * 100, response.json()['amount'])
+        self.assertGreater(pending.amount, Decimal('4000'))
+
+    def test_order_is_built_from_the_paid_cart(self):
+        # Pay for the cheap cart, then send the expensive cart as the order form
+        response = self.create_razorpay_order(items=[{'product_id': self.mug.pk, 'quantity': 1}])
+        razorpay_order_id = response.json()['order_id']
+
+        self.verify_payment(razorpay_order_id, order_data=order_form([(self.vase, 1)]))
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount * 100, response.json()['amount'])
+        self.assertEqual([item.product_id for item in order.items.all()], [self.mug.pk])
+
+    def test_price_change_before_capture_keeps_the_paid_prices(self):
+        response = self.create_razorpay_order(order_data=order_form([(self.vase, 1)]))
+        razorpay_order_id = response.json()['order_id']
+        Product.objects.filter(pk=self.vase.pk).update(price=Decimal('4500.00'))
+
+        self.verify_payment(razorpay_order_id)
+
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount * 100, response.json()['amount'])
+        self.assertEqual(order.items.get().product_price, Decimal('4000.00'))
+
+    def test_captured_amount_must_match_the_paid_cart(self):
+        response = self.create_razorpay_order(order_data=order_form([(self.vase, 1)]))
+        razorpay_order_id = response.json()['order_id']
+
+        payload = {'payload': {'payment': {'entity': {'amount': 100}}}}
+        record_event(
+            'evt_test1', 'webhook', 'payment.captured',
+            razorpay_order_id=razorpay_order_id, razorpay_payment_id='pay_test1', payload=payload,
+        )
+        run_due_jobs()
+
+        self.assertFalse(Order.objects.exists())
+        event = PaymentEvent.objects.get(razorpay_order_id=razorpay_order_id)
+        self.assertEqual(event.status, 'failed')
+        self.assertIn('AMOUNT MISMATCH', event.last_error)
+
+    def test_verify_cannot_change_the_recorded_amount(self):
+        response = self.create_razorpay_order(order_data=order_form([(self.mug, 1)]))
+        razorpay_order_id = response.json()['order_id']
+        pending = PendingCheckout.objects.get(razorpay_order_id=razorpay_order_id)
+
+        self.verify_payment(razorpay_order_id, order_data=order_form([(self.vase, 1)], total_amount='4000.00'))
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.amount * 100, response.json()['amount'])
+        self.assertEqual(pending.order_data['items'][0]['product'], self.mug.pk)
+
+
+class RepeatedVerifyTests(CheckoutTestCase):
+    """A payment creates one order however often it is reported"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product('test-mug', '450.00', stock=5)
+        response = self.create_razorpay_order(order_data=order_form([(self.mug, 2)]))
+        self.razorpay_order_id = response.json()['order_id']
+
+    def test_repeated_verify_answers_with_the_same_order(self):
+        # The order is created when the first request commits
+        self.verify_payment(self.razorpay_order_id)
+        order = Order.objects.get()
+
+        second = self.verify_payment(self.razorpay_order_id)
+        self.assertEqual(second.status_code, 200)
+        self.assertTrue(second.json()['already_processed'])
+        self.assertEqual(second.json()['order_number'], order.order_number)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.mug.refresh_from_db()
+        self.assertEqual((self.mug.stock_quantity, self.mug.reserved_quantity), (3, 0))
+
+    def test_webhook_after_verify_creates_no_second_order(self):
+        self.verify_payment(self.razorpay_order_id)
+        order = Order.objects.get()
+
+        payload = {'payload': {'payment': {'entity': {'amount': int(order.total_amount * 100)}}}}
+        event, created = record_event(
+            'evt_test1', 'webhook', 'payment.captured',
+            razorpay_order_id=self.razorpay_order_id, razorpay_payment_id='pay_test1', payload=payload,
+        )
+        run_due_jobs()
+        self.assertTrue(created)
+        event.refresh_from_db()
+        self.assertEqual(event.status, 'processed')
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(finalize_payment(self.razorpay_order_id, 'pay_test1'), (order, False))
+
+    def test_unsigned_verify_reveals_no_order(self):
+        self.verify_payment(self.razorpay_order_id)
+        order = Order.objects.get()
+
+        response = self.client.post('/api/products/verify-payment/', {
+            'razorpay_order_id': self.razorpay_order_id,
+            'razorpay_payment_id': 'pay_test1',
+            'razorpay_signature': 'forged',
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(order.order_number, response.content.decode())
+        self.assertNotIn('already_processed', response.json())
+
+
+class PaymentJobTests(CheckoutTestCase):
+    """verify-payment only queues the finalizer; the job worker creates the order"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product('test-mug', '450.00', stock=5)
+        response = self.create_razorpay_order(order_data=order_form([(self.mug, 1)]))
+        self.razorpay_order_id = response.json()['order_id']
+
+    def post_verify(self):
+        return self.client.post('/api/products/verify-payment/', {
+            'razorpay_order_id': self.razorpay_order_id,
+            'razorpay_payment_id': 'pay_test1',
+            'razorpay_signature': gateway.stub_signature(self.razorpay_order_id, 'pay_test1'),
+        }, content_type='application/json')
+
+    def payment_status(self):
+        return self.client.get(f'/api/products/payment-status/{self.razorpay_order_id}/').json()['status']
+
+    def test_verify_answers_before_the_order_exists(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_verify()
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Job.objects.get(task='products.tasks.process_payment_event').status, 'queued')
+
+        run_due_jobs()
+        self.assertEqual(self.payment_status(), 'completed')
+
+    def test_failed_finalizer_is_retried_with_backoff(self):
+        self.post_verify()
+        with mock.patch('products.checkout.finalize_payment', side_effect=ConnectionError('database went away')):
+            run_due_jobs()
+        job = Job.objects.get(task='products.tasks.process_payment_event')
+        self.assertEqual((job.status, job.attempts), ('queued', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(self.payment_status(), 'processing')
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_due_jobs()
+        self.assertEqual(self.payment_status(), 'completed')
+
+
+class StockHoldOrderTests(CheckoutTestCase):
+    """Stock is held before the Razorpay order is created"""
+
+    def setUp(self):
+        super().setUp()
+        self.mug = make_product('test-mug', '450.00', stock=2)
+
+    def checkout(self, quantity):
+        return self.create_razorpay_order(items=[{'product_id': self.mug.pk, 'quantity': quantity}])
+
+    def test_holds_are_keyed_by_the_razorpay_order(self):
+        response = self.checkout(2)
+        self.assertEqual(response.status_code, 201)
+        hold = StockHold.objects.get()
+        self.assertEqual((hold.reference, hold.status), (response.json()['order_id'], 'held'))
+
+    def test_sold_out_cart_opens_no_gateway_order(self):
+        with mock.patch.object(gateway._client.order, 'create') as create:
+            response = self.checkout(3)
+        self.assertEqual(response.status_code, 409)
+        create.assert_not_called()
+        self.assertFalse(StockHold.objects.exists())
+
+    def test_gateway_failure_gives_the_stock_back(self):
+        with mock.patch.object(gateway._client.order, 'create', side_effect=gateway.GatewayUnavailable('down')):
+            response = self.checkout(2)
+        self.assertEqual(response.status_code, 503)
+        self.mug.refresh_from_db()
+        self.assertEqual(self.mug.reserved_quantity, 0)
+        self.assertEqual(StockHold.objects.get().status, 'released')
+        self.assertEqual(self.checkout(2).status_code, 201)
+
+
+class CircuitBreakerTests(TestCase):
+    """The gateway breaker opens on unhealthy answers and closes after a good trial"""
+
+    def setUp(self):
+        self.breaker = gateway.CircuitBreaker(threshold=2, reset=30)
+        self.create = gateway.StubClient().order.create
+        self.clock = 1000.0
+        patcher = mock.patch.object(gateway.time, 'monotonic', lambda: self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fail(self, exc):
+        with self.assertRaises(gateway.GatewayUnavailable):
+            self.breaker.call(mock.Mock(side_effect=exc))
+
+    def test_unhealthy_answers_open_the_breaker(self):
+        # An HTML 502 page from a proxy can't be decoded as JSON
+        self.fail(json.JSONDecodeError('Expecting value', '<html>', 0))
+        self.assertIsNone(self.breaker.opened_at)
+        self.fail(razorpay_errors.ServerError('upstream down'))
+        self.assertIsNotNone(self.breaker.opened_at)
+
+        create = mock.Mock()
+        with self.assertRaises(gateway.GatewayUnavailable):
+            self.breaker.call(create)
+        create.assert_not_called()
+
+    def test_rejected_requests_dont_count(self):
+        for _ in range(3):
+            with self.assertRaises(razorpay_errors.BadRequestError):
+                self.breaker.call(mock.Mock(side_effect=razorpay_errors.BadRequestError('bad amount')))
+        self.assertIsNone(self.breaker.opened_at)
+
+    def test_half_open_trial_closes_the_breaker(self):
+        self.fail(ValueError('bad body'))
+        self.fail(ValueError('bad body'))
+        self.clock += 31
+        self.assertTrue(self.breaker.allow())  # the one trial call
+        self.assertFalse(self.breaker.allow())
+        self.breaker.trial_running = False
+
+        order = self.breaker.call(self.create, data={'amount': 500})
+        self.assertEqual(order['amount'], 500)
+        self.assertIsNone(self.breaker.opened_at)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_failed_trial_reopens_the_breaker(self):
+        self.fail(ValueError('bad body'))
+        self.fail(ValueError('bad body'))
+        self.clock += 31
+        self.fail(razorpay_errors.ServerError('still down'))
+        with self.assertRaises(gateway.GatewayUnavailable):
+            self.breaker.call(self.create, data={'amount': 500})
+        self.clock += 31
+        self.assertEqual(self.breaker.call(self.create, data={'amount': 500})['status'], 'created')
+
+
+class CatalogFilterTests(TestCase):
+    """Catalog filters from the query string"""
+
+    def setUp(self):
+        make_product('test-cup', '300.00')
+        make_product('test-platter', '2500.00')
+
+    def list_products(self, **params):
+        response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['product_id'] for product in response.json()['results'])
+
+    def test_price_range(self):
+        self.assertEqual(self.list_products(min_price='500'), ['test-platter'])
+        self.assertEqual(self.list_products(max_price='500'), ['test-cup'])
+
+    def test_malformed_price_bounds_are_ignored(self):
+        for value in ('abc', 'NaN', 'Infinity', '1,000'):
+            self.assertEqual(self.list_products(min_price=value, max_price=value), ['test-cup', 'test-platter'])
+
+
+class CatalogTagTests(TestCase):
+    """Tag filters run on the packed tag_mask, and every catalog query stays on an index"""
+
+    def setUp(self):
+        flags = dict.fromkeys(['is_food_safe', 'is_microwave_safe', 'is_dishwasher_safe', 'is_handmade'], False)
+        make_product('test-cup', '300.00', **{**flags, 'is_food_safe': True, 'is_handmade': True})
+        make_product('test-tile', '900.00', **{**flags, 'is_handmade': True})
+        make_product('test-bowl', '600.00', **{**flags, 'is_food_safe': True, 'is_microwave_safe': True}, stock=0)
+
+    def list_products(self, **params):
+        response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(product['product_id'] for product in response.json()['results'])
+
+    def test_any_and_all(self):
+        self.assertEqual(self.list_products(tags='food_safe,handmade'), ['test-cup', 'test-tile'])
+        self.assertEqual(self.list_products(tags='food_safe,handmade', tag_match='all'), ['test-cup'])
+        # Out of stock products are outside the partial indexes, and the catalog
+        self.assertEqual(self.list_products(tags='microwave_safe'), [])
+        self.assertEqual(self.list_products(tags='glazed'), ['test-cup', 'test-tile'])
+
+    def test_tag_mask_follows_partial_saves(self):
+        tile = Product.objects.get(product_id='test-tile')
+        tile.is_food_safe = True
+        tile.save(update_fields=['is_food_safe'])
+        tile.refresh_from_db()
+        self.assertEqual(tile.tag_mask, TAG_BITS['food_safe'] | TAG_BITS['handmade'])
+        self.assertEqual(tile.get_tags(), ['Food Safe', 'Handmade'])
+
+    def test_catalog_plans_use_indexes(self):
+        out = StringIO()
+        call_command('check_catalog_plans', products=300, stdout=out)
+        self.assertIn('Every catalog query uses an index', out.getvalue())
+        self.assertFalse(Product.objects.filter(product_id__startswith='plan-check-').exists())
+
+
+class SparseFieldsTests(TestCase):
+    """?fields= / ?omit= trim the response and the columns loaded for it"""
+
+    def setUp(self):
+        self.jug = make_product('test-jug', '1200.00', care_instructions='Hand wash only')
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields_on_the_list(self):
+        [card] = self.get('/api/products/products/', fields='price,name,nonsense')['results']
+        self.assertEqual(list(card), ['name', 'price'])
+
+    def test_fields_outside_the_card_load_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            [card] = self.get('/api/products/products/', fields='name,care_instructions,tags')['results']
+        self.assertEqual(card, {'name': 'Test Jug', 'care_instructions': 'Hand wash only', 'tags': self.jug.get_tags()})
+        page_query = next(
+            query['sql'] for query in queries if 'FROM "products_product"' in query['sql'] and 'LIMIT' in query['sql']
+        )
+        self.assertNotIn('"description"', page_query)
+        self.assertIn('"tag_mask"', page_query)
+
+    def test_omit(self):
+        [card] = self.get('/api/products/products/', omit='image_variants,tags,created_at')['results']
+        expected = [name for name in ProductListSerializer.Meta.fields if name not in ('image_variants', 'tags', 'created_at')]
+        self.assertEqual(list(card), expected)
+
+    def test_fields_on_the_detail(self):
+        product = self.get('/api/products/products/test-jug/', fields='product_id,description')
+        self.assertEqual(product, {'product_id': 'test-jug', 'description': 'Test product'})
+
+    def test_columns_for(self):
+        self.assertEqual(
+            ProductSerializer.columns_for(['tags', 'image_url_full', 'price']),
+            ['id', 'image', 'image_url', 'price', 'tag_mask'],
+        )
+
+
+class BulkLookupTests(TestCase):
+    """Cart hydration: many products by product_id in one query"""
+
+    URL = '/api/products/products/bulk/'
+
+    def setUp(self):
+        make_product('test-mug', '450.00')
+        make_product('test-vase', '4000.00', stock=0)
+
+    def test_lookup_keeps_request_order(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.URL, {'ids': ['test-vase', 'test-gone', 'test-mug', 'test-vase']}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([product['product_id'] for product in data['products']], ['test-vase', 'test-mug'])
+        self.assertEqual(data['missing'], ['test-gone'])
+        self.assertEqual(data['out_of_stock'], ['test-vase'])
+
+    def test_query_string_ids(self):
+        response = self.client.get(self.URL, {'ids': 'test-mug, ,test-mug'})
+        self.assertEqual([product['product_id'] for product in response.json()['products']], ['test-mug'])
+
+    def test_bad_requests(self):
+        ids = [f'test-{i}' for i in range(101)]
+        self.assertEqual(self.client.post(self.URL, {'ids': ids}, content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(self.URL, {'ids': ids[:100]}, content_type='application/json').status_code, 200)
+        self.assertEqual(self.client.post(self.URL, {'ids': 'test-mug'}, content_type='application/json').status_code, 400)
+
+
+class PaginationTests(TestCase):
+    """Page-number listings by default, keyset pages with ?pagination=cursor"""
+
+    def setUp(self):
+        # Equal prices: only the primary key tie-break orders them
+        self.products = [make_product(f'test-cup-{i}', '300.00') for i in range(5)]
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        return response.status_code, response.json()
+
+    def test_page_numbers_by_default(self):
+        status, body = self.get('/api/products/products/', page_size=2)
+        self.assertEqual(status, 200)
+        self.assertEqual(body['count'], 5)
+        self.assertIn('page=2', body['next'])
+
+    def test_cursor_walks_ties_without_gaps_or_repeats(self):
+        status, body = self.get('/api/products/products/', pagination='cursor', sort='price-low', page_size=2)
+        self.assertEqual(status, 200)
+        self.assertNotIn('count', body)
+        seen = [product['id'] for product in body['results']]
+        while body['next']:
+            self.assertIn('cursor=', body['next'])
+            response = self.client.get(body['next'])
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            seen.extend(product['id'] for product in body['results'])
+        self.assertEqual(seen, [product.pk for product in self.products])
+
+    def test_invalid_cursors_are_rejected(self):
+        status, body = self.get('/api/products/products/', pagination='cursor', sort='price-low', page_size=2)
+        cursor = body['next'].split('cursor=')[1].split('&')[0]
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+        for token in (
+            'not-a-cursor',
+            encode(['price', 'pk']),
+            encode({'o': payload['o'], 'v': 'abc'}),
+            encode({'o': ['-created_at', '-pk'], 'v': payload['v']}),
+            encode({'o': payload['o'], 'v': ['cheap', payload['v'][1]]}),
+            encode({'o': payload['o'], 'v': [payload['v'][0], {'id': 1}]}),
+        ):
+            with self.subTest(token=token):
+                status, body = self.get('/api/products/products/', sort='price-low', cursor=token)
+                self.assertEqual(status, 400)
+                self.assertIn('cursor', body)
+
+    def test_page_size_is_capped(self):
+        request = Request(RequestFactory().get('/', {'page_size': 100000}))
+        self.assertEqual(ListPagination().get_page_size(request), 100)
+        self.assertEqual(KeysetPagination(12).get_page_size(request), 100)
+
+
+class FragmentCacheTests(TestCase):
+    """Cached product JSON: per serializer and host, only while updated_at matches"""
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def context(self, host='testserver'):
+        return {'request': Request(RequestFactory().get('/api/products/products/', HTTP_HOST=host))}
+
+    def render(self, product, host='testserver'):
+        return render_products([Product.objects.get(pk=product.pk)], ProductListSerializer, self.context(host))[0]
+
+    def test_changed_row_is_not_served_from_its_fragment(self):
+        product = make_product('test-jug', '700.00')
+        self.render(product)
+        with self.assertNumQueries(1):  # the row only: a hit
+            self.render(product)
+
+        # Changed without signals: the new updated_at alone retires the fragment
+        Product.objects.filter(pk=product.pk).update(name='Tall Jug', updated_at=timezone.now())
+        self.assertEqual(self.render(product)['name'], 'Tall Jug')
+
+        product.refresh_from_db()
+        product.name = 'Short Jug'
+        product.save()
+        self.assertEqual(self.render(product)['name'], 'Short Jug')
+
+    @override_settings(ALLOWED_HOSTS=['basho.test', 'www.basho.test'])
+    def test_each_host_gets_its_own_fragment(self):
+        product = make_product('test-jug', '700.00')
+        self.render(product, host='basho.test')
+        with self.assertNumQueries(2):  # the row, then the miss is serialized
+            self.render(product, host='www.basho.test')
+        with self.assertNumQueries(2):
+            self.render(product, host='basho.test')
+
+    def test_list_matches_plain_serializer(self):
+        for i in range(3):
+            make_product(f'test-jug-{i}', '700.00', image_url=f'https://img.test/{i}.jpg')
+        expected = ProductListSerializer(
+            Product.objects.filter(in_stock=True).order_by('-created_at'), many=True, context=self.context()
+        ).data
+        # Fragments are serialized, then served from the cache (another
+        # page_size each time, so the page cache doesn't answer instead)
+        for page_size in (10, 11):
+            with self.subTest(page_size=page_size):
+                response = self.client.get('/api/products/products/', {'page_size': page_size})
+                self.assertEqual(response.json()['results'], json.loads(json.dumps(expected, cls=DjangoJSONEncoder)))
+
+    def test_serializers_do_not_share_fragments(self):
+        product = make_product('test-jug', '700.00', description='Tall pouring jug')
+        render_products([product], ProductListSerializer, {})
+        self.assertNotIn('description', render_products([product], ProductListSerializer, {})[0])
+        self.assertEqual(render_products([product], ProductSerializer, {})[0]['description'], 'Tall pouring jug')
+
+
+class SearchTests(TestCase):
+    """?search= ranks the matches of the filtered catalog"""
+
+    def setUp(self):
+        make_product('test-bowl', '600.00', category='tableware')
+        make_product('test-planter', '900.00', category='art', description='Wide bowl shaped planter')
+        for i in range(3):
+            make_product(f'test-serving-bowl-{i}', '800.00', category='tableware')
+
+    def search(self, **params):
+        response = self.client.get('/api/products/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return [product['product_id'] for product in response.json()['results']]
+
+    def test_name_matches_rank_first(self):
+        results = self.search(search='bowl')
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[-1], 'test-planter')
+
+    def test_filters_apply_to_every_match(self):
+        self.assertEqual(self.search(search='bowl', category='art'), ['test-planter'])
+        self.assertEqual(self.search(search='bowl', max_price='700'), ['test-bowl'])
+
+    def test_typo_still_matches(self):
+        self.assertIn('test-bowl', self.search(search='bowel'))
+
+
+@SHARED_CACHE_OUTSIDE_DB
+class FacetTests(TestCase):
+    """Facet counts come from one query and follow product changes"""
+
+    def setUp(self):
+        caches['shared'].clear()
+        make_product('test-bowl', '600.00', category='tableware')
+        make_product('test-vase', '3000.00', category='art')
+
+    def facets(self, **params):
+        response = self.client.get('/api/products/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_facets_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = self.facets(search='bowl', category='art')
+        self.assertEqual(facets['total'], 0)
+        counts = {category['value']: category['count'] for category in facets['categories']}
+        self.assertEqual(counts['tableware'], 1)
+
+    def test_product_change_invalidates_cached_facets(self):
+        # Below the page cache: the cached facet result itself
+        self.assertEqual(get_facets({})['total'], 2)
+        make_product('test-plate', '450.00')
+        with self.assertNumQueries(1):
+            self.assertEqual(get_facets({})['total'], 3)
+
+    def test_bump_replaces_the_version_token(self):
+        before = catalog_version()
+        bump_catalog_version()
+        self.assertNotEqual(catalog_version(), before)
+        # A shared cache that lost the key starts a new token, not a reused number
+        caches['shared'].delete(CATALOG_VERSION_KEY)
+        self.assertNotIn(catalog_version(), (before, None))
+
+
+class OrderQueryTests(TestCase):
+    """Order responses don't query each item's product"""
+
+    def setUp(self):
+        self.products = [make_product(f'test-bowl-{i}', '600.00', image_url=f'https://img.test/{i}.jpg') for i in range(4)]
+
+    def place_order(self, count):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                '/api/products/orders/', order_form([(product, 1) for product in self.products[:count]]),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 201)
+        images = [item['product_image'] for item in response.json()['data']['items']]
+        self.assertEqual(images, [f'https://img.test/{i}.jpg' for i in range(count)])
+        return len(captured)
+
+    def test_create_queries_do_not_grow_with_items(self):
+        self.place_order(1)  # shipping config and order number block are loaded once
+        self.assertEqual(self.place_order(1), self.place_order(4))
+
+    def test_list_queries_do_not_grow_with_items(self):
+        self.place_order(4)
+        with self.assertNumQueries(4):  # count, orders, items, products
+            response = self.client.get('/api/products/orders/')
+        self.assertEqual(len(response.json()['results'][0]['items']), 4)
+
+
+class CartStoreTests(TestCase):
+    """Carts of logged-in users reach CartItem whichever store holds them"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='firebase-uid-1')
+        self.mug = make_product('test-mug', '450.00')
+        self.store = carts.MemoryCartStore()
+        carts.set_cart_store(self.store)
+        self.addCleanup(carts.set_cart_store, None)
+
+    def add_to_cart(self, product, quantity):
+        response = self.client.post(
+            f'/api/products/carts/{self.user.username}/add/',
+            {'product_id': product.pk, 'quantity': quantity}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def saved_cart(self):
+        return dict(CartItem.objects.filter(user=self.user).values_list('product_id', 'quantity'))
+
+    def test_process_local_store_writes_through(self):
+        self.add_to_cart(self.mug, 2)
+        self.assertEqual(self.saved_cart(), {self.mug.pk: 2})
+
+        # Another worker process changed the cart: it is read back from CartItem
+        CartItem.objects.filter(user=self.user).update(quantity=5)
+        self.assertEqual(self.add_to_cart(self.mug, 1)['item_count'], 6)
+        self.assertEqual(self.saved_cart(), {self.mug.pk: 6})
+
+    def test_shared_store_is_written_behind_by_flush_carts(self):
+        self.store.shared = True
+        self.add_to_cart(self.mug, 2)
+        self.assertEqual(self.saved_cart(), {})
+
+        call_command('flush_carts', stdout=StringIO())
+        self.assertEqual(self.saved_cart(), {self.mug.pk: 2})
+
+
+class HTMLOutline(HTMLParser):
+    """Tags, attributes and text of a document; style attributes and <style> kept apart"""
+
+    def __init__(self, html):
+        super().__init__(convert_charrefs=True)
+        self.outline = []
+        self.styles = []
+        self.in_style = False
+        self.feed(html)
+        self.close()
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'style':
+            self.in_style = True
+            return
+        style = dict(attrs).pop('style', None) or ''
+        self.outline.append(('start', tag, sorted((name, value) for name, value in attrs if name != 'style')))
+        self.styles.append({prop.strip() for prop, sep, value in (d.partition(':') for d in style.split(';')) if sep})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'style':
+            self.in_style = False
+        else:
+            self.outline.append(('end', tag))
+
+    def handle_data(self, data):
+        if not self.in_style and data.strip():
+            self.outline.append(('text', ' '.join(data.split())))
+
+
+EMAIL_CONTEXT = {
+    'customer_name': 'Asha Mehta', 'customer_email': 'asha@example.com', 'customer_phone': '9876543210',
+    'order_number': 'ORD-2026-000123', 'order_date': 'October 17, 2026 at 10:30 AM', 'payment_method': 'Razorpay',
+    'payment_status': 'Paid',
+    'subtotal': '2,400.00', 'shipping_charge': '120.00', 'tax_amount': '12.00', 'discount_amount': '50.00',
+    'total_amount': '2,482.00', 'shipping_address': '12 Hill Road', 'shipping_city': 'Mumbai',
+    'shipping_state': 'Maharashtra', 'shipping_pincode': '400050',
+    'company_email': 'studio@example.com', 'company_phone': '+91 98795 75601',
+    'order_items': [
+        {'product_name': f'Bowl {i}', 'quantity': 2, 'product_price': '600.00', 'total_price': '1,200.00'}
+        for i in range(2)
+    ],
+    'registration_number': 'WS-2026-000045', 'workshop_name': 'Wheel Throwing', 'workshop_type': 'Group',
+    'difficulty_level': 'Beginner', 'duration': 3, 'number_of_participants': 2, 'status': 'Confirmed',
+    'slot_date': 'November 02, 2026', 'slot_time': '10:00 AM - 01:00 PM', 'special_requests': 'Left-handed',
+    'inquiry_number': 'CI-2026-000001', 'company_name': 'Acme', 'contact_name': 'Ravi', 'service_type': 'Workshop',
+    'team_size': '20', 'budget_range': '50,000+', 'budget': '10,000', 'project_type': 'Dinnerware',
+    'message': 'Offsite', 'description': 'Twelve plates', 'admin_url': 'https://example.com/admin/',
+    'event_count': 3, 'window_start': '10:00 AM', 'window_end': '10:15 AM',
+    'sections': [
+        {'title': 'Orders', 'count': 2, 'events': [
+            {'reference': 'ORD-1', 'summary': 'Asha, 2 items', 'admin_url': 'https://example.com/admin/1/'},
+            {'reference': 'ORD-2', 'summary': 'Ravi, 1 item', 'admin_url': ''},
+        ]},
+        {'title': 'Inquiries', 'count': 1, 'events': [{'reference': 'CI-1', 'summary': 'Acme', 'admin_url': ''}]},
+    ],
+}
+
+
+class EmailInliningTests(TestCase):
+    """Inlining the CSS changes only the styling of the rendered email"""
+
+    def test_inlined_matches_plain_render(self):
+        names = sorted(os.listdir(os.path.join(settings.BASE_DIR, 'templates', 'emails')))
+        self.assertTrue(names)
+        for name in names:
+            with self.subTest(template=name):
+                plain = HTMLOutline(render_to_string(f'emails/{name}', EMAIL_CONTEXT))
+                inlined = HTMLOutline(render_email(f'emails/{name}', EMAIL_CONTEXT).html)
+                self.assertEqual(inlined.outline, plain.outline)
+                for before, after in zip(plain.styles, inlined.styles):
+                    self.assertLessEqual(before, after)
+
+    def test_css_inlined_when_compiled(self):
+        for name in sorted(os.listdir(os.path.join(settings.BASE_DIR, 'templates', 'emails'))):
+            with self.subTest(template=name):
+                self.assertFalse(get_email_template(f'emails/{name}').inline_on_render)
+                with mock.patch('products.email_rendering.inline_css') as inline_css:
+                    render_email(f'emails/{name}', EMAIL_CONTEXT)
+                inline_css.assert_not_called()
+
+    def test_template_tags_inside_attributes(self):
+        html = render_email('emails/admin_digest.html', EMAIL_CONTEXT).html
+        self.assertIn('background-color: #ffffff', html)
+        self.assertIn('background-color: #faf8f6', html)
+        self.assertNotIn('{%', html)
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+            'emails/test_rows.html': (
+                '<style>td.total { font-weight: 600; }</style><table><tr>{% for row in rows %}'
+                '<td class="{% if row > 100 %}total{% endif %}" style="padding: 4px;">{{ row }}</td>'
+                '{% endfor %}</tr></table>'
+            ),
+        })]},
+    }])
+    def test_classes_set_by_template_tags(self):
+        self.addCleanup(get_email_template.cache_clear)
+        # Which rules apply is only known per render
+        self.assertTrue(get_email_template('emails/test_rows.html').inline_on_render)
+        html = render_email('emails/test_rows.html', {'rows': [50, 500]}).html
+        self.assertIn('<td class="" style="padding: 4px;">50</td>', html)
+        self.assertIn('<td class="total" style="font-weight: 600; padding: 4px">500</td>', html)
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+            'emails/test_style.html': (
+                '<style>td.total { font-weight: 600; color: black; }</style><table><tr>'
+                '<td class="total" style="{% if late %}color: red;{% endif %}">{{ amount }}</td></tr></table>'
+            ),
+        })]},
+    }])
+    def test_template_tags_inside_style(self):
+        self.addCleanup(get_email_template.cache_clear)
+        template = get_email_template('emails/test_style.html')
+        self.assertFalse(template.inline_on_render)
+        self.assertIn('style="font-weight: 600; color: black; {% if late %}', template.template.template.source)
+        self.assertIn(
+            '<td class="total" style="font-weight: 600; color: black; color: red;">500</td>',
+            render_email('emails/test_style.html', {'amount': 500, 'late': True}).html,
+        )
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend', COMPANY_EMAIL='studio@example.com')
+class EmailTaskQueryTests(TestCase):
+    """Each email task loads what it renders in a fixed number of queries, however many items an order has"""
+
+    # Queries per task
+    BUDGETS = {
+        'send_product_order_confirmation_email': 2,  # order + prefetched items
+        'send_product_order_admin_notification': 2,
+        'send_workshop_confirmation_email': 1,       # registration JOIN workshop, slot
+        'send_workshop_admin_notification': 1,
+        'send_custom_order_admin_email': 0,          # everything arrives as arguments
+        'send_custom_order_customer_email': 0,
+        'send_corporate_inquiry_admin_notification': 0,
+        'send_corporate_inquiry_customer_email': 0,
+    }
+    # Digest mode adds the AdminEvent insert, the "digest job queued?" check
+    # and the digest job insert, inside a savepoint (2 more statements)
+    DIGEST_EXTRA = 5
+
+    CUSTOM_ORDER = dict(
+        order_id=1, order_number='CO-2026-000001', name='Asha Mehta', email='asha@example.com',
+        phone='9876543210', project_type_display='Dinnerware set', budget_display='₹10,000 - ₹25,000',
+        description='Twelve matching plates',
+    )
+    INQUIRY = dict(
+        inquiry_id=1, inquiry_number='CI-2026-000001', company_name='Acme', contact_name='Ravi',
+        email='ravi@acme.test', phone='9876543210', service_type_display='Team workshop',
+        team_size='20', budget_range='₹50,000+', message='Offsite in December',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.orders = {}
+        for count in (1, 5):
+            order = Order.objects.create(
+                customer_name='Asha Mehta', customer_email='asha@example.com', customer_phone='9876543210',
+                shipping_address='12 Hill Road', shipping_city='Mumbai', shipping_state='Maharashtra',
+                shipping_pincode='400050', subtotal=Decimal('0'), total_amount=Decimal('0'),
+                payment_method='razorpay', payment_status=True,
+            )
+            for i in range(count):
+                OrderItem.objects.create(order=order, product=make_product(f'test-bowl-{count}-{i}', '600.00'), quantity=2)
+            cls.orders[count] = order
+
+        workshop = Workshop.objects.create(
+            workshop_id='test-wheel', name='Wheel Throwing Basics', workshop_type='group',
+            description='Test workshop', short_description='Test workshop',
+            duration_hours=Decimal('3'), price=Decimal('1500'), max_participants=8,
+        )
+        slot = WorkshopSlot.objects.create(
+            workshop=workshop, date=timezone.localdate() + timedelta(days=7),
+            start_time=time(10, 0), end_time=time(13, 0), available_spots=8,
+        )
+        cls.registration = WorkshopRegistration.objects.create(
+            workshop=workshop, slot=slot, full_name='Asha Mehta', email='asha@example.com',
+            phone='9876543210', number_of_participants=2,
+        )
+
+    def calls(self, order):
+        return {
+            'send_product_order_confirmation_email': ((order.pk,), {}),
+            'send_product_order_admin_notification': ((order.pk,), {}),
+            'send_workshop_confirmation_email': ((self.registration.pk,), {}),
+            'send_workshop_admin_notification': ((self.registration.pk,), {}),
+            'send_custom_order_admin_email': ((), self.CUSTOM_ORDER),
+            'send_custom_order_customer_email': ((), {
+                key: self.CUSTOM_ORDER[key] for key in ('order_number', 'name', 'email', 'project_type_display')
+            }),
+            'send_corporate_inquiry_admin_notification': ((), self.INQUIRY),
+            'send_corporate_inquiry_customer_email': ((), {
+                key: self.INQUIRY[key]
+                for key in ('inquiry_number', 'company_name', 'contact_name', 'email', 'service_type_display')
+            }),
+        }
+
+    def test_one_email_per_event(self):
+        for count, order in self.orders.items():
+            for name, (args, kwargs) in self.calls(order).items():
+                with self.subTest(task=name, items=count), self.assertNumQueries(self.BUDGETS[name]):
+                    getattr(tasks, name)(*args, **kwargs)
+        self.assertEqual(len(mail.outbox), 16)
+        for message in mail.outbox:
+            # HTML, with the text part derived from it
+            [(html, mimetype)] = message.alternatives
+            self.assertEqual(message.body, html_to_text(html))
+
+    @mock.patch.object(digests, 'WINDOW', 600)
+    def test_digest_mode(self):
+        admin_tasks = [name for name in self.BUDGETS if 'admin' in name]
+        for count, order in self.orders.items():
+            for name in admin_tasks:
+                # The first event of a window
+                Job.objects.filter(task=tasks.send_admin_digest.name).delete()
+                args, kwargs = self.calls(order)[name]
+                with self.subTest(task=name, items=count), self.assertNumQueries(self.BUDGETS[name] + self.DIGEST_EXTRA):
+                    getattr(tasks, name)(*args, **kwargs)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+EMAIL_SETTINGS = dict(
+    CELERY_ENABLED=False,
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    COMPANY_EMAIL='studio@example.com',
+)
+
+
+def create_inquiry(client):
+    return client.post('/api/products/corporate-inquiries/', {
+        'company_name': 'Acme', 'contact_name': 'Ravi', 'email': 'ravi@acme.test',
+        'phone': '9876543210', 'service_type': 'workshop', 'message': 'Offsite',
+    }, content_type='application/json')
+
+
+@override_settings(**EMAIL_SETTINGS)
+class JobWorkerTests(TransactionTestCase):
+    """Emails are stored as jobs with the record and sent by run_jobs (committed rows: worker threads)"""
+
+    def test_emails_wait_for_the_worker(self):
+        response = create_inquiry(self.client)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Job.objects.filter(status='queued').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('run_jobs', once=True, stdout=StringIO())
+        self.assertEqual(Job.objects.filter(status='done').count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+
+@override_settings(JOB_RUN_INLINE=True, **EMAIL_SETTINGS)
+class InlineJobTests(TestCase):
+    """JOB_RUN_INLINE sends the emails in the request when no worker is deployed"""
+
+    def test_inline_without_a_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            create_inquiry(self.client)
+        self.assertEqual(Job.objects.filter(status='done').count(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+
+
+@override_settings(**EMAIL_SETTINGS)
+@mock.patch.object(digests, 'WINDOW', 600)
+class AdminDigestTests(TestCase):
+    """Digest mode buffers admin notifications and sends one email per window"""
+
+    INQUIRY = EmailTaskQueryTests.INQUIRY
+
+    def make_order(self, total='900.00', **fields):
+        return Order.objects.create(
+            customer_name='Asha Mehta', customer_email='asha@example.com', customer_phone='9876543210',
+            shipping_address='12 Hill Road', shipping_city='Mumbai', shipping_state='Maharashtra',
+            shipping_pincode='400050', subtotal=Decimal(total), total_amount=Decimal(total),
+            payment_method='razorpay', payment_status=True, **fields
+        )
+
+    def test_events_wait_for_one_digest_job(self):
+        tasks.send_product_order_admin_notification(self.make_order().pk)
+        tasks.send_product_order_admin_notification(self.make_order().pk)
+        tasks.send_corporate_inquiry_admin_notification(**self.INQUIRY)
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(AdminEvent.objects.filter(digest_sent_at__isnull=True).count(), 3)
+        job = Job.objects.get(task=tasks.send_admin_digest.name)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=590))
+
+        tasks.send_admin_digest()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('3 new', mail.outbox[0].subject)
+        self.assertFalse(AdminEvent.objects.filter(digest_sent_at__isnull=True).exists())
+
+    def test_urgent_orders_are_emailed_at_once(self):
+        tasks.send_product_order_admin_notification(self.make_order(internal_notes='Oversold: 1 x Mug').pk)
+        tasks.send_product_order_admin_notification(self.make_order().pk, urgent=True)
+        with mock.patch.object(digests, 'URGENT_ORDER_TOTAL', Decimal('5000')):
+            tasks.send_product_order_admin_notification(self.make_order(total='7500.00').pk)
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(AdminEvent.objects.exists())
+        self.assertFalse(Job.objects.filter(task=tasks.send_admin_digest.name).exists())
+
+    def test_failed_send_puts_the_events_back(self):
+        tasks.send_product_order_admin_notification(self.make_order().pk)
+        tasks.send_corporate_inquiry_admin_notification(**self.INQUIRY)
+
+        with mock.patch('django.core.mail.EmailMultiAlternatives.send', side_effect=OSError('smtp down')):
+            with self.assertRaises(OSError):
+                tasks.send_admin_digest()
+        self.assertEqual(AdminEvent.objects.filter(digest_sent_at__isnull=True).count(), 2)
+
+        tasks.send_admin_digest()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('2 new', mail.outbox[0].subject)
+
+
+class FakeSMTP:
+    """smtplib.SMTP stand-in recording connections and messages"""
+
+    opened = []
+    failing = 0  # sends each new connection fails
+
+    def __init__(self, host, port, **kwargs):
+        self.sent = []
+        self.closed = False
+        self.fail_next = FakeSMTP.failing
+        FakeSMTP.opened.append(self)
+
+    def sendmail(self, from_email, recipients, message):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(recipients)
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+class PooledEmailBackendTests(TestCase):
+    """The pooled SMTP backend reuses, retires and replaces connections"""
+
+    def setUp(self):
+        FakeSMTP.opened = []
+        FakeSMTP.failing = 0
+        for patcher in (
+            mock.patch('smtplib.SMTP', FakeSMTP),
+            mock.patch.object(smtp_pool, 'pool', smtp_pool.SMTPConnectionPool()),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def send(self, count=1):
+        backend = smtp_pool.PooledEmailBackend(host='smtp.test', port=587, username='', password='', use_tls=False)
+        messages = [
+            mail.EmailMessage('Order shipped', 'On its way', 'studio@example.com', [f'customer{i}@example.com'])
+            for i in range(count)
+        ]
+        return backend.send_messages(messages)
+
+    def test_connection_is_reused_across_sends(self):
+        self.assertEqual(self.send(), 1)
+        self.assertEqual(self.send(2), 2)
+        [smtp] = FakeSMTP.opened
+        self.assertEqual(len(smtp.sent), 3)
+        self.assertFalse(smtp.closed)
+
+    def test_dropped_connection_reconnects_once(self):
+        self.send()
+        FakeSMTP.opened[0].fail_next = 1
+        self.assertEqual(self.send(), 1)
+        dead, fresh = FakeSMTP.opened
+        self.assertTrue(dead.closed)
+        self.assertEqual(len(fresh.sent), 1)
+
+        # The replacement connection failing too is an error, not another retry
+        fresh.fail_next = 1
+        FakeSMTP.failing = 1
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            self.send()
+        self.assertEqual(len(FakeSMTP.opened), 3)
+
+    @mock.patch.object(smtp_pool, 'MAX_MESSAGES', 2)
+    def test_connection_retired_after_max_messages(self):
+        self.send(2)
+        self.send()
+        first, second = FakeSMTP.opened
+        self.assertTrue(first.closed)
+        self.assertEqual((len(first.sent), len(second.sent)), (2, 1))
+
+    def test_idle_connection_is_dropped(self):
+        self.send()
+        with mock.patch.object(smtp_pool, 'IDLE_TIMEOUT', 0):
+            self.send()
+        stale, fresh = FakeSMTP.opened
+        self.assertTrue(stale.closed)
+        self.assertEqual(len(fresh.sent), 1)
+
+
+class NumberAllocatorTests(TransactionTestCase):
+    """Business numbers stay unique across leased blocks (committed counter rows)"""
+
+    def test_workers_never_share_a_number(self):
+        # Three worker processes taking turns, each through several blocks
+        workers = [NumberAllocator() for _ in range(3)]
+        values = [workers[i % 3].next_value('order') for i in range(BLOCK_SIZE * 5)]
+        self.assertEqual(len(set(values)), len(values))
+        for index in range(len(workers)):
+            served = values[index::3]
+            self.assertEqual(served, sorted(served))
+
+    def test_threads_of_one_worker_never_share_a_number(self):
+        allocator = NumberAllocator()
+
+        def allocate(count):
+            try:
+                return [allocator.next_value('order') for _ in range(count)]
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            batches = list(executor.map(allocate, [BLOCK_SIZE] * 4))
+        values = [value for batch in batches for value in batch]
+        self.assertEqual(len(set(values)), BLOCK_SIZE * 4)
+
+    def test_number_taken_in_a_transaction_rolls_back_with_it(self):
+        with transaction.atomic():
+            value = NumberAllocator().next_value('custom_order')
+            transaction.set_rollback(True)
+        # Leased one at a time inside a transaction: the counter rolled back with
+        # it, so no other number (or block) was taken out of circulation
+        self.assertEqual(NumberAllocator().next_value('custom_order'), value)
+
+    def test_numbers_are_formatted_per_sequence(self):
+        self.assertRegex(allocate_number('order'), r'^ORD-\d{4}-\d{6}$')
+        self.assertRegex(allocate_number('corporate_inquiry'), r'^CORP-\d{4}-\d{6}$')
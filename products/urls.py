@@ -14,6 +14,7 @@ router.register(r'products', views.ProductViewSet, basename='product')
 router.register(r'custom-orders', views.CustomOrderViewSet, basename='customorder')
 router.register(r'corporate-inquiries', views.CorporateInquiryViewSet, basename='corporateinquiry')
 router.register(r'orders', views.OrderViewSet, basename='order')
+router.register(r'carts', views.CartViewSet, basename='cart')
 
 urlpatterns = [
     # REST API endpoints
@@ -31,6 +32,10 @@ urlpatterns = [
     # JavaScript-based Razorpay payment endpoints
     path('create-razorpay-order/', views.create_razorpay_order, name='create_razorpay_order'),
     path('verify-payment/', views.verify_payment, name='verify_payment'),
+    path('payment-status/<str:razorpay_order_id>/', views.payment_status, name='payment_status'),
+    
+    # Razorpay server-to-server notifications
+    path('razorpay-webhook/', views.razorpay_webhook, name='razorpay_webhook'),
     
     # Order tracking endpoint (for chatbot)
     path('track-order/', views.track_order, name='track_order'),
@@ -3,6 +3,8 @@
 # REST API views for React frontend
 # Your friend needs to complete these view functions
 
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.permissions import AllowAny
@@ -10,10 +12,18 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.views.decorators.cache import never_cache
+from django.utils.decorators import method_decorator
+from django.http import JsonResponse
 from django.conf import settings
-import razorpay
-from .models import Product, CustomOrder, CorporateInquiry, Order, OrderItem
-from .serializers import ProductSerializer, CustomOrderSerializer, CorporateInquirySerializer, OrderSerializer
+from django.db import transaction
+from django.db.models import Q
+from .models import Product, CustomOrder, CorporateInquiry, Order, OrderItem, tag_filter
+from .serializers import ProductSerializer, ProductListSerializer, CustomOrderSerializer, CorporateInquirySerializer, OrderSerializer
+from .pagination import ListPagination
+from .inventory import release_expired_holds
+from basho_project.conditional import ConditionalGetMixin
 
 
 # ====================
@@ -21,7 +31,7 @@ from .serializers import ProductSerializer, CustomOrderSerializer, CorporateInqu
 # Purpose: REST API for products (GET, POST, PUT, DELETE)
 # URLs: /api/products/ and /api/products/{id}/
 # ====================
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API ViewSet for Product model
     Provides: list, retrieve, create, update, delete
@@ -33,36 +43,108 @@ class ProductViewSet(viewsets.ModelViewSet):
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ListPagination
     lookup_field = 'product_id'
     
-    def get_queryset(self):
+    # Max ids accepted by the bulk lookup
+    BULK_LOOKUP_LIMIT = 100
+    
+    def get_serializer_class(self):
+        """Slim cards for the catalog list, full product everywhere else"""
+        if self.action == 'list':
+            return ProductListSerializer
+        return ProductSerializer
+    
+    def get_sparse_fields(self):
         """
-        Filter products based on query parameters
+        Field names requested with ?fields=a,b or ?omit=a,b
+        Returns None when the default representation was asked for
         """
-        queryset = Product.objects.filter(in_stock=True)
+        params = self.request.query_params
+        if params.get('fields'):
+            requested = set(params['fields'].split(','))
+            return [name for name in ProductSerializer.Meta.fields if name in requested]
+        if params.get('omit'):
+            omitted = set(params['omit'].split(','))
+            return [name for name in self.get_serializer_class().Meta.fields if name not in omitted]
+        return None
+    
+    def get_serializer(self, *args, **kwargs):
+        """Apply ?fields= / ?omit= to read requests"""
+        if self.request.method == 'GET' and 'fields' not in kwargs:
+            fields = self.get_sparse_fields()
+            if fields is not None:
+                kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+    
+    @staticmethod
+    def parse_price(value):
+        """A price bound from the query string, or None if missing or not a finite number"""
+        if not value:
+            return None
+        try:
+            price = Decimal(value)
+        except InvalidOperation:
+            return None
+        return price if price.is_finite() else None
+    
+    def get_filter_conditions(self):
+        """
+        Active catalog filters from the query parameters, keyed by facet
+        Kept separate so the facets endpoint can leave one filter out per facet
+        """
+        conditions = {}
         
         # Filter by category
         category = self.request.query_params.get('category', None)
         if category and category != 'all':
-            queryset = queryset.filter(category=category)
+            conditions['category'] = Q(category=category)
         
         # Filter by featured
         featured = self.request.query_params.get('featured', None)
         if featured:
-            queryset = queryset.filter(is_featured=True)
+            conditions['featured'] = Q(is_featured=True)
+        
+        # Filter by price range (malformed bounds are ignored, like unknown tags)
+        price = Q()
+        min_price = self.parse_price(self.request.query_params.get('min_price', None))
+        if min_price is not None:
+            price &= Q(price__gte=min_price)
+        max_price = self.parse_price(self.request.query_params.get('max_price', None))
+        if max_price is not None:
+            price &= Q(price__lte=max_price)
+        if price:
+            conditions['price'] = price
+        
+        # Filter by tags (?tags=food_safe,handmade&tag_match=any|all)
+        tags = self.request.query_params.get('tags', None)
+        if tags:
+            condition = tag_filter(tags.split(','), self.request.query_params.get('tag_match', 'any'))
+            if condition is not None:
+                conditions['tags'] = condition
+        
+        return conditions
+    
+    def get_queryset(self):
+        """
+        Filter products based on query parameters
+        """
+        queryset = Product.objects.filter(in_stock=True)
+        
+        for condition in self.get_filter_conditions().values():
+            queryset = queryset.filter(condition)
         
-        # Search by name or description
+        # Search by name or description (trigram index, typo tolerant)
         search = self.request.query_params.get('search', None)
         if search:
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(name__icontains=search) | 
-                Q(description__icontains=search)
-            )
-        
-        # Sort
-        sort = self.request.query_params.get('sort', 'newest')
-        if sort == 'price-low':
+            from .search import search_products
+            queryset = search_products(queryset, search)
+
+        # Sort (search results are ranked by relevance unless a sort is requested)
+        sort = self.request.query_params.get('sort', 'relevance' if search else 'newest')
+        if sort == 'relevance' and search:
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        elif sort == 'price-low':
             queryset = queryset.order_by('price')
         elif sort == 'price-high':
             queryset = queryset.order_by('-price')
@@ -75,6 +157,101 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """List products, or 304 if the client's copy is still current"""
+        # Abandoned checkouts hide their products (in_stock) until released
+        release_expired_holds()
+        return self.conditional_get(request, self.list_from_fragments)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """One product, or 304 if the client's copy is still current"""
+        release_expired_holds()
+        return super().retrieve(request, *args, **kwargs)
+    
+    def list_from_fragments(self):
+        """
+        List products from cached per-product fragments
+        The page query only loads the columns needed to find fragments
+        """
+        from .fragments import PAGE_FIELDS, render_products
+
+        # Fields outside the list card can't come from fragments; load just
+        # the columns they need instead
+        fields = self.get_sparse_fields()
+        use_fragments = fields is None or set(fields) <= set(ProductListSerializer.Meta.fields)
+        columns = set(PAGE_FIELDS)
+        if not use_fragments:
+            columns.update(ProductSerializer.columns_for(fields))
+
+        queryset = self.filter_queryset(self.get_queryset()).only(*columns)
+        page = self.paginate_queryset(queryset)
+        products = page if page is not None else list(queryset)
+
+        context = self.get_serializer_context()
+        if use_fragments:
+            data = render_products(products, ProductListSerializer, context)
+            if fields is not None:
+                data = [{name: item[name] for name in fields} for item in data]
+        else:
+            data = ProductSerializer(products, many=True, fields=fields, context=context).data
+
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @action(detail=False, methods=['get', 'post'])
+    def bulk(self, request):
+        """
+        Look up many products at once (cart hydration)
+        URL: /api/products/products/bulk/?ids=bowl-1,plate-2
+        or POST {"ids": ["bowl-1", "plate-2"]}
+        
+        Returns every requested product (in stock or not) from one in_bulk
+        query, plus the ids that don't exist or are out of stock.
+        """
+        if request.method == 'POST':
+            ids = request.data.get('ids', [])
+        else:
+            ids = request.query_params.get('ids', '').split(',')
+        
+        if not isinstance(ids, list):
+            return Response({
+                'error': 'ids must be a list of product ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Keep request order, drop blanks and duplicates
+        ids = list(dict.fromkeys(str(product_id).strip() for product_id in ids if str(product_id).strip()))
+        if len(ids) > self.BULK_LOOKUP_LIMIT:
+            return Response({
+                'error': f'At most {self.BULK_LOOKUP_LIMIT} ids per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        columns = ProductListSerializer.columns_for(ProductListSerializer.Meta.fields)
+        found = Product.objects.only(*columns).in_bulk(ids, field_name='product_id')
+        products = [found[product_id] for product_id in ids if product_id in found]
+        
+        return Response({
+            'products': ProductListSerializer(products, many=True, context=self.get_serializer_context()).data,
+            'missing': [product_id for product_id in ids if product_id not in found],
+            'out_of_stock': [product.product_id for product in products if not product.in_stock],
+        })
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Category, price-range and tag counts for the current catalog filters
+        URL: /api/products/products/facets/?category=art&search=bowl
+        
+        Every facet is computed in one aggregate query; each facet ignores its
+        own filter so the UI can show the alternatives to the current choice.
+        """
+        from .facets import get_facets
+        
+        return Response(get_facets(
+            conditions=self.get_filter_conditions(),
+            search=request.query_params.get('search', None),
+        ))
+
 
 # ====================
 # CUSTOM ORDER API VIEWSET
@@ -96,19 +273,21 @@ class CustomOrderViewSet(viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         """
-        Create new custom order and send email notifications asynchronously
+        Create new custom order and queue the email notifications
+        The emails are stored as jobs in the same transaction as the order
+        (products/jobs.py), so the response never waits for the mail server
         """
+        from .jobs import enqueue
+        from .tasks import send_custom_order_admin_email, send_custom_order_customer_email
+        
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        custom_order = serializer.save()
         
-        # Trigger email tasks (with automatic Celery/sync fallback)
-        try:
-            from .tasks import send_custom_order_admin_email, send_custom_order_customer_email
-            from .email_utils import send_email_with_celery_fallback
+        with transaction.atomic():
+            custom_order = serializer.save()
             
-            # Send admin email (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(
+            # Admin notification
+            enqueue(
                 send_custom_order_admin_email,
                 order_id=custom_order.id,
                 order_number=custom_order.order_number,
@@ -120,18 +299,14 @@ class CustomOrderViewSet(viewsets.ModelViewSet):
                 description=custom_order.description
             )
             
-            # Send customer confirmation email (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(
+            # Customer confirmation
+            enqueue(
                 send_custom_order_customer_email,
                 order_number=custom_order.order_number,
                 name=custom_order.name,
                 email=custom_order.email,
                 project_type_display=custom_order.get_project_type_display()
             )
-            
-        except Exception as e:
-            # Log the error but don't fail the request
-            print(f"Failed to send email: {str(e)}")
         
         return Response({
             'success': True,
@@ -157,20 +332,20 @@ class CorporateInquiryViewSet(viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         """
-        Create new corporate inquiry and send email notifications
-        Automatically uses Celery if available, falls back to sync
+        Create new corporate inquiry and queue the email notifications
+        (stored as jobs in the inquiry's transaction, see products/jobs.py)
         """
+        from .jobs import enqueue
+        from .tasks import send_corporate_inquiry_admin_notification, send_corporate_inquiry_customer_email
+        
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        inquiry = serializer.save()
         
-        # Send emails (with automatic Celery/sync fallback)
-        try:
-            from .tasks import send_corporate_inquiry_admin_notification, send_corporate_inquiry_customer_email
-            from .email_utils import send_email_with_celery_fallback
+        with transaction.atomic():
+            inquiry = serializer.save()
             
-            # Send admin notification (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(
+            # Admin notification
+            enqueue(
                 send_corporate_inquiry_admin_notification,
                 inquiry_id=inquiry.id,
                 inquiry_number=inquiry.inquiry_number,
@@ -184,8 +359,8 @@ class CorporateInquiryViewSet(viewsets.ModelViewSet):
                 message=inquiry.message
             )
             
-            # Send customer confirmation (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(
+            # Customer confirmation
+            enqueue(
                 send_corporate_inquiry_customer_email,
                 inquiry_number=inquiry.inquiry_number,
                 company_name=inquiry.company_name,
@@ -193,10 +368,6 @@ class CorporateInquiryViewSet(viewsets.ModelViewSet):
                 email=inquiry.email,
                 service_type_display=inquiry.get_service_type_display()
             )
-            
-        except Exception as e:
-            # Log the error but don't fail the request
-            print(f"Failed to send corporate inquiry emails: {str(e)}")
         
         return Response({
             'success': True,
@@ -216,8 +387,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     API ViewSet for Order model
     Handles product orders from checkout
     """
-    queryset = Order.objects.all()
+    # Each item's image comes from its product
+    queryset = Order.objects.prefetch_related('items__product')
     serializer_class = OrderSerializer
+    pagination_class = ListPagination
     
     def create(self, request, *args, **kwargs):
         """
@@ -239,6 +412,128 @@ class OrderViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_201_CREATED)
 
 
+# ====================
+# SERVER-SIDE CART API
+# Purpose: Persistent carts for logged-in users (products/carts.py)
+# URLs: /api/products/carts/{firebase_uid}/ (+ add/, set/, merge/)
+# ====================
+@method_decorator(never_cache, name='dispatch')  # carts change per request; keep them out of the page cache
+class CartViewSet(viewsets.ViewSet):
+    """
+    Cart of a logged-in user, returned priced by the server
+    - GET    /carts/{firebase_uid}/         : Priced cart
+    - PUT    /carts/{firebase_uid}/         : Replace cart {"items": [...]}
+    - DELETE /carts/{firebase_uid}/         : Empty the cart
+    - POST   /carts/{firebase_uid}/add/     : {"product_id": 1, "quantity": 1} (adds to it)
+    - POST   /carts/{firebase_uid}/set/     : {"product_id": 1, "quantity": 3} (0 removes)
+    - POST   /carts/{firebase_uid}/merge/   : Merge the guest cart after login {"items": [...]}
+    Items are {"product_id": <product pk>, "quantity": n}
+    """
+    lookup_field = 'firebase_uid'
+    lookup_value_regex = '[^/]+'
+    
+    def get_user_id(self, firebase_uid):
+        user_id = User.objects.filter(username=firebase_uid).values_list('pk', flat=True).first()
+        if user_id is None:
+            from django.http import Http404
+            raise Http404('User not found')
+        return user_id
+    
+    def parse_items(self, items):
+        """[{"product_id", "quantity"}] -> {product pk: quantity} (repeated products add up)"""
+        from .pricing import PricingError
+        
+        if not isinstance(items, list):
+            raise PricingError("'items' must be a list")
+        parsed = {}
+        for item in items:
+            product_id, quantity = self.parse_line(item)
+            parsed[product_id] = parsed.get(product_id, 0) + quantity
+        return parsed
+    
+    def parse_line(self, item, allow_zero=False):
+        from .pricing import PricingError, parse_quantity
+        
+        try:
+            product_id = int(item['product_id'])
+        except (KeyError, TypeError, ValueError):
+            raise PricingError("Each item needs a numeric 'product_id'")
+        if allow_zero and str(item.get('quantity')) == '0':
+            return product_id, 0
+        return product_id, parse_quantity(item.get('quantity', 1))
+    
+    def cart_response(self, user_id, status_code=status.HTTP_200_OK):
+        from .carts import CART_PRODUCT_FIELDS, price_cart
+        
+        quote = price_cart(user_id)
+        products = ProductListSerializer(
+            [line.product for line in quote.lines],
+            many=True,
+            fields=CART_PRODUCT_FIELDS,
+            context={'request': self.request}
+        ).data
+        return Response({
+            'items': [
+                {
+                    'product': product,
+                    'quantity': line.quantity,
+                    'line_total': float(line.line_total),
+                }
+                for line, product in zip(quote.lines, products)
+            ],
+            'item_count': sum(line.quantity for line in quote.lines),
+            'subtotal': float(quote.subtotal),
+            'shipping_charge': float(quote.shipping_charge),
+            'tax_amount': float(quote.tax_amount),
+            'total_amount': float(quote.total_amount),
+            'is_free_shipping': quote.is_free_shipping,
+            'removed': quote.missing,
+        }, status=status_code)
+    
+    def handle(self, firebase_uid, change):
+        """Apply change(user_id) and answer with the priced cart"""
+        from .pricing import PricingError
+        
+        user_id = self.get_user_id(firebase_uid)
+        try:
+            change(user_id)
+        except PricingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cart_response(user_id)
+    
+    def retrieve(self, request, firebase_uid=None):
+        return self.cart_response(self.get_user_id(firebase_uid))
+    
+    def update(self, request, firebase_uid=None):
+        from .carts import replace_cart
+        return self.handle(firebase_uid, lambda user_id: replace_cart(
+            user_id, self.parse_items(request.data.get('items', []))
+        ))
+    
+    def destroy(self, request, firebase_uid=None):
+        from .carts import replace_cart
+        return self.handle(firebase_uid, lambda user_id: replace_cart(user_id, {}))
+    
+    @action(detail=True, methods=['post'])
+    def add(self, request, firebase_uid=None):
+        from .carts import add_item
+        return self.handle(firebase_uid, lambda user_id: add_item(user_id, *self.parse_line(request.data)))
+    
+    @action(detail=True, methods=['post'], url_path='set')
+    def set_quantity(self, request, firebase_uid=None):
+        from .carts import set_item
+        return self.handle(firebase_uid, lambda user_id: set_item(
+            user_id, *self.parse_line(request.data, allow_zero=True)
+        ))
+    
+    @action(detail=True, methods=['post'])
+    def merge(self, request, firebase_uid=None):
+        from .carts import merge_guest_cart
+        return self.handle(firebase_uid, lambda user_id: merge_guest_cart(
+            user_id, self.parse_items(request.data.get('items', []))
+        ))
+
+
 # ====================
 # SHIPPING CALCULATOR API
 # Purpose: Calculate shipping cost
@@ -253,10 +548,10 @@ def calculate_shipping(request):
     Request body: {"weight": 2.5}
     Response: {"weight": 2.5, "shippingCost": 125, "ratePerKg": 50}
     
+    Region-based and express rates: see products/shipping.py
+    
     TODO for your friend:
-    1. Add region-based rates
-    2. Add express shipping option
-    3. Integrate with shipping provider API
+    1. Integrate with shipping provider API
     """
     try:
         weight_kg = float(request.data.get('weight', 0))
@@ -406,33 +701,70 @@ def create_razorpay_order(request):
     Create Razorpay order for payment
     
     Request body: {
-        "amount": 5000,  // Amount in rupees
+        "items": [  // Cart lines (required, or order_data.items); priced server-side and held
+            {"product_id": 1, "quantity": 2}
+        ],
         "customer_name": "John Doe",
         "customer_email": "john@example.com",
-        "customer_phone": "9876543210"
+        "customer_phone": "9876543210",
+        "order_data": {
+            // Order form (OrderSerializer fields), stored so the order can be
+            // created from the Razorpay webhook if the browser never returns
+        }
     }
     
     Response: {
         "order_id": "order_xyz123",
         "amount": 500000,  // Amount in paise
         "currency": "INR",
-        "key": "rzp_test_xxxxx"
+        "key": "rzp_test_xxxxx",
+        "hold_expires_in": 900  // Seconds the stock stays reserved
     }
     """
     try:
-        # Initialize Razorpay client
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+        from decimal import Decimal
+        from .gateway import GatewayUnavailable, create_order
+        from .inventory import HOLD_TTL, InsufficientStock, new_hold_reference, release_stock, rename_holds, reserve_stock
+        from .models import PendingCheckout
+        from .pricing import PricingError, quote_cart
         
-        # Get amount from request (in rupees)
-        amount_rupees = float(request.data.get('amount', 0))
+        order_form = request.data.get('order_data')
+        items = request.data.get('items')
+        if not items and order_form:
+            items = [
+                {'product_id': item.get('product'), 'quantity': item.get('quantity', 1)}
+                for item in order_form.get('items', [])
+            ]
+        if not items:
+            # The amount is always our own price for a cart, never the client's
+            return Response({
+                'error': 'Cart items are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Same pincode / tier the stored order form will be priced with
+        form = order_form or {}
+        try:
+            quote = quote_cart(
+                items,
+                id_key='product_id',
+                pincode=form.get('shipping_pincode') or request.data.get('pincode'),
+                shipping_tier=form.get('shipping_tier') or request.data.get('shipping_tier', 'standard'),
+            )
+        except PricingError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if quote.missing:
+            return Response({
+                'error': 'Some products no longer exist',
+                'missing': quote.missing
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        if amount_rupees <= 0:
+        if quote.total_amount <= 0:
             return Response({
                 'error': 'Amount must be greater than 0'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Convert to paise (Razorpay accepts amount in smallest currency unit)
-        amount_paise = int(amount_rupees * 100)
+        amount_paise = int((quote.total_amount * 100).to_integral_value())
         
         # Create Razorpay order
         order_data = {
@@ -446,14 +778,47 @@ def create_razorpay_order(request):
             }
         }
         
-        razorpay_order = client.order.create(data=order_data)
+        # Hold the stock until the payment is verified (or the hold expires).
+        # Held first, so a sold-out cart never opens a Razorpay order; the
+        # holds are keyed provisionally until the order ID is known
+        hold_reference = new_hold_reference()
+        try:
+            reserve_stock(quote.lines, hold_reference)
+        except InsufficientStock as e:
+            return Response({
+                'error': str(e),
+                'out_of_stock': [product.product_id for product in e.products]
+            }, status=status.HTTP_409_CONFLICT)
+        
+        # Shared keep-alive client with deadlines and a circuit breaker
+        try:
+            razorpay_order = create_order(order_data)
+        except Exception as e:
+            release_stock(hold_reference)
+            if isinstance(e, GatewayUnavailable):
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            raise
+        rename_holds(hold_reference, razorpay_order['id'])
+        
+        # Keep the charged amount, the priced cart and the order form for the
+        # payment finalizer (products/checkout.py): the order is built from
+        # this quote, so later price or shipping changes don't affect it
+        PendingCheckout.objects.create(
+            razorpay_order_id=razorpay_order['id'],
+            order_data=order_form or {},
+            amount=Decimal(razorpay_order['amount']) / 100,
+            quote=quote.snapshot()
+        )
         
         return Response({
             'success': True,
             'order_id': razorpay_order['id'],
             'amount': razorpay_order['amount'],
             'currency': razorpay_order['currency'],
-            'key': settings.RAZORPAY_KEY_ID
+            'key': settings.RAZORPAY_KEY_ID,
+            'hold_expires_in': int(HOLD_TTL.total_seconds())
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
@@ -466,18 +831,25 @@ def create_razorpay_order(request):
 @permission_classes([AllowAny])
 def calculate_shipping(request):
     """
-    Calculate shipping cost based on cart items
+    Calculate shipping cost based on cart items and destination
     
     Request body: {
         "items": [
             {"product_id": 1, "quantity": 2},
             {"product_id": 2, "quantity": 1}
         ],
-        "subtotal": 1500.00
+        "subtotal": 1500.00,
+        "pincode": "400001",         // optional, flat rate without it
+        "shipping_tier": "standard"  // or "express"
     }
     
     Returns: {
         "shipping_charge": 150.00,
+        "shipping_tier": "standard",
+        "zone": "Mumbai Metro",      // null when the flat rate applies
+        "delivery_days": 3,
+        "express_charge": 250.00,    // null when express isn't available
+        "express_delivery_days": 1,
         "total_weight_kg": 3.5,
         "rate_per_kg": 50.00,
         "minimum_charge": 100.00,
@@ -486,40 +858,42 @@ def calculate_shipping(request):
     }
     """
     try:
-        from .models import ShippingConfig, Product
-        from decimal import Decimal
+        from .pricing import quote_cart
+        from .shipping import EXPRESS, ShippingUnavailable, quote_shipping
         
-        items = request.data.get('items', [])
-        subtotal = Decimal(str(request.data.get('subtotal', 0)))
+        pincode = request.data.get('pincode')
         
-        # Calculate total weight
-        total_weight = Decimal('0.0')
-        for item in items:
-            try:
-                product = Product.objects.get(id=item['product_id'])
-                quantity = int(item.get('quantity', 1))
-                if product.weight:
-                    total_weight += product.weight * quantity
-            except Product.DoesNotExist:
-                continue
-        
-        # Default to 1kg if no weight specified
-        if total_weight == 0:
-            total_weight = Decimal('1.0')
-        
-        # Get shipping configuration and calculate
-        config = ShippingConfig.load()
-        shipping_charge = config.calculate_shipping(total_weight, subtotal)
+        # Price every line server-side with one product query
+        # (the client's subtotal is ignored); zone rates are looked up in memory
+        try:
+            quote = quote_cart(
+                request.data.get('items', []),
+                id_key='product_id',
+                pincode=pincode,
+                shipping_tier=request.data.get('shipping_tier', 'standard'),
+            )
+        except ShippingUnavailable as e:
+            return Response({'error': str(e), 'express_available': False}, status=status.HTTP_400_BAD_REQUEST)
+        config = quote.shipping_config
         
-        is_free = shipping_charge == 0 and config.free_shipping_threshold > 0
+        try:
+            express = quote_shipping(quote.total_weight, quote.subtotal, pincode, EXPRESS, config)
+        except ShippingUnavailable:
+            express = None
         
         return Response({
-            'shipping_charge': float(shipping_charge),
-            'total_weight_kg': float(total_weight),
+            'shipping_charge': float(quote.shipping_charge),
+            'shipping_tier': quote.shipping.tier,
+            'zone': quote.shipping.zone_name,
+            'delivery_days': quote.shipping.delivery_days,
+            'express_charge': float(express.charge) if express else None,
+            'express_delivery_days': express.delivery_days if express else None,
+            'subtotal': float(quote.subtotal),
+            'total_weight_kg': float(quote.total_weight),
             'rate_per_kg': float(config.rate_per_kg),
             'minimum_charge': float(config.minimum_charge),
             'free_shipping_threshold': float(config.free_shipping_threshold),
-            'is_free_shipping': is_free,
+            'is_free_shipping': quote.is_free_shipping,
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -528,29 +902,70 @@ def calculate_shipping(request):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def payment_status_body(razorpay_order_id):
+    """
+    Finalization state of a Razorpay order for the browser
+
+    One unique-index lookup on Order; one indexed lookup on PaymentEvent
+    while the order doesn't exist yet
+    """
+    from .checkout import find_order
+    from .models import PaymentEvent
+    
+    order = find_order(razorpay_order_id)
+    if order:
+        return {
+            'success': True,
+            'status': 'completed',
+            'message': 'Payment verified and order created successfully',
+            'order_number': order.order_number,
+            'order_id': order.id,
+        }
+    
+    event = PaymentEvent.objects.filter(razorpay_order_id=razorpay_order_id).order_by('-created_at').first()
+    if event and event.status == 'failed':
+        return {
+            'success': False,
+            'status': 'failed',
+            'error': 'Payment received but the order could not be created. Our team has been notified.',
+        }
+    return {
+        'success': True,
+        'status': 'processing' if event else 'pending',
+        'message': 'Payment received, your order is being created',
+    }
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 @csrf_exempt
 def verify_payment(request):
     """
-    Verify Razorpay payment signature
+    Verify Razorpay payment signature and queue the order for creation
+    
+    The signature is checked locally, the callback is stored as a
+    PaymentEvent with a job that the run_jobs worker finalizes
+    (products/checkout.py), so this is a fast status read. Retries are
+    idempotent.
     
     Request body: {
         "razorpay_order_id": "order_xyz123",
         "razorpay_payment_id": "pay_abc456",
         "razorpay_signature": "signature_hash",
         "order_data": {
-            // All order fields for creating Order in database
+            // Only needed if it wasn't sent to create-razorpay-order
         }
     }
+    
+    Response: 202 {"status": "processing"} - poll
+    payment-status/<razorpay_order_id>/ until the worker has created the
+    order; 201 {"status": "completed", "order_number": ...} if it already
+    exists (e.g. JOB_RUN_INLINE)
     """
     try:
-        import logging
-        
-        logger = logging.getLogger(__name__)
-        
-        # Initialize Razorpay client
-        client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+        from .checkout import find_order, record_event
+        from .gateway import verify_payment_signature
+        from .models import PendingCheckout
         
         # Get payment details
         razorpay_order_id = request.data.get('razorpay_order_id')
@@ -562,107 +977,46 @@ def verify_payment(request):
                 'error': 'Missing payment verification parameters'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verify payment signature
-        params_dict = {
-            'razorpay_order_id': razorpay_order_id,
-            'razorpay_payment_id': razorpay_payment_id,
-            'razorpay_signature': razorpay_signature
-        }
-        
-        try:
-            client.utility.verify_payment_signature(params_dict)
-            payment_verified = True
-        except razorpay.errors.SignatureVerificationError:
-            payment_verified = False
+        # Verify payment signature first (local HMAC check, no gateway call):
+        # nothing about the order is revealed to an unsigned request
+        if not verify_payment_signature(razorpay_order_id, razorpay_payment_id, razorpay_signature):
             return Response({
                 'success': False,
                 'error': 'Payment verification failed'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # If payment verified, create order in database
-        if payment_verified:
-            order_data = request.data.get('order_data', {})
-            
-            # Calculate shipping based on configuration
-            from .models import ShippingConfig
-            from decimal import Decimal
-            
-            shipping_config = ShippingConfig.load()
-            
-            # Calculate total weight from items
-            total_weight = Decimal('0.0')
-            for item_data in order_data.get('items', []):
-                try:
-                    from .models import Product
-                    product = Product.objects.get(id=item_data['product'])
-                    quantity = item_data.get('quantity', 1)
-                    if product.weight:
-                        total_weight += product.weight * quantity
-                except:
-                    pass
-            
-            # Default to 1kg if no weight specified
-            if total_weight == 0:
-                total_weight = Decimal('1.0')
-            
-            # Calculate shipping
-            subtotal = Decimal(str(order_data.get('subtotal', 0)))
-            shipping_charge = shipping_config.calculate_shipping(total_weight, subtotal)
-            
-            # Update order data with payment info and calculated shipping
-            order_data['payment_method'] = 'razorpay'
-            order_data['payment_status'] = True
-            order_data['shipping_charge'] = shipping_charge
-            
-            # Create order
-            from .serializers import OrderSerializer
-            serializer = OrderSerializer(data=order_data)
-            
-            if serializer.is_valid():
-                order = serializer.save()
-                
-                # Store payment details in order notes
-                order.internal_notes = f"Razorpay Payment\nOrder ID: {razorpay_order_id}\nPayment ID: {razorpay_payment_id}"
-                order.save()
-                
-                # Send email confirmations (with automatic Celery/sync fallback)
-                email_sent = False
-                admin_email_sent = False
-                
-                try:
-                    from .tasks import send_product_order_confirmation_email, send_product_order_admin_notification
-                    from .email_utils import send_email_with_celery_fallback
-                    
-                    # Send customer confirmation email (async if Celery enabled, sync otherwise)
-                    send_email_with_celery_fallback(send_product_order_confirmation_email, order.id)
-                    email_sent = True
-                    logger.info(f"Customer confirmation email sent for order {order.order_number}")
-                except Exception as email_error:
-                    logger.error(f"Error sending customer email for order {order.order_number}: {str(email_error)}")
-                
-                try:
-                    # Send admin notification email (async if Celery enabled, sync otherwise)
-                    send_email_with_celery_fallback(send_product_order_admin_notification, order.id)
-                    admin_email_sent = True
-                    logger.info(f"Admin notification email sent for order {order.order_number}")
-                except Exception as email_error:
-                    logger.error(f"Error sending admin email for order {order.order_number}: {str(email_error)}")
-                
-                return Response({
-                    'success': True,
-                    'message': 'Payment verified and order created successfully',
-                    'order_number': order.order_number,
-                    'order_id': order.id,
-                    'payment_id': razorpay_payment_id,
-                    'email_queued': email_sent,
-                    'admin_notified': admin_email_sent
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response({
-                    'success': False,
-                    'error': 'Failed to create order',
-                    'details': serializer.errors
-                }, status=status.HTTP_400_BAD_REQUEST)
+        # Retry / double click: answer with the order this payment already created
+        if find_order(razorpay_order_id):
+            body = payment_status_body(razorpay_order_id)
+            body['already_processed'] = True
+            return Response(body, status=status.HTTP_200_OK)
+        
+        # Clients that didn't send the order form with create-razorpay-order.
+        # Only fills in the form: the amount was recorded by
+        # create-razorpay-order and a client can never set it
+        order_form = request.data.get('order_data')
+        if order_form:
+            pending = PendingCheckout.objects.filter(razorpay_order_id=razorpay_order_id).first()
+            if pending is not None and not pending.order_data:
+                pending.order_data = order_form
+                pending.save(update_fields=['order_data'])
+        
+        # Store the callback, then let the finalizer create the order
+        record_event(
+            event_id=f"checkout:{razorpay_payment_id}",
+            source='checkout',
+            event_type='checkout.verified',
+            razorpay_order_id=razorpay_order_id,
+            razorpay_payment_id=razorpay_payment_id,
+        )
+        
+        body = payment_status_body(razorpay_order_id)
+        body['payment_id'] = razorpay_payment_id
+        if not body['success']:
+            return Response(body, status=status.HTTP_400_BAD_REQUEST)
+        if body['status'] == 'completed':
+            return Response(body, status=status.HTTP_201_CREATED)
+        return Response(body, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         return Response({
@@ -670,6 +1024,56 @@ def verify_payment(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@never_cache  # polled while the order is being created; keep it out of the page cache
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def payment_status(request, razorpay_order_id):
+    """
+    Poll the order created for a Razorpay payment
+    
+    Returns: {"status": "completed" | "processing" | "pending" | "failed", ...}
+    """
+    body = payment_status_body(razorpay_order_id)
+    return Response(body, status=status.HTTP_200_OK if body['success'] else status.HTTP_400_BAD_REQUEST)
+
+
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    """
+    Razorpay webhook receiver (payment.captured / order.paid)
+    
+    Verifies X-Razorpay-Signature against the raw body, stores the event
+    (Razorpay redeliveries are deduplicated by X-Razorpay-Event-Id) and
+    acknowledges at once; the order is created by the job worker.
+    """
+    import json
+    from .checkout import record_event
+    from .gateway import verify_webhook_signature
+    
+    if not verify_webhook_signature(request.body, request.headers.get('X-Razorpay-Signature')):
+        return JsonResponse({'error': 'Invalid signature'}, status=400)
+    
+    try:
+        event = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    
+    payment = event.get('payload', {}).get('payment', {}).get('entity', {})
+    event_type = event.get('event', '')
+    event_id = request.headers.get('X-Razorpay-Event-Id') or f"{event_type}:{payment.get('id', '')}"
+    
+    record_event(
+        event_id=event_id,
+        source='webhook',
+        event_type=event_type,
+        razorpay_order_id=payment.get('order_id', ''),
+        razorpay_payment_id=payment.get('id', ''),
+        payload=event,
+    )
+    return JsonResponse({'status': 'ok'})
+
+
 # ====================
 # ORDER TRACKING API
 # Purpose: Look up order status for chatbot
@@ -711,13 +1115,13 @@ def track_order(request):
     Track order status by order number and email (read-only)
     
     Request body: {
-        "order_number": "ORD-20250115123456",
+        "order_number": "ORD-2025-000123",
         "email": "customer@example.com"
     }
     
     Response (success): {
         "found": true,
-        "order_number": "ORD-20250115123456",
+        "order_number": "ORD-2025-000123",
         "status": "shipped",
         "status_display": "Shipped",
         "tracking_number": "TRACK123456",
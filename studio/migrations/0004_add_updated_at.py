@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 17:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('studio', '0003_alter_eventgalleryimage_image_alter_pastpopup_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventgalleryimage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='pastpopup',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
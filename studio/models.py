@@ -32,6 +32,7 @@ class PastPopup(models.Model):
     image = CloudinaryField('image', folder='studio/past-popups/', blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-year', 'event_name']
@@ -49,6 +50,7 @@ class EventGalleryImage(models.Model):
     order = models.IntegerField(default=0, help_text="Display order (lower numbers first)")
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['order', '-created_at']
@@ -1,13 +1,15 @@
 from rest_framework import serializers
+from basho_project.images import ImageVariantsField
 from .models import UpcomingExhibition, PastPopup, EventGalleryImage, StudioTourSettings
 
 
 class UpcomingExhibitionSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
     
     class Meta:
         model = UpcomingExhibition
-        fields = ['id', 'title', 'location', 'start_date', 'end_date', 'description', 'image_url']
+        fields = ['id', 'title', 'location', 'start_date', 'end_date', 'description', 'image_url', 'image_variants']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -20,10 +22,11 @@ class UpcomingExhibitionSerializer(serializers.ModelSerializer):
 
 class PastPopupSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
     
     class Meta:
         model = PastPopup
-        fields = ['id', 'event_name', 'city', 'year', 'image_url']
+        fields = ['id', 'event_name', 'city', 'year', 'image_url', 'image_variants']
     
     def get_image_url(self, obj):
         if obj.image:
@@ -36,10 +39,11 @@ class PastPopupSerializer(serializers.ModelSerializer):
 
 class EventGalleryImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image')
     
     class Meta:
         model = EventGalleryImage
-        fields = ['id', 'image_url', 'alt_text', 'order']
+        fields = ['id', 'image_url', 'image_variants', 'alt_text', 'order']
     
     def get_image_url(self, obj):
         if obj.image:
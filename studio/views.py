@@ -1,6 +1,7 @@
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from basho_project.conditional import ConditionalGetMixin
 from .models import UpcomingExhibition, PastPopup, EventGalleryImage, StudioTourSettings
 from .serializers import (
     UpcomingExhibitionSerializer, 
@@ -10,7 +11,7 @@ from .serializers import (
 )
 
 
-class UpcomingExhibitionListView(generics.ListAPIView):
+class UpcomingExhibitionListView(ConditionalGetMixin, generics.ListAPIView):
     """List all active upcoming exhibitions"""
     serializer_class = UpcomingExhibitionSerializer
     
@@ -18,13 +19,13 @@ class UpcomingExhibitionListView(generics.ListAPIView):
         return UpcomingExhibition.objects.filter(is_active=True)
 
 
-class PastPopupListView(generics.ListAPIView):
+class PastPopupListView(ConditionalGetMixin, generics.ListAPIView):
     """List all past pop-ups"""
     queryset = PastPopup.objects.all()
     serializer_class = PastPopupSerializer
 
 
-class EventGalleryListView(generics.ListAPIView):
+class EventGalleryListView(ConditionalGetMixin, generics.ListAPIView):
     """List all event gallery images"""
     queryset = EventGalleryImage.objects.all()
     serializer_class = EventGalleryImageSerializer
@@ -0,0 +1,121 @@
+"""
+Email rendering benchmark: render_to_string + header image from disk
+vs the compiled templates of products/email_rendering.py
+
+Builds the order and workshop confirmation emails the way the tasks did
+before (render the template, read and encode email_header.jpg, attach) and
+with build_email(), and prints the average build time per email. No
+database or SMTP server is needed.
+
+Usage:
+    python tests/benchmark_email_rendering.py [emails]
+"""
+import os
+import sys
+import time
+from email.mime.image import MIMEImage
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+import django
+from django.conf import settings
+
+EMAILS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+settings.configure(
+    BASE_DIR=BASE_DIR,
+    DEFAULT_FROM_EMAIL='shop@basho.test',
+    TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [BASE_DIR / 'templates'],
+    }],
+)
+django.setup()
+
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+from products.email_rendering import build_email, render_stats
+
+CONTEXT = {
+    'customer_name': 'Asha Mehta',
+    'order_number': 'ORD-2026-000123',
+    'order_date': 'October 17, 2026 at 10:30 AM',
+    'payment_method': 'Razorpay',
+    'subtotal': '2,400.00',
+    'shipping_charge': '120.00',
+    'tax_amount': '0.00',
+    'discount_amount': '0.00',
+    'total_amount': '2,520.00',
+    'shipping_address': '12 Hill Road',
+    'shipping_city': 'Mumbai',
+    'shipping_state': 'Maharashtra',
+    'shipping_pincode': '400050',
+    'customer_phone': '9876543210',
+    'company_email': 'studio@basho.test',
+    'company_phone': '+91 98795 75601',
+    'order_items': [
+        {'product_name': f'Stoneware Bowl {i}', 'quantity': 2, 'product_price': '600.00', 'total_price': '1,200.00'}
+        for i in range(2)
+    ],
+    'registration_number': 'WS-2026-000045',
+    'workshop_name': 'Wheel Throwing Basics',
+    'workshop_type': 'Group',
+    'difficulty_level': 'Beginner',
+    'duration': 3,
+    'number_of_participants': 2,
+    'status': 'Confirmed',
+    'slot_date': 'November 02, 2026',
+    'slot_time': '10:00 AM - 01:00 PM',
+}
+
+
+def legacy_build(template_name):
+    """What the tasks did per email before"""
+    html_content = render_to_string(template_name, CONTEXT)
+    msg = EmailMultiAlternatives(
+        subject='Order Confirmation', body='Hand-written text copy',
+        from_email='shop@basho.test', to=['asha@example.com'],
+    )
+    msg.attach_alternative(html_content, "text/html")
+    header_image_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'email_header.jpg')
+    if os.path.exists(header_image_path):
+        with open(header_image_path, 'rb') as img_file:
+            img = MIMEImage(img_file.read())
+            img.add_header('Content-ID', '<header_image>')
+            img.add_header('Content-Disposition', 'inline', filename='header.jpg')
+            msg.attach(img)
+    return msg
+
+
+def compiled_build(template_name):
+    return build_email(template_name, CONTEXT, subject='Order Confirmation', to=['asha@example.com'])
+
+
+def measure(build, template_name):
+    build(template_name)  # warm up: template compile, image load
+    started = time.perf_counter()
+    for _ in range(EMAILS):
+        build(template_name)
+    return (time.perf_counter() - started) * 1000 / EMAILS
+
+
+print("=" * 60)
+print("EMAIL RENDERING")
+print("=" * 60)
+print(f"{EMAILS} emails per template (after one warm-up build)\n")
+
+for template_name in ('emails/order_confirmation.html', 'emails/workshop_confirmation.html'):
+    legacy = measure(legacy_build, template_name)
+    compiled = measure(compiled_build, template_name)
+    print(f"{template_name}")
+    print(f"  render_to_string + image from disk  {legacy:8.3f} ms/email")
+    print(f"  compiled template + cached image    {compiled:8.3f} ms/email  ({legacy / compiled:.1f}x faster)")
+
+print("\nrender_stats():")
+for name, figures in render_stats().items():
+    print(f"  {name}: {figures}")
+
+print("\n✓ Derived text part of the order confirmation:\n")
+print(compiled_build('emails/order_confirmation.html').body[:600])
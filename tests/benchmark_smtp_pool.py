@@ -0,0 +1,132 @@
+"""
+Throughput benchmark: stock SMTP backend vs pooled backend
+
+Runs a local aiosmtpd server (pip install aiosmtpd) that delays every
+EHLO to stand in for the TCP + STARTTLS + AUTH round trips of a real
+Gmail session, then sends the same messages through:
+
+1. django.core.mail.backends.smtp.EmailBackend, one msg.send() per email
+2. products.smtp_pool.PooledEmailBackend, one msg.send() per email
+3. products.smtp_pool.send_batch(), all emails through send_messages()
+
+Finally the server is restarted under the pool to check that a dropped
+connection is replaced transparently.
+
+Usage:
+    python tests/benchmark_smtp_pool.py [messages] [handshake_ms]
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+
+import django
+from django.conf import settings
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+HANDSHAKE_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+PORT = free_port()
+
+settings.configure(
+    EMAIL_BACKEND='products.smtp_pool.PooledEmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    EMAIL_PORT=PORT,
+    EMAIL_USE_TLS=False,
+    EMAIL_TIMEOUT=5,
+    DEFAULT_FROM_EMAIL='shop@basho.test',
+)
+django.setup()
+
+from django.core.mail import EmailMultiAlternatives
+from django.core.mail.backends.smtp import EmailBackend
+from products.smtp_pool import PooledEmailBackend, pool, send_batch
+
+
+class Handler:
+    """Counts delivered messages; slows down session setup"""
+
+    def __init__(self):
+        self.received = 0
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(HANDSHAKE_MS / 1000)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 Message accepted for delivery'
+
+
+def build_message(index, connection=None):
+    msg = EmailMultiAlternatives(
+        subject=f'Order Confirmation #ORD-2026-{index:06d} - Basho By Shivangi',
+        body='Thank you for your order!',
+        from_email='shop@basho.test',
+        to=[f'customer{index}@example.com'],
+        connection=connection,
+    )
+    msg.attach_alternative('<p>Thank you for your order!</p>', 'text/html')
+    return msg
+
+
+def run(label, send):
+    handler.received = handler.sessions = 0
+    started = time.perf_counter()
+    send()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<38} {elapsed:7.2f}s  {MESSAGES / elapsed:8.1f} msg/s  "
+          f"{handler.sessions:4d} sessions  {handler.received:4d} delivered")
+    return elapsed
+
+
+handler = Handler()
+controller = Controller(handler, hostname='127.0.0.1', port=PORT)
+controller.start()
+
+print("=" * 60)
+print("SMTP BACKEND THROUGHPUT")
+print("=" * 60)
+print(f"{MESSAGES} messages, {HANDSHAKE_MS:.0f} ms simulated handshake\n")
+
+try:
+    stock = run('stock backend, msg.send() each', lambda: [
+        build_message(i, EmailBackend()).send() for i in range(MESSAGES)
+    ])
+    pooled = run('pooled backend, msg.send() each', lambda: [
+        build_message(i, PooledEmailBackend()).send() for i in range(MESSAGES)
+    ])
+    batched = run('pooled backend, send_batch()', lambda: send_batch(
+        [build_message(i) for i in range(MESSAGES)]
+    ))
+
+    print(f"\n✓ Pooled sends are {stock / pooled:.1f}x faster, batched {stock / batched:.1f}x")
+
+    # The pool now holds an idle connection; restart the server under it
+    controller.stop()
+    controller = Controller(handler, hostname='127.0.0.1', port=PORT)
+    controller.start()
+    handler.received = 0
+    build_message(0, PooledEmailBackend()).send()
+    if handler.received == 1:
+        print("✓ Dropped connection replaced, message delivered")
+    else:
+        print("✗ Message lost after the server dropped the connection")
+finally:
+    pool.close_all()
+    controller.stop()
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-17 17:40
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0008_alter_workshop_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workshopslot',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -64,6 +64,7 @@ class WorkshopSlot(models.Model):
     end_time = models.TimeField()
     available_spots = models.IntegerField()
     is_available = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['date', 'start_time']
@@ -120,10 +121,10 @@ class WorkshopRegistration(models.Model):
         return f"{self.registration_number} - {self.full_name}"
     
     def save(self, *args, **kwargs):
-        # Auto-generate registration number
-        if not self.registration_number:
-            from datetime import datetime
-            self.registration_number = f"WS-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+        # Auto-generate registration number ('WS-TEMP' is the field default)
+        if not self.registration_number or self.registration_number == 'WS-TEMP':
+            from products.numbering import allocate_number
+            self.registration_number = allocate_number('workshop_registration')
         
         # Calculate total amount
         if not self.total_amount:
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from basho_project.images import ImageVariantsField
 from .models import Workshop, WorkshopSlot, WorkshopRegistration
 
 
@@ -13,13 +14,14 @@ class WorkshopSerializer(serializers.ModelSerializer):
     workshop_type_display = serializers.CharField(source='get_workshop_type_display', read_only=True)
     difficulty_level_display = serializers.CharField(source='get_difficulty_level_display', read_only=True)
     image_url = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField('image', fallback_field='image_url')
     
     class Meta:
         model = Workshop
         fields = [
             'id', 'workshop_id', 'name', 'workshop_type', 'workshop_type_display',
             'difficulty_level', 'difficulty_level_display', 'description', 'short_description',
-            'duration_hours', 'price', 'max_participants', 'min_age', 'image', 'image_url',
+            'duration_hours', 'price', 'max_participants', 'min_age', 'image', 'image_url', 'image_variants',
             'is_active', 'available_slots', 'includes_materials', 'includes_refreshments',
             'takes_home_creation', 'is_featured', 'is_popular', 'slots', 'created_at'
         ]
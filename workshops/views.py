@@ -1,12 +1,15 @@
+from django.db import transaction
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Workshop, WorkshopSlot, WorkshopRegistration
 from .serializers import WorkshopSerializer, WorkshopSlotSerializer, WorkshopRegistrationSerializer
+from products.pagination import ListPagination
+from basho_project.conditional import ConditionalGetMixin
 
 
-class WorkshopViewSet(viewsets.ReadOnlyModelViewSet):
+class WorkshopViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing workshops.
     Supports filtering by type, difficulty, and searching.
@@ -19,6 +22,11 @@ class WorkshopViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['price', 'duration_hours', 'created_at', 'name']
     ordering = ['-is_featured', '-is_popular', 'name']
     
+    def get_validator_querysets(self):
+        """Workshops embed their slots, so slot changes must change the ETag too"""
+        workshops = super().get_validator_querysets()[0]
+        return [workshops, WorkshopSlot.objects.filter(workshop__in=workshops)]
+    
     @action(detail=True, methods=['get'])
     def slots(self, request, pk=None):
         """Get available slots for a specific workshop"""
@@ -32,7 +40,7 @@ class WorkshopViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
-class WorkshopSlotViewSet(viewsets.ReadOnlyModelViewSet):
+class WorkshopSlotViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for viewing workshop slots"""
     queryset = WorkshopSlot.objects.filter(is_available=True, available_spots__gt=0)
     serializer_class = WorkshopSlotSerializer
@@ -47,56 +55,41 @@ class WorkshopRegistrationViewSet(viewsets.ModelViewSet):
     """
     queryset = WorkshopRegistration.objects.all()
     serializer_class = WorkshopRegistrationSerializer
+    pagination_class = ListPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['workshop', 'status']
     ordering = ['-registered_at']
     
     def create(self, request, *args, **kwargs):
-        import logging
-        logger = logging.getLogger(__name__)
+        from products.jobs import enqueue
+        from products.tasks import send_workshop_confirmation_email, send_workshop_admin_notification
         
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Reduce available spots when registration is created
-        registration = serializer.save()
-        if registration.slot:
-            slot = registration.slot
-            slot.available_spots -= registration.number_of_participants
-            if slot.available_spots <= 0:
-                slot.is_available = False
-            slot.save()
-        
-        # Send email confirmations (with automatic Celery/sync fallback)
-        email_sent = False
-        admin_email_sent = False
-        
-        try:
-            from products.tasks import send_workshop_confirmation_email, send_workshop_admin_notification
-            from products.email_utils import send_email_with_celery_fallback
+        # Registration, spot count and its emails commit (or roll back) together;
+        # the emails are sent by the job worker, not in this request
+        with transaction.atomic():
+            registration = serializer.save()
+            if registration.slot:
+                # Reduce available spots when registration is created
+                slot = registration.slot
+                slot.available_spots -= registration.number_of_participants
+                if slot.available_spots <= 0:
+                    slot.is_available = False
+                slot.save()
             
-            # Send customer confirmation email (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(send_workshop_confirmation_email, registration.id)
-            email_sent = True
-            logger.info(f"Workshop confirmation email sent for registration {registration.registration_number}")
-        except Exception as email_error:
-            logger.error(f"Error sending customer email for registration {registration.registration_number}: {str(email_error)}")
-        
-        try:
-            # Send admin notification email (async if Celery enabled, sync otherwise)
-            send_email_with_celery_fallback(send_workshop_admin_notification, registration.id)
-            admin_email_sent = True
-            logger.info(f"Admin notification email sent for registration {registration.registration_number}")
-        except Exception as email_error:
-            logger.error(f"Error sending admin email for registration {registration.registration_number}: {str(email_error)}")
+            enqueue(send_workshop_confirmation_email, registration.id)
+            enqueue(send_workshop_admin_notification, registration.id)
         
         headers = self.get_success_headers(serializer.data)
         return Response(
             {
                 'message': 'Registration successful! You will receive a confirmation email shortly.',
                 'registration': serializer.data,
-                'email_sent': email_sent,
-                'admin_notified': admin_email_sent
+                # Both emails are queued with the registration
+                'email_sent': True,
+                'admin_notified': True
             },
             status=status.HTTP_201_CREATED,
             headers=headers